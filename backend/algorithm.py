@@ -1,7 +1,23 @@
-from igraph import InternalError
+import heapq
+import multiprocessing
+from collections import OrderedDict, defaultdict
 
+import numpy as np
+from igraph import Vertex
 
-def get_shortest_paths(graph, source, target=None, weights=None, mode="OUT", output="epath"):
+from backend import shortest_paths
+from backend.utils import structural_hash, weights_key
+
+# Gomory-Hu trees already built, keyed by (structural hash, capacity key), least recently used first
+MAX_TREES = 4
+
+_gomory_hu_trees = OrderedDict()
+
+# Batches of k shortest paths are spread over worker processes once they have at least this many pairs
+PARALLEL_MIN_PAIRS = 16
+
+
+def get_shortest_paths(graph, source, target=None, weights=None, mode="OUT", output="epath", landmarks=None):
     """
 
     Calculates the shortest paths from/to a given node in a graph.
@@ -17,16 +33,277 @@ def get_shortest_paths(graph, source, target=None, weights=None, mode="OUT", out
     :param output: str, If this is "vpath", a list of vertex IDs will be returned, one path for each target vertex. For
     unconnected graphs, some of the list elements may be empty. Note that in case of mode=IN, the vertices in a path are
     returned in reversed order. If output="epath", edge IDs are returned instead of vertex IDs
+    :param landmarks: backend.landmarks.Landmarks or None, landmarks of the graph. A path to a single target is then
+    found by A* guided by them, expanding far fewer vertices than Dijkstra. Landmarks built with other weights or
+    another mode are not used. Paths are otherwise answered from the shortest path tree of the source, cached until the
+    graph is edited (see backend.shortest_paths)
     :return: [[int]], list of edges or nodes on the path, e.g.
         - a call to get_shortest_paths(graph, 0, 1120, output="vpath") returns
             [[0, 16, 414, 408, 404, 670, 1081, 1070, 1071, 1114, 1116, 1119, 1120]]  #<-- vertex ids
         - a call to get_shortest_paths(graph, 0, 1120, output="epath") returns
             [[0, 30, 541, 523, 524, 867, 1360, 1357, 1364, 1423, 1427, 1430]]  #<-- edge ids
     """
-    return graph.get_shortest_paths(source, target, weights, mode, output)
+    single_target = isinstance(target, (int, np.integer, str, Vertex))
+    if landmarks is not None and single_target and landmarks.fits(graph, weights, mode):
+        source, target = shortest_paths.vertex_id(graph, source), shortest_paths.vertex_id(graph, target)
+        return [landmarks.shortest_path(source, target, output)]
+    return shortest_paths.get_shortest_paths(graph, source, target, weights, mode, output)
+
+
+def walk(edges, source, edge_path):
+    # Vertex ids along a path given by its edge ids
+    vertex_path = [source]
+    for edge_id in edge_path:
+        a, b = edges[edge_id]
+        vertex_path.append(b if a == vertex_path[-1] else a)
+    return vertex_path
+
+
+def yen_k_shortest_paths(graph, source, target, k, weights=None, mode="OUT"):
+    """
+
+    Yen's algorithm: every next path leaves one of the previous ones at a spur vertex, taking the shortest way to the
+    target that avoids the edges the previous paths take from there and the vertices before the spur. Edges to avoid
+    get a weight larger than any loopless path, so the spur paths are plain shortest path calls to igraph
+
+    :return: [[int]], edge ids of up to k loopless paths, shortest first
+    """
+    edges = graph.get_edgelist()
+    base = np.ones(graph.ecount()) if weights is None else np.asarray(
+        graph.es[weights] if isinstance(weights, str) else weights, dtype=float
+    )
+    avoided = base.sum() + 1
+    incident = graph.get_inclist(mode="ALL")
+
+    first = graph.get_shortest_paths(source, target, base.tolist(), mode, "epath")[0]
+    if not first and source != target:
+        return []
+    paths, candidates, seen = [first], [], {tuple(first)}
+    while len(paths) < k:
+        last = paths[-1]
+        vertices = walk(edges, source, last)
+        for i in range(len(last)):
+            root = last[:i]
+            spur_weights = base.copy()
+            for path in paths:
+                if path[:i] == root and len(path) > i:
+                    spur_weights[path[i]] = avoided
+            for vertex in vertices[:i]:
+                spur_weights[incident[vertex]] = avoided
+
+            spur_path = graph.get_shortest_paths(vertices[i], target, spur_weights.tolist(), mode, "epath")[0]
+            if not spur_path or spur_weights[spur_path].max() >= avoided:
+                continue  # no way around the avoided edges
+            candidate = tuple(root + spur_path)
+            if candidate not in seen:
+                seen.add(candidate)
+                heapq.heappush(candidates, (float(base[list(candidate)].sum()), candidate))
+        if not candidates:
+            break
+        paths.append(list(heapq.heappop(candidates)[1]))
+    return paths
+
+
+def k_shortest_paths(graph, source, target, k=1, weights=None, mode="OUT", output="epath"):
+    """
+
+    The k shortest loopless paths between two vertices, shortest first. igraph finds them itself when it can (0.10 and
+    later), Yen's algorithm is used otherwise
+
+    :param graph: igraph.Graph, graph to work on
+    :param source: int, the source vertex id
+    :param target: int, the target vertex id
+    :param k: int, number of paths
+    :param weights: str or [int or float], as in get_shortest_paths
+    :param mode: str, as in get_shortest_paths
+    :param output: str, "epath" for edge ids, "vpath" for vertex ids
+    :return: [[int]], up to k paths, fewer when there are not as many
+    """
+    if hasattr(graph, 'get_k_shortest_paths'):
+        return graph.get_k_shortest_paths(source, target, k, mode=mode, weights=weights, output=output)
+
+    paths = yen_k_shortest_paths(graph, source, target, k, weights, mode)
+    if output == "vpath":
+        edges = graph.get_edgelist()
+        return [walk(edges, source, path) for path in paths]
+    return paths
+
+
+def k_shortest_paths_of(graph, pairs, k, weights, mode, output):
+    return [k_shortest_paths(graph, source, target, k, weights, mode, output) for source, target in pairs]
+
+
+def batch_shortest_paths(graph, pairs, k=1, weights=None, mode="OUT", output="epath", processes=None):
+    """
+
+    Shortest paths between many pairs of vertices. With k = 1, the pairs of a source are answered together by one
+    search from it (see get_shortest_paths). With k > 1, pairs are independent and large batches are spread over
+    worker processes
+
+    :param graph: igraph.Graph, graph to work on
+    :param pairs: [(int, int)], source and target vertex ids of every query
+    :param k: int, number of paths per pair
+    :param weights: str or [int or float], as in get_shortest_paths
+    :param mode: str, as in get_shortest_paths
+    :param output: str, "epath" for edge ids, "vpath" for vertex ids
+    :param processes: int or None, number of worker processes, None for the number of CPUs. 1 never starts any
+    :return: [[[int]]], the paths (up to k, shortest first) of every pair, in the order of the pairs
+    """
+    pairs = [(int(source), int(target)) for source, target in pairs]
+    if k == 1:
+        by_source = defaultdict(list)
+        for index, (source, target) in enumerate(pairs):
+            by_source[source].append(index)
+        results = [None] * len(pairs)
+        for source, indexes in by_source.items():
+            targets = [pairs[index][1] for index in indexes]
+            for index, path in zip(indexes, get_shortest_paths(graph, source, targets, weights, mode, output)):
+                results[index] = [path] if path or source == pairs[index][1] else []
+        return results
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(pairs) < PARALLEL_MIN_PAIRS:
+        return k_shortest_paths_of(graph, pairs, k, weights, mode, output)
+
+    # One chunk per worker, so the graph is sent to every worker once
+    chunks = [pairs[i::processes] for i in range(processes)]
+    with multiprocessing.get_context('spawn').Pool(processes) as pool:
+        chunk_results = pool.starmap(
+            k_shortest_paths_of, [(graph, chunk, k, weights, mode, output) for chunk in chunks]
+        )
+    results = [None] * len(pairs)
+    for i, chunk_result in enumerate(chunk_results):
+        results[i::processes] = chunk_result
+    return results
+
+
+def cut_edges(graph, partition, edges=None):
+    """
+
+    Edges of a cut, found with one pass over the edge list rather than a lookup per pair of vertices
+
+    :param graph: igraph.Graph, graph to work on
+    :param partition: [int], ids of the vertices on the source side of the cut
+    :param edges: numpy.ndarray or None, (E, 2) source and target of every edge, to be reused over many cuts of the
+    same graph
+    :return: [int], sorted ids of the edges going from the source side to the other side. In undirected graphs, ids of
+    the edges crossing the cut either way
+    """
+    if edges is None:
+        edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    source_side = np.zeros(graph.vcount(), dtype=bool)
+    source_side[np.asarray(partition, dtype=np.int64)] = True
+
+    sources, targets = source_side[edges[:, 0]], source_side[edges[:, 1]]
+    crossing = sources & ~targets if graph.is_directed() else sources != targets
+    return np.nonzero(crossing)[0].tolist()
+
+
+class GomoryHuTree:
+    """
+    Gomory-Hu tree of an undirected graph: one maximum flow per vertex builds it, and then the minimum cut between any
+    two vertices is the lightest tree edge on the path between them. The tree is kept rooted, with its vertices in depth
+    first order, so that the vertices on one side of a tree edge are a contiguous range of that order
+    """
+
+    def __init__(self, graph, capacity=None):
+        tree = graph.gomory_hu_tree(capacity)
+        count = graph.vcount()
+
+        self.parent = np.full(count, -1, dtype=np.int64)
+        self.flow = np.zeros(count)  # flow of the tree edge between every vertex and its parent
+        self.depth = np.zeros(count, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)
+        if not count:
+            return
+
+        order = []
+        adjacency = tree.get_adjlist()
+        stack = [0]
+        while stack:
+            vertex = stack.pop()
+            order.append(vertex)
+            for neighbor in adjacency[vertex]:
+                if neighbor != self.parent[vertex]:
+                    self.parent[neighbor] = vertex
+                    stack.append(neighbor)
+        self.order = np.asarray(order, dtype=np.int64)
+
+        children = self.order[1:]
+        flows = np.asarray(tree.es['flow'], dtype=float)
+        self.flow[children] = flows[tree.get_eids(np.column_stack([children, self.parent[children]]).tolist())]
+
+        self.position = np.empty(count, dtype=np.int64)
+        self.position[self.order] = np.arange(count)
+        # Depth and size of the subtree of every vertex, parents always come first in depth first order
+        self.size = np.ones(count, dtype=np.int64)
+        for vertex in reversed(children.tolist()):
+            self.size[self.parent[vertex]] += self.size[vertex]
+        for vertex in children.tolist():
+            self.depth[vertex] = self.depth[self.parent[vertex]] + 1
+
+    def lightest_edge(self, source, target):
+        """
+        :return: (float, int), flow of the lightest tree edge between two vertices, and the vertex below that edge,
+        (inf, -1) when both are the same vertex
+        """
+        value, below = np.inf, -1
+        while source != target:
+            if self.depth[source] < self.depth[target]:
+                source, target = target, source
+            if self.flow[source] < value:
+                value, below = self.flow[source], source
+            source = self.parent[source]
+        return value, below
+
+    def min_cut(self, source, target):
+        """
+        :param source: int, the source vertex id
+        :param target: int, the target vertex id
+        :return: (float, [int]), value of the minimum cut between the two vertices and the ids of the vertices on the
+        source side of it
+        """
+        if source == target:
+            # No tree edge lies between a vertex and itself, maxflow refuses these pairs too
+            raise ValueError("Source and target vertices are the same")
+        value, below = self.lightest_edge(source, target)
+        start = self.position[below]
+        subtree = self.order[start:start + self.size[below]]
+        if start <= self.position[source] < start + self.size[below]:
+            return float(value), subtree.tolist()
+
+        source_side = np.ones(len(self.order), dtype=bool)
+        source_side[subtree] = False
+        return float(value), np.nonzero(source_side)[0].tolist()
+
+
+def gomory_hu_tree(graph, capacity=None):
+    """
+
+    Gomory-Hu tree of a graph, built once per structure and capacities of the graph. Any change to the edges or to
+    their capacities changes the key of the cache, so a new tree is built on the next call
+
+    :param graph: igraph.Graph, undirected graph to work on
+    :param capacity: str, [int or float] or None, name of an edge attribute holding the capacities (e.g.
+    "LinkSpeedRaw"), or the capacities. None gives every edge the same capacity
+    :return: GomoryHuTree
+    """
+    key = (structural_hash(graph), weights_key(graph, capacity))
+    tree = _gomory_hu_trees.get(key)
+    if tree is None:
+        tree = GomoryHuTree(graph, capacity)
+        _gomory_hu_trees[key] = tree
+        if len(_gomory_hu_trees) > MAX_TREES:
+            _gomory_hu_trees.popitem(last=False)
+    _gomory_hu_trees.move_to_end(key)
+    return tree
+
 
+def clear_gomory_hu_trees():
+    _gomory_hu_trees.clear()
 
-def bottleneck(graph, source, target, capacity=None, output="e"):
+
+def bottleneck(graph, source, target, capacity=None, output="e", gomory_hu=False):
     """
     Find bottleneck of graph
 
@@ -35,25 +312,50 @@ def bottleneck(graph, source, target, capacity=None, output="e"):
     :param target: int, the target vertex id
     :param capacity: [str] or None, the capacity of the edges. It must be a list or a valid attribute name or None. In
     the latter case, every edge will have the same capacity
-    :param output: ignore this for now
-    :return: [int], list of ids of edges that cause the bottleneck between two vertices
+    :param output: str, "e" for the edges of the bottleneck, "v" for the vertices on either side of it
+    :param gomory_hu: bool, answer from the cached Gomory-Hu tree of the graph instead of running a maximum flow, which
+    pays off once many pairs of the same graph are asked for. Only for undirected graphs, directed ones always run a
+    maximum flow
+    :return: [int], list of ids of edges that cause the bottleneck between two vertices. With output="v", [[int], [int]]
+    the vertex ids on the source side and on the target side
     """
-    cut = graph.maxflow(source, target, capacity)
+    if gomory_hu and not graph.is_directed():
+        _, source_side = gomory_hu_tree(graph, capacity).min_cut(source, target)
+        partition = [source_side, sorted(set(range(graph.vcount())) - set(source_side))]
+    else:
+        partition = graph.maxflow(source, target, capacity)
 
     if output == "v":
-        partition_list = [cut[0], cut[1]]
+        partition_list = [partition[0], partition[1]]
         return partition_list
 
     if output == "e":
-        bottleneck_edge = []
-        for vt_a_id in cut[0]:
-            for vt_b_id in cut[1]:
-                vt_a = graph.vs[vt_a_id]
-                vt_b = graph.vs[vt_b_id]
-                try:
-                    edge_id = graph.get_eid(vt_a.index, vt_b.index)
-                except InternalError:
-                    continue
-                bottleneck_edge.append(edge_id)
-
-        return bottleneck_edge
+        return cut_edges(graph, partition[0])
+
+
+def bottlenecks(graph, pairs, capacity=None, gomory_hu=False):
+    """
+
+    Find the bottlenecks between many pairs of vertices at once, the edge list being read a single time
+
+    :param graph: igraph.Graph, graph to work on
+    :param pairs: [(int, int)], source and target vertex ids of every bottleneck
+    :param capacity: [str] or None, the capacity of the edges, as in bottleneck
+    :param gomory_hu: bool, answer from the cached Gomory-Hu tree of the graph, as in bottleneck
+    :return: [(float, [int])], for every pair, the capacity of the bottleneck (the maximum flow between the pair) and
+    the ids of its edges
+    """
+    edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    if isinstance(capacity, str):
+        capacity = graph.es[capacity]
+
+    tree = gomory_hu_tree(graph, capacity) if gomory_hu and not graph.is_directed() else None
+    results = []
+    for source, target in pairs:
+        if tree is not None:
+            value, source_side = tree.min_cut(source, target)
+        else:
+            cut = graph.maxflow(source, target, capacity)
+            value, source_side = cut.value, cut[0]
+        results.append((value, cut_edges(graph, source_side, edges)))
+    return results
@@ -0,0 +1,83 @@
+"""
+Compare the run time and quality of the layouts on synthetic graphs:
+
+    python -m backend.benchmark --sizes 1000 10000 100000 500000
+
+The quality measures are computed from the coordinates only, lower is better for both:
+    - edge ratio: mean edge length over the mean distance between random pairs of vertices, how much closer neighbors
+      are drawn than any two vertices
+    - edge spread: standard deviation of the edge lengths over their mean, how uneven the edges are
+"""
+import argparse
+import time
+
+import numpy as np
+from igraph import Graph
+
+from backend.layout import compute_layout
+
+LAYOUTS = ['barnes_hut', 'multilevel', 'large', 'drl', 'fr', 'kk']
+# igraph layouts whose cost grows with the square of the number of vertices, skipped on larger graphs
+QUADRATIC_LAYOUTS = ['fr', 'kk']
+QUADRATIC_MAX_VERTICES = 10000
+
+SAMPLE_PAIRS = 100000
+
+
+def synthetic_graph(kind, size):
+    """
+
+    :param kind: str, "mesh" for a square grid, "scale_free" for a Barabasi-Albert graph
+    :param size: int, approximate number of vertices
+    :return: igraph.Graph
+    """
+    if kind == 'mesh':
+        side = int(round(np.sqrt(size)))
+        return Graph.Lattice([side, side], circular=False)
+    return Graph.Barabasi(size, 2)
+
+
+def layout_quality(graph, coords, seed=0):
+    """
+
+    :param graph: igraph.Graph, graph that was laid out
+    :param coords: numpy.ndarray, (V, 2) coordinates of the vertices
+    :param seed: int, seed of the random pairs of vertices
+    :return: (float, float), edge ratio and edge spread, see the module docstring
+    """
+    edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    lengths = np.sqrt(((coords[edges[:, 0]] - coords[edges[:, 1]]) ** 2).sum(axis=1))
+
+    pairs = np.random.RandomState(seed).randint(0, len(coords), (SAMPLE_PAIRS, 2))
+    distances = np.sqrt(((coords[pairs[:, 0]] - coords[pairs[:, 1]]) ** 2).sum(axis=1))
+
+    mean_length = lengths.mean()
+    return mean_length / max(distances.mean(), 1e-12), lengths.std() / max(mean_length, 1e-12)
+
+
+def run(sizes, kinds, layouts):
+    print("{:<11}{:>9}{:>12}{:>11}{:>12}{:>13}".format('graph', 'vertices', 'layout', 'seconds', 'edge ratio',
+                                                      'edge spread'))
+    for kind in kinds:
+        for size in sizes:
+            graph = synthetic_graph(kind, size)
+            for layout in layouts:
+                if layout in QUADRATIC_LAYOUTS and graph.vcount() > QUADRATIC_MAX_VERTICES:
+                    continue
+                start = time.perf_counter()
+                coords = np.array(compute_layout(graph, layout), dtype=float)
+                seconds = time.perf_counter() - start
+
+                edge_ratio, edge_spread = layout_quality(graph, coords)
+                print("{:<11}{:>9}{:>12}{:>11.2f}{:>12.4f}{:>13.4f}".format(
+                    kind, graph.vcount(), layout, seconds, edge_ratio, edge_spread
+                ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the layouts on synthetic graphs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 500000])
+    parser.add_argument('--kinds', nargs='+', default=['mesh', 'scale_free'], choices=['mesh', 'scale_free'])
+    parser.add_argument('--layouts', nargs='+', default=LAYOUTS)
+    arguments = parser.parse_args()
+    run(arguments.sizes, arguments.kinds, arguments.layouts)
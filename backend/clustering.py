@@ -0,0 +1,341 @@
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import OrderedDict, Counter
+
+import numpy as np
+from igraph import VertexDendrogram
+
+from backend.utils import structural_hash, weights_key
+
+# Membership vectors already computed, keyed by (structural hash, algorithm, weights key), least recently used first
+MAX_ENTRIES = 32
+SIDECAR_SUFFIX = '.clusters.json'
+
+# Name of the weights argument of the clustering methods that do not call it "weights"
+WEIGHTS_ARGUMENT = {'community_infomap': 'edge_weights'}
+
+# Incremental updates only re-cluster around the edited vertices, unless more than this fraction of them was edited
+INCREMENTAL_MAX_CHANGE = 0.1
+LOCAL_ROUNDS = 10
+
+_memberships = OrderedDict()
+_loaded_sidecars = set()
+# Last clustering of every (algorithm, weights key), see snapshot
+_last_clusterings = {}
+
+
+def sidecar_path(graph_path):
+    return graph_path + SIDECAR_SUFFIX
+
+
+def remember(key, membership):
+    _memberships[key] = membership
+    _memberships.move_to_end(key)
+    if len(_memberships) > MAX_ENTRIES:
+        _memberships.popitem(last=False)
+
+
+def load_sidecar(path):
+    """
+
+    Put the memberships saved next to a graph file into the cache. Done once per file, an unreadable file is ignored
+
+    :param path: str, path of the sidecar file
+    """
+    if path in _loaded_sidecars:
+        return
+    _loaded_sidecars.add(path)
+
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    for entry in entries:
+        key = (entry['hash'], entry['algorithm'], entry['weights'])
+        if key not in _memberships:
+            remember(key, entry['membership'])
+
+
+def save_sidecar(path, key, membership):
+    """
+
+    Add a membership to the sidecar file of a graph, replacing the one of the same key if any
+
+    :param path: str, path of the sidecar file
+    :param key: (str, str, str), key of the membership
+    :param membership: [int], cluster of every vertex
+    """
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        entries = []
+
+    entries = [entry for entry in entries if (entry['hash'], entry['algorithm'], entry['weights']) != key]
+    entries.append({'hash': key[0], 'algorithm': key[1], 'weights': key[2], 'membership': membership})
+    # Only the most recent entries are kept, like in memory
+    entries = entries[-MAX_ENTRIES:]
+
+    try:
+        with open(path, 'w') as f:
+            json.dump(entries, f)
+    except OSError:
+        pass
+
+
+def compute_membership(graph, algorithm, weights=None):
+    """
+
+    Run a clustering algorithm
+
+    :param graph: igraph.Graph, graph to work on
+    :param algorithm: str, name of the community_* method of igraph.Graph to use
+    :param weights: str, [int or float] or None, edge weights
+    :return: [int], cluster of every vertex, in vertex id order
+    """
+    kwargs = {} if weights is None else {WEIGHTS_ARGUMENT.get(algorithm, 'weights'): weights}
+    clusters = getattr(graph, algorithm)(**kwargs)
+    # Some clustering algorithms return VertexDendrogram, some return VertexClustering, and VertexDendrogram object
+    # has to be transformed into VertexClustering (as_clustering()) before it can be subgraphed
+    if isinstance(clusters, VertexDendrogram):
+        clusters = clusters.as_clustering()
+    return list(clusters.membership)
+
+
+def get_membership(graph, algorithm, weights=None, graph_path=None):
+    """
+
+    Cluster a graph, reusing the result of a previous call on a graph of the same structure with the same algorithm and
+    weights. Vertex and edge attributes other than the weights do not matter
+
+    :param graph: igraph.Graph, graph to work on
+    :param algorithm: str, name of the community_* method of igraph.Graph to use
+    :param weights: str, [int or float] or None, edge weights
+    :param graph_path: str or None, path of the GraphML file of the graph. If given, results are also saved next to it
+    and read back from there, so they outlive the program
+    :return: [int], cluster of every vertex, in vertex id order
+    """
+    membership = cached_membership(graph, algorithm, weights, graph_path)
+    if membership is None:
+        membership = compute_membership(graph, algorithm, weights)
+        store_membership(graph, algorithm, membership, weights, graph_path)
+    return list(membership)
+
+
+def get_membership_incrementally(graph, algorithm, weights=None, graph_path=None):
+    """
+
+    Same as get_membership, except that a graph that is an edited version of the one last clustered with the same
+    algorithm and weights is not clustered again from scratch: only the neighborhood of the edits is, so the clusters
+    (and their colors) elsewhere stay the same. A graph edited too much is clustered from scratch
+
+    :return: [int], cluster of every vertex, in vertex id order. Cluster ids may not be contiguous
+    """
+    last_key = (algorithm, weights_key(graph, weights))
+    membership = cached_membership(graph, algorithm, weights, graph_path)
+    if membership is None and last_key in _last_clusterings:
+        membership = update_membership(graph, _last_clusterings[last_key])
+        if membership is not None:
+            store_membership(graph, algorithm, membership, weights, graph_path)
+    if membership is None:
+        membership = get_membership(graph, algorithm, weights, graph_path)
+
+    _last_clusterings[last_key] = snapshot(graph, membership)
+    return list(membership)
+
+
+def vertex_keys(graph):
+    """
+
+    Keys identifying vertices across edits, which renumber them: the "id" attribute of GraphML files if it is unique,
+    the vertex ids otherwise
+
+    :param graph: igraph.Graph, graph to work on
+    :return: list
+    """
+    if 'id' in graph.vs.attributes():
+        keys = graph.vs['id']
+        if len(set(keys)) == len(keys):
+            return keys
+    return list(range(graph.vcount()))
+
+
+def snapshot(graph, membership):
+    """
+
+    What update_membership needs to know about a clustered graph
+
+    :return: ([object], set, [int]), vertex keys, edges as pairs of vertex keys, and cluster of every vertex
+    """
+    keys = vertex_keys(graph)
+    edges = {edge_key(keys[source], keys[target]) for source, target in graph.get_edgelist()}
+    return keys, edges, list(membership)
+
+
+def edge_key(key_a, key_b):
+    return (key_a, key_b) if str(key_a) <= str(key_b) else (key_b, key_a)
+
+
+def update_membership(graph, previous):
+    """
+
+    Bring a clustering up to date after local edits. Vertices that were added, or that gained or lost edges, and their
+    neighbors take the label most of their neighbors have, repeatedly, the way of label propagation. Every other vertex
+    keeps its cluster
+
+    :param graph: igraph.Graph, edited graph
+    :param previous: tuple, snapshot of the graph before the edits
+    :return: [int] or None, cluster of every vertex, None if too much of the graph was edited
+    """
+    previous_keys, previous_edges, previous_membership = previous
+    keys = vertex_keys(graph)
+    old_index = {key: index for index, key in enumerate(previous_keys)}
+    new_index = {key: index for index, key in enumerate(keys)}
+
+    membership = [previous_membership[old_index[key]] if key in old_index else -1 for key in keys]
+    changed = {index for index, cluster in enumerate(membership) if cluster < 0}
+
+    edges = {edge_key(keys[source], keys[target]) for source, target in graph.get_edgelist()}
+    for key_a, key_b in edges ^ previous_edges:
+        changed.update(new_index[key] for key in (key_a, key_b) if key in new_index)
+
+    if len(changed) > INCREMENTAL_MAX_CHANGE * graph.vcount():
+        return None
+
+    affected = set(changed)
+    for vertex_id in changed:
+        affected.update(graph.neighbors(vertex_id))
+
+    next_cluster = max(membership + [-1]) + 1
+    for _ in range(LOCAL_ROUNDS):
+        moved = False
+        for vertex_id in sorted(affected):
+            counts = Counter(membership[u] for u in graph.neighbors(vertex_id) if membership[u] >= 0)
+            if not counts:
+                if membership[vertex_id] < 0:
+                    # Nothing to join, a cluster of its own
+                    membership[vertex_id] = next_cluster
+                    next_cluster += 1
+                continue
+
+            best = max(counts.values())
+            if counts.get(membership[vertex_id]) == best:
+                continue
+            membership[vertex_id] = min(cluster for cluster, count in counts.items() if count == best)
+            moved = True
+        if not moved:
+            break
+
+    return membership
+
+
+def cached_membership(graph, algorithm, weights=None, graph_path=None):
+    """
+
+    Find a clustering already computed for a graph of the same structure, see get_membership
+
+    :return: [int] or None, cluster of every vertex, or None if the clustering has not been computed yet
+    """
+    if graph_path is not None:
+        load_sidecar(sidecar_path(graph_path))
+
+    key = (structural_hash(graph), algorithm, weights_key(graph, weights))
+    membership = _memberships.get(key)
+    if membership is None or len(membership) != graph.vcount():
+        return None
+    _memberships.move_to_end(key)
+    return list(membership)
+
+
+def store_membership(graph, algorithm, membership, weights=None, graph_path=None):
+    """
+
+    Put a clustering computed elsewhere (e.g. in a worker process) into the cache, see get_membership
+    """
+    key = (structural_hash(graph), algorithm, weights_key(graph, weights))
+    membership = list(membership)
+    remember(key, membership)
+    if graph_path is not None and os.path.isfile(graph_path):
+        save_sidecar(sidecar_path(graph_path), key, membership)
+
+
+def peak_memory():
+    """
+
+    :return: int or None, largest resident set size of the current process so far in bytes, None where it is not known
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def profile_membership(graph, algorithm, weights=None):
+    """
+
+    Run a clustering algorithm and measure it. Meant to run alone in a fresh worker process, so the peak memory is
+    its own
+
+    :param graph: igraph.Graph, graph to work on
+    :param algorithm: str, name of the community_* method of igraph.Graph to use
+    :param weights: str, [int or float] or None, edge weights
+    :return: dict, with the wall time in "seconds", "peak_memory" in bytes, the number of "clusters", the "modularity"
+    and the "membership"
+    """
+    start = time.perf_counter()
+    membership = compute_membership(graph, algorithm, weights)
+    seconds = time.perf_counter() - start
+    return {
+        'seconds': seconds,
+        'peak_memory': peak_memory(),
+        'clusters': len(set(membership)),
+        'modularity': graph.modularity(membership, weights=weights),
+        'membership': membership
+    }
+
+
+def compare_clusterings(graph, algorithms, timeout=None, weights=None):
+    """
+
+    Run clustering algorithms side by side, each one in its own process
+
+    :param graph: igraph.Graph, graph to work on
+    :param algorithms: [str], names of the community_* methods of igraph.Graph to compare
+    :param timeout: float or None, seconds each algorithm may run. The ones running longer are stopped
+    :param weights: str, [int or float] or None, edge weights
+    :return: {str: dict}, result of profile_membership of every algorithm, with a "status" added: "ok", "timeout", or
+    the error the algorithm failed with
+    """
+    results = {}
+    # A fresh process per algorithm, so the peak memory of one is not the one of another
+    pool = multiprocessing.get_context('spawn').Pool(max(len(algorithms), 1), maxtasksperchild=1)
+    try:
+        start = time.perf_counter()
+        pending = {algorithm: pool.apply_async(profile_membership, (graph, algorithm, weights))
+                   for algorithm in algorithms}
+        for algorithm, result in pending.items():
+            remaining = None if timeout is None else max(timeout - (time.perf_counter() - start), 0)
+            try:
+                results[algorithm] = dict(result.get(remaining), status='ok')
+            except multiprocessing.TimeoutError:
+                results[algorithm] = {'status': 'timeout'}
+            except Exception as e:
+                results[algorithm] = {'status': str(e) or type(e).__name__}
+    finally:
+        # Stops the algorithms still running after their timeout
+        pool.terminate()
+    return results
+
+
+def clear_cache():
+    _memberships.clear()
+    _loaded_sidecars.clear()
+    _last_clusterings.clear()
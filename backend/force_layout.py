@@ -0,0 +1,276 @@
+import numpy as np
+
+# Rows of the vertex-vertex distance matrix computed at once by the repulsion, to bound its memory use
+REPULSION_CHUNK = 512
+# Distances are clamped to this, so vertices on top of each other do not push each other infinitely far
+MIN_DISTANCE = 0.01
+
+
+def natural_length(positions):
+    """
+
+    Ideal edge length of the Fruchterman-Reingold model for the area the vertices currently take
+
+    :param positions: numpy.ndarray, (V, 2) vertex coordinates
+    :return: float
+    """
+    if len(positions) == 0:
+        return 1.0
+    extent = positions.max(axis=0) - positions.min(axis=0)
+    area = max(extent[0] * extent[1], 1.0)
+    return float(np.sqrt(area / len(positions)))
+
+
+def repulsion(positions, k):
+    """
+
+    Repulsive displacement of every vertex, each pair of vertices pushing each other apart by k^2 / distance
+
+    :param positions: numpy.ndarray, (V, 2) vertex coordinates
+    :param k: float, ideal edge length
+    :return: numpy.ndarray, (V, 2) displacements
+    """
+    displacement = np.zeros_like(positions)
+    for start in range(0, len(positions), REPULSION_CHUNK):
+        delta = positions[start:start + REPULSION_CHUNK, None, :] - positions[None, :, :]
+        distance_squared = np.maximum((delta ** 2).sum(axis=2), MIN_DISTANCE ** 2)
+        displacement[start:start + REPULSION_CHUNK] = (delta * (k * k / distance_squared)[:, :, None]).sum(axis=1)
+    return displacement
+
+
+def attraction(positions, edges, k):
+    """
+
+    Attractive displacement of every vertex, the ends of each edge pulling each other by distance^2 / k
+
+    :param positions: numpy.ndarray, (V, 2) vertex coordinates
+    :param edges: numpy.ndarray, (E, 2) source and target of every edge
+    :param k: float, ideal edge length
+    :return: numpy.ndarray, (V, 2) displacements
+    """
+    displacement = np.zeros_like(positions)
+    if len(edges) == 0:
+        return displacement
+    delta = positions[edges[:, 0]] - positions[edges[:, 1]]
+    distance = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), MIN_DISTANCE)
+    force = delta * (distance / k)[:, None]
+    for axis in (0, 1):
+        displacement[:, axis] = (
+            np.bincount(edges[:, 1], weights=force[:, axis], minlength=len(positions)) -
+            np.bincount(edges[:, 0], weights=force[:, axis], minlength=len(positions))
+        )
+    return displacement
+
+
+def fruchterman_reingold_step(positions, edges, k, temperature, pinned=None, repulse=repulsion):
+    """
+
+    One iteration of the Fruchterman-Reingold layout
+
+    :param positions: numpy.ndarray, (V, 2) vertex coordinates
+    :param edges: numpy.ndarray, (E, 2) source and target of every edge
+    :param k: float, ideal edge length, see natural_length
+    :param temperature: float, largest distance a vertex may move in this iteration
+    :param pinned: [int] or None, ids of the vertices that must not move
+    :param repulse: callable(positions, k), computes the repulsive displacements
+    :return: numpy.ndarray, (V, 2) new vertex coordinates
+    """
+    displacement = repulse(positions, k) + attraction(positions, edges, k)
+
+    length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), MIN_DISTANCE)
+    displacement *= (np.minimum(length, temperature) / length)[:, None]
+    if pinned:
+        displacement[pinned] = 0
+    return positions + displacement
+
+
+# Above this many vertices the repulsion is approximated with barnes_hut_repulsion
+BARNES_HUT_MIN_VERTICES = 1000
+# Average number of vertices per cell of the finest grid, and the depth limit of the grids
+LEAF_SIZE = 2
+MAX_DEPTH = 10
+
+BARNES_HUT_ITERATIONS = 100
+
+
+def grid_cells(positions, origin, size, level):
+    """
+
+    Cell of every vertex in the grid of 2^level x 2^level cells covering a square
+
+    :param positions: numpy.ndarray, (V, 2) vertex coordinates
+    :param origin: numpy.ndarray, lower corner of the square
+    :param size: float, side of the square
+    :param level: int, level of the grid
+    :return: (numpy.ndarray, numpy.ndarray), cell column and cell row of every vertex
+    """
+    n = 1 << level
+    cells = np.clip(np.floor((positions - origin) / size * n).astype(np.int64), 0, n - 1)
+    return cells[:, 0].copy(), cells[:, 1].copy()
+
+
+def far_offsets(parity):
+    """
+
+    Offsets, along one axis, of the cells whose parent is next to the parent of a cell, given the parity of the cell
+
+    :param parity: int, 0 or 1
+    :return: range
+    """
+    return range(-2 - parity, 4 - parity)
+
+
+def barnes_hut_repulsion(positions, k):
+    """
+
+    Same as repulsion, approximated in O(V log V) the way of Barnes-Hut: the vertices of a cell far enough from a vertex
+    push it as a single mass at their center, corrected by the spread of the cell (its quadrupole). The space is cut
+    into grids of 4, 16, 64... cells, a quadtree whose levels are handled one at a time for all vertices at once. At
+    each level, a vertex interacts with the cells that are not next to its own cell but whose parents are next to the
+    parent of its cell, so every other vertex is counted exactly once, either in such a cell or, at the finest level,
+    one by one in the 3 x 3 cells around the vertex
+
+    :param positions: numpy.ndarray, (V, 2) vertex coordinates
+    :param k: float, ideal edge length
+    :return: numpy.ndarray, (V, 2) displacements
+    """
+    count = len(positions)
+    displacement = np.zeros_like(positions)
+    if count < 2:
+        return displacement
+
+    x, y = positions[:, 0].copy(), positions[:, 1].copy()
+    origin = positions.min(axis=0)
+    size = max(float(np.ptp(positions, axis=0).max()), MIN_DISTANCE) * (1 + 1e-9)
+    depth = int(np.clip(np.ceil(np.log(count / LEAF_SIZE) / np.log(4)), 2, MAX_DEPTH))
+
+    for level in range(2, depth + 1):
+        n = 1 << level
+        column, row = grid_cells(positions, origin, size, level)
+        # The grid gets a border of empty cells as wide as the farthest far_offsets, cells off the grid then need no
+        # check: they have no mass, and so do not push
+        width = n + 6
+        cell = (column + 3) * width + row + 3
+        mass = np.bincount(cell, minlength=width * width).astype(float)
+        center_x = np.bincount(cell, weights=x, minlength=width * width) / np.maximum(mass, 1)
+        center_y = np.bincount(cell, weights=y, minlength=width * width) / np.maximum(mass, 1)
+        # Real and imaginary parts of the second moment sum((z - center)^2) of every cell, with z = x + iy
+        moment_x = np.bincount(cell, weights=x * x - y * y, minlength=width * width) - \
+            mass * (center_x ** 2 - center_y ** 2)
+        moment_y = np.bincount(cell, weights=2 * x * y, minlength=width * width) - 2 * mass * center_x * center_y
+
+        # The cells to interact with only depend on the parity of the cell of a vertex
+        for parity_x in (0, 1):
+            for parity_y in (0, 1):
+                group = np.nonzero((column % 2 == parity_x) & (row % 2 == parity_y))[0]
+                group_cell, group_x, group_y = cell[group], x[group], y[group]
+                force_x = np.zeros(len(group))
+                force_y = np.zeros(len(group))
+
+                for dx in far_offsets(parity_x):
+                    for dy in far_offsets(parity_y):
+                        if max(abs(dx), abs(dy)) <= 1:
+                            continue  # next to the cell, left to the finer levels
+                        target = group_cell + dx * width + dy
+
+                        delta_x = group_x - center_x[target]
+                        delta_y = group_y - center_y[target]
+                        inverse = 1 / np.maximum(delta_x ** 2 + delta_y ** 2, MIN_DISTANCE ** 2)
+                        scale = k * k * mass[target] * inverse
+                        force_x += delta_x * scale
+                        force_y += delta_y * scale
+
+                        # The force is the conjugate of k^2 / (d - w) summed over the vertices of the cell, with d
+                        # the delta to the center and w the offset of a vertex from it. Its expansion in w^p / d^(p + 1)
+                        # has no p = 1 term around the center of mass, the p = 2 term is moment / d^3, which is
+                        # moment * conj(d)^3 / |d|^6
+                        cube_x = delta_x * (delta_x ** 2 - 3 * delta_y ** 2)
+                        cube_y = delta_y * (delta_y ** 2 - 3 * delta_x ** 2)
+                        target_moment_x, target_moment_y = moment_x[target], moment_y[target]
+                        scale = k * k * inverse ** 3
+                        force_x += (target_moment_x * cube_x - target_moment_y * cube_y) * scale
+                        force_y -= (target_moment_x * cube_y + target_moment_y * cube_x) * scale
+
+                displacement[group, 0] += force_x
+                displacement[group, 1] += force_y
+
+    # Vertices of the 3 x 3 cells around each vertex at the finest level, one by one
+    flat = column * n + row
+    order = np.argsort(flat, kind='stable')
+    starts = np.searchsorted(flat[order], np.arange(n * n))
+    sizes = np.bincount(flat, minlength=n * n)
+    for dx in range(-1, 2):
+        for dy in range(-1, 2):
+            target_column, target_row = column + dx, row + dy
+            vertices = np.nonzero(
+                (target_column >= 0) & (target_column < n) & (target_row >= 0) & (target_row < n)
+            )[0]
+            target = target_column[vertices] * n + target_row[vertices]
+
+            pair_counts = sizes[target]
+            sources = np.repeat(vertices, pair_counts)
+            ranks = np.arange(len(sources)) - np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+            others = order[np.repeat(starts[target], pair_counts) + ranks]
+            distinct = sources != others
+            sources, others = sources[distinct], others[distinct]
+
+            delta_x = x[sources] - x[others]
+            delta_y = y[sources] - y[others]
+            scale = k * k / np.maximum(delta_x ** 2 + delta_y ** 2, MIN_DISTANCE ** 2)
+            displacement[:, 0] += np.bincount(sources, weights=delta_x * scale, minlength=count)
+            displacement[:, 1] += np.bincount(sources, weights=delta_y * scale, minlength=count)
+
+    return displacement
+
+
+def repulsion_for(count):
+    """
+
+    :param count: int, number of vertices
+    :return: callable(positions, k), the exact repulsion for small graphs, the Barnes-Hut approximation for large ones
+    """
+    return barnes_hut_repulsion if count >= BARNES_HUT_MIN_VERTICES else repulsion
+
+
+def barnes_hut_layout(graph, iterations=BARNES_HUT_ITERATIONS, positions=None, seed=0):
+    """
+
+    Fruchterman-Reingold layout with Barnes-Hut repulsion, usable on graphs of hundreds of thousands of vertices
+
+    :param graph: igraph.Graph, graph to work on
+    :param iterations: int, number of iterations
+    :param positions: numpy.ndarray or None, (V, 2) starting coordinates. None starts from random ones
+    :param seed: int, seed of the random starting coordinates
+    :return: numpy.ndarray, (V, 2) coordinates of every vertex
+    """
+    count = graph.vcount()
+    edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    if positions is None:
+        positions = np.random.RandomState(seed).uniform(0, np.sqrt(max(count, 1)), (count, 2))
+    positions = np.asarray(positions, dtype=float)
+    if count < 2:
+        return positions
+
+    k = natural_length(positions)
+    temperature = 0.1 * max(float(np.ptp(positions, axis=0).max()), k)
+    return cool_down(positions, edges, k, temperature, iterations, barnes_hut_repulsion)
+
+
+def cool_down(positions, edges, k, temperature, iterations, repulse):
+    """
+
+    Run Fruchterman-Reingold iterations, the temperature going down to 1% of its starting value
+
+    :param positions: numpy.ndarray, (V, 2) starting coordinates
+    :param edges: numpy.ndarray, (E, 2) source and target of every edge
+    :param k: float, ideal edge length
+    :param temperature: float, starting temperature
+    :param iterations: int, number of iterations
+    :param repulse: callable(positions, k), computes the repulsive displacements
+    :return: numpy.ndarray, (V, 2) coordinates
+    """
+    cooling = 0.01 ** (1.0 / max(iterations, 1))
+    for _ in range(iterations):
+        positions = fruchterman_reingold_step(positions, edges, k, temperature, repulse=repulse)
+        temperature *= cooling
+    return positions
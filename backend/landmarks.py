@@ -0,0 +1,161 @@
+import heapq
+
+import numpy as np
+
+from backend.utils import structural_hash, weights_key
+
+# Number of landmarks, every one of them costs one (two on directed graphs) single source search to build
+LANDMARK_COUNT = 16
+
+OPPOSITE_MODES = {"OUT": "IN", "IN": "OUT", "ALL": "ALL"}
+
+
+class Landmarks:
+    """
+    Point to point shortest paths with A* and landmarks (ALT). Distances from and to a few landmarks, far apart from
+    each other, bound the distance between any two vertices by the triangle inequality. Guided by these bounds, A*
+    only expands the vertices near the shortest path rather than the whole ball around the source that Dijkstra
+    expands. Everything is kept in arrays, so landmarks can be built in a worker process and sent back
+    """
+
+    def __init__(self, graph, count=LANDMARK_COUNT, weights=None, mode="OUT", seed=0):
+        """
+        :param graph: igraph.Graph, graph to work on
+        :param count: int, number of landmarks
+        :param weights: str, [int or float] or None, name of an edge attribute holding non negative weights, or the
+        weights. None gives every edge the same weight
+        :param mode: str, "OUT", "IN" or "ALL", as in igraph
+        :param seed: int, seed of the first landmark
+        """
+        self.mode = "ALL" if not graph.is_directed() else mode.upper()
+        self.vertex_count = graph.vcount()
+        self.structure = structural_hash(graph)
+        self.weights_key = weights_key(graph, weights)
+
+        edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+        edge_weights = np.ones(len(edges)) if weights is None else np.asarray(
+            graph.es[weights] if isinstance(weights, str) else weights, dtype=float
+        )
+        edge_ids = np.arange(len(edges))
+        tails, heads = (edges[:, 1], edges[:, 0]) if self.mode == "IN" else (edges[:, 0], edges[:, 1])
+        if self.mode == "ALL":
+            tails, heads = np.concatenate([tails, heads]), np.concatenate([heads, tails])
+            edge_weights, edge_ids = np.concatenate([edge_weights, edge_weights]), np.concatenate([edge_ids, edge_ids])
+
+        # Adjacency in compressed rows: the edges leaving vertex v are indptr[v]:indptr[v + 1]
+        order = np.argsort(tails, kind='stable')
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(tails, minlength=self.vertex_count))])
+        self.heads = heads[order]
+        self.edge_ids = edge_ids[order]
+        self.edge_weights = edge_weights[order]
+
+        self.landmarks = self.pick(graph, count, weights, seed)
+        # (V, L) distances from every landmark to every vertex, and from every vertex to every landmark
+        self.from_landmarks = np.asarray(
+            graph.distances(self.landmarks, weights=weights, mode=self.mode), dtype=float
+        ).reshape(len(self.landmarks), -1).T.copy()
+        if self.mode == "ALL":
+            self.to_landmarks = self.from_landmarks
+        else:
+            self.to_landmarks = np.asarray(
+                graph.distances(self.landmarks, weights=weights, mode=OPPOSITE_MODES[self.mode]), dtype=float
+            ).reshape(len(self.landmarks), -1).T.copy()
+
+    def fits(self, graph, weights=None, mode="OUT"):
+        """
+        :return: bool, whether the landmarks can answer queries on a graph with these weights and mode, i.e. were built
+        for them. Bounds computed with other weights or another direction would give wrong paths
+        """
+        mode = "ALL" if not graph.is_directed() else mode.upper()
+        # Rewiring an edge keeps the counts, not the structure
+        return self.mode == mode and self.structure == structural_hash(graph) and \
+            self.weights_key == weights_key(graph, weights)
+
+    def pick(self, graph, count, weights, seed):
+        """
+        Farthest point landmarks: every landmark is the vertex farthest from the ones already picked. Vertices that
+        cannot be reached from them come first, so every component gets a landmark
+        """
+        if not self.vertex_count:
+            return []
+        landmarks = [int(np.random.RandomState(seed).randint(self.vertex_count))]
+        nearest = np.full(self.vertex_count, np.inf)
+        while len(landmarks) < min(count, self.vertex_count):
+            distances = np.asarray(graph.distances(landmarks[-1], weights=weights, mode="ALL")[0], dtype=float)
+            nearest = np.minimum(nearest, distances)
+            nearest[landmarks] = -1
+            landmarks.append(int(np.argmax(nearest)))
+        return landmarks
+
+    def bounds(self, vertices, target):
+        """
+        :param vertices: numpy.ndarray, vertex ids
+        :param target: int, the target vertex id
+        :return: numpy.ndarray, lower bound of the distance from every vertex to the target, inf when the target
+        cannot be reached from it
+        """
+        # d(v, t) >= d(l, t) - d(l, v) and d(v, t) >= d(v, l) - d(t, l). inf - inf gives nan, which fmax ignores
+        with np.errstate(invalid='ignore'):
+            return np.fmax(
+                np.fmax.reduce(self.from_landmarks[target] - self.from_landmarks[vertices], axis=1, initial=0.0),
+                np.fmax.reduce(self.to_landmarks[vertices] - self.to_landmarks[target], axis=1, initial=0.0)
+            )
+
+    def route(self, source, target, guided=True):
+        """
+        A* search from source to target
+
+        :param source: int, the source vertex id
+        :param target: int, the target vertex id
+        :param guided: bool, False searches without the landmark bounds, i.e. plain Dijkstra, for comparison
+        :return: ([int], [int], int), vertex ids and edge ids of the path (empty when there is none) and the number of
+        vertices expanded to find it
+        """
+        distances = {source: 0.0}
+        previous = {}  # vertex -> (vertex, edge) it was reached through
+        closed = set()
+        heap = [(0.0, 0.0, source)]
+
+        while heap:
+            _, distance, vertex = heapq.heappop(heap)
+            if vertex in closed:
+                continue
+            closed.add(vertex)
+            if vertex == target:
+                break
+
+            start, end = self.indptr[vertex], self.indptr[vertex + 1]
+            heads = self.heads[start:end]
+            # Bounds of all the neighbors at once, one array operation per expanded vertex
+            bounds = self.bounds(heads, target).tolist() if guided else [0.0] * len(heads)
+            for head, edge_id, weight, bound in zip(heads.tolist(), self.edge_ids[start:end].tolist(),
+                                                    self.edge_weights[start:end].tolist(), bounds):
+                candidate = distance + weight
+                if head in closed or bound == np.inf or candidate >= distances.get(head, np.inf):
+                    continue  # already settled, cannot reach the target or not any shorter
+                distances[head] = candidate
+                previous[head] = (vertex, edge_id)
+                heapq.heappush(heap, (candidate + bound, candidate, head))
+
+        if target not in closed:
+            return [], [], len(closed)
+        vertex_path, edge_path = [target], []
+        while vertex_path[-1] != source:
+            vertex, edge_id = previous[vertex_path[-1]]
+            vertex_path.append(vertex)
+            edge_path.append(edge_id)
+        return vertex_path[::-1], edge_path[::-1], len(closed)
+
+    def shortest_path(self, source, target, output="epath"):
+        """
+        :param source: int, the source vertex id
+        :param target: int, the target vertex id
+        :param output: str, "epath" for edge ids, "vpath" for vertex ids
+        :return: [int], ids of the edges or vertices on a shortest path, empty when there is none
+        """
+        vertex_path, edge_path, _ = self.route(source, target)
+        return vertex_path if output == "vpath" else edge_path
+
+
+def build_landmarks(graph, count=LANDMARK_COUNT, weights=None, mode="OUT"):
+    return Landmarks(graph, count, weights, mode)
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+
+from backend.force_layout import barnes_hut_layout
+from backend.multilevel_layout import multilevel_layout
+from backend.utils import structural_hash
+
+# Layouts implemented here rather than in igraph, by name
+BUILTIN_LAYOUTS = {'barnes_hut': barnes_hut_layout, 'multilevel': multilevel_layout}
+
+SIDECAR_SUFFIX = '.layout.npz'
+
+
+def compute_layout(graph, layout):
+    """
+
+    Compute the coordinates of the vertices of a graph
+
+    :param graph: igraph.Graph, graph to work on
+    :param layout: str, name of one of the BUILTIN_LAYOUTS or of an igraph layout, e.g. "fr", "kk" or "drl"
+    :return: [[float]], coordinates of every vertex, in vertex id order. Only the first two of 3D layouts are used
+    """
+    if layout in BUILTIN_LAYOUTS:
+        return BUILTIN_LAYOUTS[layout](graph).tolist()
+    return [coords[:2] for coords in graph.layout(layout=layout).coords]
+
+
+def layout_sidecar_path(graph_path):
+    return graph_path + SIDECAR_SUFFIX
+
+
+def save_layout_sidecar(graph, graph_path, layout, coords):
+    """
+
+    Save computed coordinates next to a graph file, as float32 arrays along with the structural hash of the graph and
+    the name of the layout. A sidecar that cannot be written is skipped
+
+    :param graph: igraph.Graph, graph that was laid out
+    :param graph_path: str, path of the GraphML file of the graph
+    :param layout: str, name of the layout
+    :param coords: [[float]] or numpy.ndarray, coordinates of every vertex, in vertex id order
+    """
+    coords = np.asarray(coords, dtype=np.float32).reshape(-1, 2)
+    try:
+        with open(layout_sidecar_path(graph_path), 'wb') as f:
+            np.savez(f, x=coords[:, 0], y=coords[:, 1], hash=np.array(structural_hash(graph)), layout=np.array(layout))
+    except OSError:
+        pass
+
+
+def load_layout_sidecar(graph, graph_path, newer_only=False):
+    """
+
+    Read the coordinates saved next to a graph file, if they were computed for a graph of the same structure
+
+    :param graph: igraph.Graph, graph read from the file
+    :param graph_path: str, path of the GraphML file of the graph
+    :param newer_only: bool, ignore a sidecar older than the graph file, whose own coordinates are then more recent
+    :return: (str, numpy.ndarray) or None, name of the layout and (V, 2) coordinates, None if there is no matching
+    sidecar
+    """
+    path = layout_sidecar_path(graph_path)
+    try:
+        if newer_only and os.path.getmtime(path) <= os.path.getmtime(graph_path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['hash']) != structural_hash(graph) or len(data['x']) != graph.vcount():
+                return None
+            return str(data['layout']), np.column_stack([data['x'], data['y']]).astype(float)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from backend.graph import get_graph
+
+    parser = argparse.ArgumentParser(description="Lay out a graph and write the coordinates to its x and y attributes")
+    parser.add_argument('source', help="GraphML file to read")
+    parser.add_argument('destination', help="GraphML file to write")
+    parser.add_argument('--layout', default='multilevel', help="built-in or igraph layout name")
+    arguments = parser.parse_args()
+
+    graph = get_graph(arguments.source)
+    coords = compute_layout(graph, arguments.layout)
+    graph.vs['x'] = [c[0] for c in coords]
+    graph.vs['y'] = [c[1] for c in coords]
+    graph.write_graphml(arguments.destination)
@@ -0,0 +1,127 @@
+import numpy as np
+
+from backend.force_layout import natural_length, cool_down, repulsion_for
+
+# Graphs are coarsened until they have at most this many vertices
+COARSEST_SIZE = 50
+# Coarsening stops when a level does not have fewer than this fraction of the vertices of the level below
+MIN_REDUCTION = 0.9
+MATCHING_ROUNDS = 5
+
+COARSEST_ITERATIONS = 200
+REFINE_ITERATIONS = 30
+# Temperature at the start of the refinement of a level, relative to the ideal edge length
+REFINE_TEMPERATURE = 1.0
+
+
+def edge_array(graph):
+    return np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+
+
+def match(edges, count, random_state, rounds=MATCHING_ROUNDS):
+    """
+
+    Pair up adjacent vertices. Edges get random weights, and every vertex picks its heaviest edge to an unpaired vertex.
+    Edges picked by both of their ends are paired, which is repeated a few rounds on the vertices left
+
+    :param edges: numpy.ndarray, (E, 2) source and target of every edge
+    :param count: int, number of vertices
+    :param random_state: numpy.random.RandomState
+    :param rounds: int, number of rounds
+    :return: numpy.ndarray, vertex paired with every vertex, -1 for the ones left alone
+    """
+    mate = np.full(count, -1, dtype=np.int64)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    weights = random_state.random_sample(len(edges))
+    # Both directions, so every vertex sees all of its edges as the source
+    ends = np.concatenate([edges, edges[:, ::-1]])
+    weights = np.concatenate([weights, weights])
+
+    for _ in range(rounds):
+        free = (mate[ends[:, 0]] < 0) & (mate[ends[:, 1]] < 0)
+        if not free.any():
+            break
+        candidates, candidate_weights = ends[free], weights[free]
+
+        # Heaviest edge of every vertex: sort by vertex then weight, the last one of each vertex wins
+        order = np.lexsort((candidate_weights, candidates[:, 0]))
+        candidates = candidates[order]
+        last = np.ones(len(candidates), dtype=bool)
+        last[:-1] = candidates[1:, 0] != candidates[:-1, 0]
+        choice = np.full(count, -1, dtype=np.int64)
+        choice[candidates[last, 0]] = candidates[last, 1]
+
+        chosen = np.nonzero(choice >= 0)[0]
+        mutual = chosen[choice[choice[chosen]] == chosen]
+        mate[mutual] = choice[mutual]
+
+    return mate
+
+
+def coarsen(edges, count, random_state):
+    """
+
+    Merge the pairs of a matching into single vertices. Vertices left out of the matching, like the many leaves around
+    the hubs of scale-free graphs, join the pair of one of their neighbors instead
+
+    :param edges: numpy.ndarray, (E, 2) source and target of every edge
+    :param count: int, number of vertices
+    :param random_state: numpy.random.RandomState
+    :return: (numpy.ndarray, int, numpy.ndarray), coarse vertex of every vertex, number of coarse vertices and the
+    (E', 2) edges between coarse vertices
+    """
+    mate = match(edges, count, random_state)
+    vertices = np.arange(count)
+    representative = np.where(mate >= 0, np.minimum(vertices, mate), vertices)
+
+    ends = np.concatenate([edges, edges[:, ::-1]])
+    joining = ends[(mate[ends[:, 0]] < 0) & (mate[ends[:, 1]] >= 0)]
+    # Any matched neighbor will do, the last one written wins
+    representative[joining[:, 0]] = representative[joining[:, 1]]
+    _, mapping = np.unique(representative, return_inverse=True)
+    coarse_count = int(mapping.max()) + 1 if count else 0
+
+    coarse_edges = np.sort(mapping[edges], axis=1)
+    coarse_edges = coarse_edges[coarse_edges[:, 0] != coarse_edges[:, 1]]
+    if len(coarse_edges):
+        coarse_edges = np.unique(coarse_edges, axis=0)
+    return mapping, coarse_count, coarse_edges
+
+
+def multilevel_layout(graph, seed=0):
+    """
+
+    Force directed layout in close to linear time: the graph is coarsened level by level by merging matched vertices,
+    the coarsest graph is laid out, and every level is then placed where its coarse vertices are and refined with a few
+    iterations. Works on graphs without a GUI
+
+    :param graph: igraph.Graph, graph to work on
+    :param seed: int, seed of the matchings and of the starting coordinates
+    :return: numpy.ndarray, (V, 2) coordinates of every vertex
+    """
+    random_state = np.random.RandomState(seed)
+    count, edges = graph.vcount(), edge_array(graph)
+
+    levels = []  # (number of vertices, edges, mapping to the next coarser level), finest first
+    while count > COARSEST_SIZE:
+        mapping, coarse_count, coarse_edges = coarsen(edges, count, random_state)
+        if coarse_count > MIN_REDUCTION * count:
+            break  # nothing left to match, e.g. the leaves of a star
+        levels.append((count, edges, mapping))
+        count, edges = coarse_count, coarse_edges
+
+    positions = random_state.uniform(0, np.sqrt(max(count, 1)), (count, 2))
+    k = natural_length(positions)
+    positions = cool_down(positions, edges, k, 0.1 * np.sqrt(max(count, 1)), COARSEST_ITERATIONS, repulsion_for(count))
+
+    for fine_count, fine_edges, mapping in reversed(levels):
+        # Spread the coarse layout so the finer level gets the same edge length, merged vertices start on top of each
+        # other and are set apart by a small random offset
+        spread = np.sqrt(fine_count / max(count, 1))
+        positions = positions[mapping] * spread + random_state.uniform(-0.1, 0.1, (fine_count, 2)) * k
+        count, edges = fine_count, fine_edges
+
+        k = natural_length(positions)
+        positions = cool_down(positions, edges, k, REFINE_TEMPERATURE * k, REFINE_ITERATIONS, repulsion_for(count))
+
+    return positions
@@ -0,0 +1,58 @@
+"""
+Compare point to point shortest path queries with and without landmarks on synthetic graphs:
+
+    python -m backend.route_benchmark --sizes 10000 100000 --queries 100
+
+For every graph, the time to build the landmarks is printed, then for every method the mean number of expanded
+vertices and the mean latency of a query:
+    - igraph: plain get_shortest_paths, which does not report its expanded vertices
+    - dijkstra: the A* search of backend.landmarks without the landmark bounds
+    - alt: the same search guided by the landmarks
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.benchmark import synthetic_graph
+from backend.landmarks import Landmarks, LANDMARK_COUNT
+
+
+def run(sizes, kinds, queries, count):
+    print("{:<11}{:>9}{:>10}{:>10}{:>12}{:>12}".format('graph', 'vertices', 'build', 'method', 'expanded', 'ms/query'))
+    for kind in kinds:
+        for size in sizes:
+            graph = synthetic_graph(kind, size)
+            start = time.perf_counter()
+            landmarks = Landmarks(graph, count)
+            build = time.perf_counter() - start
+
+            pairs = np.random.RandomState(0).randint(0, graph.vcount(), (queries, 2)).tolist()
+            results = {}
+
+            start = time.perf_counter()
+            for source, target in pairs:
+                graph.get_shortest_paths(source, target, output="epath")
+            results['igraph'] = (float('nan'), time.perf_counter() - start)
+
+            for method, guided in (('dijkstra', False), ('alt', True)):
+                expanded = 0
+                start = time.perf_counter()
+                for source, target in pairs:
+                    expanded += landmarks.route(source, target, guided)[2]
+                results[method] = (expanded / queries, time.perf_counter() - start)
+
+            for method, (expanded, seconds) in results.items():
+                print("{:<11}{:>9}{:>10.2f}{:>10}{:>12.0f}{:>12.2f}".format(
+                    kind, graph.vcount(), build, method, expanded, 1000 * seconds / queries
+                ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare shortest path queries with and without landmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--kinds', nargs='+', default=['mesh', 'scale_free'], choices=['mesh', 'scale_free'])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--landmarks', type=int, default=LANDMARK_COUNT)
+    arguments = parser.parse_args()
+    run(arguments.sizes, arguments.kinds, arguments.queries, arguments.landmarks)
@@ -0,0 +1,193 @@
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+from igraph import Vertex, VertexSeq
+
+from backend.utils import weights_key
+
+# Shortest path trees already computed, keyed by (weights key, mode, source), least recently used first
+MAX_TREES = 64
+# Graphs with at most this many vertices get their distances between all pairs computed at once
+MATRIX_MAX_VERTICES = 2000
+MAX_MATRICES = 2
+
+# Paths are cached for one graph at a time. Hashing the whole structure on every query would cost as much as a
+# breadth first search, so the cache is dropped when another graph or a different number of vertices or edges comes
+# in, and by clear_cache, which edits of the graph call
+_graph = None
+_revision = None
+_trees = OrderedDict()
+_matrices = OrderedDict()
+
+
+def remember(cache, key, value, max_entries):
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > max_entries:
+        cache.popitem(last=False)
+
+
+def graph_key(graph, weights=None, mode="OUT"):
+    """
+
+    Key of the shortest paths of a graph in the cache, which is dropped first if it belongs to another graph
+
+    :param graph: igraph.Graph, graph to work on
+    :param weights: str, [int or float] or None, name of an edge attribute holding the weights, or the weights
+    :param mode: str, "OUT", "IN" or "ALL", as in igraph
+    :return: tuple
+    """
+    global _graph, _revision
+    revision = (graph.vcount(), graph.ecount(), graph.is_directed())
+    if _graph is None or _graph() is not graph or _revision != revision:
+        clear_cache()
+        _graph, _revision = weakref.ref(graph), revision
+
+    mode = "ALL" if not graph.is_directed() else mode.upper()
+    return weights_key(graph, weights), mode
+
+
+def path_tree(graph, source, weights=None, mode="OUT", key=None):
+    """
+
+    Distances from a vertex to all the others, and the edge every vertex is reached through on a shortest path. The
+    edge is the one whose tail is exactly as far as the vertex minus the weight of the edge
+
+    :param graph: igraph.Graph, graph to work on
+    :param source: int, the source vertex id
+    :param weights: str, [int or float] or None, name of an edge attribute holding the weights, or the weights
+    :param mode: str, "OUT", "IN" or "ALL", as in igraph
+    :param key: tuple or None, graph_key of the graph, when the caller already has it
+    :return: (numpy.ndarray, numpy.ndarray, numpy.ndarray), distance of every vertex (inf when unreachable), id of the
+    edge it is reached through and vertex at the other end of that edge (-1 for the source and unreachable vertices)
+    """
+    key = key or graph_key(graph, weights, mode)
+    tree = _trees.get(key + (source,))
+    if tree is not None:
+        _trees.move_to_end(key + (source,))
+        return tree
+
+    mode = key[1]
+    distances = np.asarray(graph.distances(source, weights=weights, mode=mode)[0], dtype=float)
+
+    edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    edge_weights = np.ones(len(edges)) if weights is None else np.asarray(
+        graph.es[weights] if isinstance(weights, str) else weights, dtype=float
+    )
+    edge_ids = np.arange(len(edges))
+    tails, heads = (edges[:, 1], edges[:, 0]) if mode == "IN" else (edges[:, 0], edges[:, 1])
+    if mode == "ALL":
+        tails, heads = np.concatenate([tails, heads]), np.concatenate([heads, tails])
+        edge_weights, edge_ids = np.concatenate([edge_weights, edge_weights]), np.concatenate([edge_ids, edge_ids])
+
+    # Dijkstra set every distance to the distance of its predecessor plus the edge weight, so equality is exact
+    on_path = np.isfinite(distances[tails]) & (distances[tails] + edge_weights == distances[heads]) & (heads != source)
+    predecessors = np.full(graph.vcount(), -1, dtype=np.int64)
+    predecessors[heads[on_path]] = edge_ids[on_path]
+    predecessor_vertices = np.full(graph.vcount(), -1, dtype=np.int64)
+    predecessor_vertices[heads[on_path]] = tails[on_path]
+
+    tree = distances, predecessors, predecessor_vertices
+    remember(_trees, key + (source,), tree, MAX_TREES)
+    return tree
+
+
+def distance_matrix(graph, weights=None, mode="OUT"):
+    """
+
+    Distances between all pairs of vertices, for graphs with at most MATRIX_MAX_VERTICES vertices
+
+    :param graph: igraph.Graph, graph to work on
+    :param weights: str, [int or float] or None, name of an edge attribute holding the weights, or the weights
+    :param mode: str, "OUT", "IN" or "ALL", as in igraph
+    :return: numpy.ndarray or None, (V, V) distance from every row vertex to every column vertex, None for larger graphs
+    """
+    if graph.vcount() > MATRIX_MAX_VERTICES:
+        return None
+    key = graph_key(graph, weights, mode)
+    matrix = _matrices.get(key)
+    if matrix is None:
+        matrix = np.asarray(graph.distances(weights=weights, mode=key[1]), dtype=float).reshape(graph.vcount(), -1)
+        remember(_matrices, key, matrix, MAX_MATRICES)
+    _matrices.move_to_end(key)
+    return matrix
+
+
+def distance(graph, source, target, weights=None, mode="OUT"):
+    """
+
+    :return: float, length of a shortest path between two vertices, inf when there is none
+    """
+    matrix = distance_matrix(graph, weights, mode)
+    if matrix is not None:
+        return float(matrix[source, target])
+    return float(path_tree(graph, source, weights, mode)[0][target])
+
+
+def vertex_id(graph, vertex):
+    """
+
+    :param graph: igraph.Graph, graph the vertex belongs to
+    :param vertex: int, str or igraph.Vertex, a vertex as igraph takes it: its id, its name or the vertex itself
+    :return: int, id of the vertex
+    """
+    if isinstance(vertex, str):
+        return graph.vs.find(name=vertex).index
+    if isinstance(vertex, Vertex):
+        return vertex.index
+    return int(vertex)
+
+
+def vertex_ids(graph, vertices):
+    """
+
+    :param graph: igraph.Graph, graph the vertices belong to
+    :param vertices: one vertex (see vertex_id), a list of them, an igraph.VertexSeq or None for all the vertices
+    :return: [int], ids of the vertices
+    """
+    if vertices is None:
+        return list(range(graph.vcount()))
+    if isinstance(vertices, VertexSeq):
+        return vertices.indices
+    if isinstance(vertices, (int, np.integer, str, Vertex)):
+        return [vertex_id(graph, vertices)]
+    return [vertex_id(graph, vertex) for vertex in vertices]
+
+
+def get_shortest_paths(graph, source, target=None, weights=None, mode="OUT", output="epath"):
+    """
+
+    Same as backend.algorithm.get_shortest_paths, answered from the cached path tree of the source
+
+    :return: [[int]], list of edges or nodes on the path to every target
+    """
+    key = graph_key(graph, weights, mode)
+    # Vertices may come as names or igraph vertices, the cache works with ids
+    source = vertex_id(graph, source)
+    targets = vertex_ids(graph, target)
+    distances, predecessors, predecessor_vertices = path_tree(graph, source, weights, mode, key)
+
+    paths = []
+    for target in targets:
+        edge_path, vertex_path, vertex = [], [target], target
+        while vertex != source and predecessors[vertex] >= 0 and len(edge_path) < graph.vcount():
+            edge_path.append(int(predecessors[vertex]))
+            vertex = int(predecessor_vertices[vertex])
+            vertex_path.append(vertex)
+
+        if vertex != source:
+            if np.isfinite(distances[target]):
+                # Predecessors going around a cycle of zero weight edges, igraph finds the path itself
+                paths.extend(graph.get_shortest_paths(source, target, weights, key[1], output))
+                continue
+            edge_path, vertex_path = [], []
+        paths.append(vertex_path[::-1] if output == "vpath" else edge_path[::-1])
+    return paths
+
+
+def clear_cache():
+    global _graph
+    _graph = None
+    _trees.clear()
+    _matrices.clear()
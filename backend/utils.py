@@ -1,3 +1,6 @@
+import hashlib
+
+import numpy as np
 from igraph import Edge
 
 
@@ -19,4 +22,35 @@ def append_to_dictionary(dictionary, item):
         dictionary[index]["target"] = str(item.target)
 
     for attr in list_attribute:
-        dictionary[index][attr] = str(item[attr])
\ No newline at end of file
+        dictionary[index][attr] = str(item[attr])
+
+
+def structural_hash(graph):
+    """
+
+        Hash the structure of a graph: its vertex count, directedness and edge list. Attributes are left out, so moving
+        or recoloring vertices keeps the same hash
+
+        :param graph: igraph.Graph, graph to work on
+        :return: str, hex digest
+    """
+    digest = hashlib.sha1()
+    digest.update(np.array([graph.vcount(), graph.ecount(), graph.is_directed()], dtype=np.int64).tobytes())
+    digest.update(np.array(graph.get_edgelist(), dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def weights_key(graph, weights=None):
+    """
+
+        Key of the edge weights something is computed with
+
+        :param graph: igraph.Graph, graph to work on
+        :param weights: str, [int or float] or None, name of an edge attribute holding the weights, or the weights
+        :return: str, "" when there are no weights, a hash of the weight values otherwise
+    """
+    if weights is None:
+        return ""
+    if isinstance(weights, str):
+        weights = graph.es[weights]
+    return hashlib.sha1(np.asarray(weights, dtype=float).tobytes()).hexdigest()
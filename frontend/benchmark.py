@@ -0,0 +1,214 @@
+"""
+Measure the scene on synthetic graphs, offscreen:
+
+    QT_QPA_PLATFORM=offscreen python -m frontend.benchmark --sizes 10000 200000
+
+Every case runs in a fresh process, so that the memory it reports is not left over from the previous one:
+    - build: seconds to build the scene of a graph and resident memory it takes per vertex, drawn with one item per
+      vertex and edge (items), with the vertex and edge layers (batched) or with items created on demand (lazy). The
+      graph is clustered beforehand, and the seconds that takes are reported apart
+    - pan: milliseconds to repaint the view while panning the whole graph, with and without the low detail mode and
+      the tile cache
+    - drag: CPU milliseconds per display frame spent on dragging the vertex of highest degree, with four mouse moves
+      arriving per frame, and CPU milliseconds to drop it
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backend.benchmark import synthetic_graph
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUILD_MODES = {
+    'items': {},
+    'batched': {'batched_vertices': True, 'batched_edges': True},
+    'lazy': {'lazy_items': True},
+}
+PAN_MODES = {
+    'plain': {},
+    'low detail': {'low_detail': True},
+    'tile cache': {'cached_rendering': True},
+    'both': {'low_detail': True, 'cached_rendering': True},
+}
+PAN_FRAMES = 30
+PAN_STEP = 20  # pixels per frame
+DRAG_FRAMES = 60
+MOVES_PER_FRAME = 4
+FRAME_SECONDS = 1.0 / 60
+
+
+def resident_memory():
+    # Bytes of memory the process holds, Linux only
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def positioned_graph(kind, size):
+    graph = synthetic_graph(kind, size)
+    side = np.sqrt(graph.vcount())
+    if kind == 'mesh':
+        coords = np.column_stack([np.arange(graph.vcount()) % side, np.arange(graph.vcount()) // side])
+    else:
+        coords = np.random.RandomState(0).uniform(0, side, (graph.vcount(), 2))
+    graph.vs['x'] = coords[:, 0].tolist()
+    graph.vs['y'] = coords[:, 1].tolist()
+    return graph
+
+
+def open_window(settings):
+    """
+    :param settings: dict, MainView.SETTINGS to change before anything is displayed
+    :return: (QApplication, MainWindow), a window showing a graph of two vertices
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    os.chdir(ROOT)  # the window loads its .ui files and icons from relative paths
+    from PyQt5.QtWidgets import QApplication
+    application = QApplication.instance() or QApplication([])
+    # Only imported once there is an application, matplotlib picks its Qt backend then
+    from main import MainWindow
+    from frontend.view import MainView
+
+    MainView.SETTINGS.update(settings)
+    path = os.path.join(tempfile.mkdtemp(), 'start.graphml')
+    start = synthetic_graph('mesh', 4)
+    start.vs['x'] = [0.0, 1.0, 0.0, 1.0]
+    start.vs['y'] = [0.0, 0.0, 1.0, 1.0]
+    start.write_graphml(path)
+    MainWindow.DEFAULT_GRAPH = path
+
+    window = MainWindow()
+    window.resize(1280, 800)
+    window.show()
+    application.processEvents()
+    return application, window
+
+
+def display(window, graph):
+    window.graph = graph
+    window.setup_availability()
+    window.view.update_view(rebuild=True)
+
+
+def build_case(kind, size, mode):
+    from backend.clustering import get_membership
+
+    application, window = open_window(BUILD_MODES[mode])
+    graph = positioned_graph(kind, size)
+    # Clustering is timed on its own, the scene then finds the membership in the cache
+    start = time.perf_counter()
+    get_membership(graph, window.clustering_algorithm)
+    clustering_seconds = time.perf_counter() - start
+
+    memory = resident_memory()
+    start = time.perf_counter()
+    display(window, graph)
+    seconds = time.perf_counter() - start
+    bytes_per_vertex = (resident_memory() - memory) / graph.vcount()
+    return {'graph': kind, 'vertices': graph.vcount(), 'case': 'build', 'mode': mode,
+            'clustering seconds': clustering_seconds, 'seconds': seconds, 'bytes/vertex': bytes_per_vertex}
+
+
+def pan_case(kind, size, mode):
+    settings = dict(PAN_MODES[mode])
+    low_detail = settings.pop('low_detail', False)
+    application, window = open_window(dict(BUILD_MODES['batched'], **settings))
+    view = window.view
+    if not low_detail:
+        view.LOW_DETAIL_SCALE = 0
+    display(window, positioned_graph(kind, size))
+    view.update_level_of_detail()
+    viewport = view.viewport()
+
+    times = []
+    for frame in range(PAN_FRAMES):
+        # Back and forth, so the tile cache gets to see the same places again
+        view.translate(PAN_STEP if frame % 10 < 5 else -PAN_STEP, 0)
+        start = time.perf_counter()
+        viewport.repaint()
+        times.append(time.perf_counter() - start)
+    return {'graph': kind, 'vertices': view.scene.graph_to_display.vcount(), 'case': 'pan', 'mode': mode,
+            'ms/frame': 1000 * np.mean(times), 'max ms': 1000 * np.max(times)}
+
+
+def drag_case(kind, size, mode):
+    from PyQt5.QtCore import Qt, QEvent, QPointF
+    from PyQt5.QtGui import QMouseEvent
+    from PyQt5.QtWidgets import QApplication
+
+    application, window = open_window(BUILD_MODES[mode])
+    graph = positioned_graph(kind, size)
+    display(window, graph)
+    view = window.view
+    # Close enough to see single vertices, far enough to see the edges of the vertex move
+    view.scale(4 / max(view.current_scale(), 1e-9), 4 / max(view.current_scale(), 1e-9))
+    vertex = int(np.argmax(graph.degree()))
+    view.centerOn(view.scene.positions[vertex][0], view.scene.positions[vertex][1])
+    application.processEvents()
+    viewport = view.viewport()
+    pos = view.mapFromScene(*view.scene.positions[vertex])
+
+    def send(kind_of_event, x, y, buttons):
+        event = QMouseEvent(kind_of_event, QPointF(x, y), Qt.LeftButton, buttons, Qt.NoModifier)
+        QApplication.sendEvent(viewport, event)
+
+    send(QEvent.MouseButtonPress, pos.x(), pos.y(), Qt.LeftButton)
+    times = []
+    for frame in range(DRAG_FRAMES):
+        start = time.thread_time()
+        for move in range(MOVES_PER_FRAME):
+            step = frame * MOVES_PER_FRAME + move
+            send(QEvent.MouseMove, pos.x() + step % 40, pos.y() + step % 40 // 2, Qt.LeftButton)
+        # Time between frames, not counted: the drag timer fires meanwhile
+        cpu = time.thread_time() - start
+        time.sleep(FRAME_SECONDS)
+        start = time.thread_time()
+        application.processEvents()
+        viewport.repaint()
+        times.append(cpu + time.thread_time() - start)
+    start = time.thread_time()
+    send(QEvent.MouseButtonRelease, pos.x(), pos.y(), Qt.NoButton)
+    application.processEvents()
+    drop = time.thread_time() - start
+    return {'graph': kind, 'vertices': graph.vcount(), 'case': 'drag', 'mode': mode,
+            'ms/frame': 1000 * np.mean(times), 'max ms': 1000 * np.max(times), 'drop ms': 1000 * drop}
+
+
+CASES = {'build': (build_case, BUILD_MODES), 'pan': (pan_case, PAN_MODES), 'drag': (drag_case, BUILD_MODES)}
+
+
+def run_case(queue, case, kind, size, mode):
+    queue.put(CASES[case][0](kind, size, mode))
+
+
+def run(sizes, kinds, cases):
+    context = multiprocessing.get_context('spawn')
+    for case in cases:
+        for kind in kinds:
+            for size in sizes:
+                for mode in CASES[case][1]:
+                    # Not a pool: its workers are daemons, and the window starts processes of its own for jobs
+                    queue = context.Queue()
+                    process = context.Process(target=run_case, args=(queue, case, kind, size, mode))
+                    process.start()
+                    process.join()
+                    if process.exitcode:
+                        row = {'graph': kind, 'vertices': size, 'case': case, 'mode': mode,
+                               'failed': 'exit code {}'.format(process.exitcode)}
+                    else:
+                        row = queue.get()
+                    print("  ".join("{}: {:.3f}".format(key, value) if isinstance(value, float) else
+                                    "{}: {}".format(key, value) for key, value in row.items()), flush=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the scene on synthetic graphs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 200000])
+    parser.add_argument('--kinds', nargs='+', default=['mesh', 'scale_free'], choices=['mesh', 'scale_free'])
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    arguments = parser.parse_args()
+    run(arguments.sizes, arguments.kinds, arguments.cases)
@@ -0,0 +1,105 @@
+from PyQt5 import uic
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtWidgets import QDialog, QPushButton, QTableWidget, QTableWidgetItem, QLabel, QMessageBox, \
+    QAbstractItemView
+
+from backend.clustering import compare_clusterings
+
+
+class ComparisonThread(QThread):
+    # {str: dict}, see compare_clusterings
+    compared = pyqtSignal(object)
+
+    def __init__(self, graph, algorithms, timeout):
+        super().__init__()
+        self.graph = graph
+        self.algorithms = algorithms
+        self.timeout = timeout
+
+    def run(self):
+        # Only waits for the worker processes, which do the work
+        self.compared.emit(compare_clusterings(self.graph, self.algorithms, self.timeout))
+
+
+class ClusteringComparisonDialog(QDialog):
+    COLUMNS = ['Algorithm', 'Seconds', 'Peak memory (MB)', 'Clusters', 'Modularity', 'Status']
+    # Seconds each algorithm may run
+    TIMEOUT = 300
+
+    def __init__(self, parent):
+        super().__init__(flags=Qt.WindowCloseButtonHint)
+        self.parent = parent
+
+        uic.loadUi('frontend/resource/uis/dialogClusteringComparison.ui', self)
+        self.setWindowTitle("Compare clustering algorithms")
+
+        self.graph = parent.displayed_graph()
+        self.names = list(parent.CLUSTERING_ALGORITHMS.keys())
+        self.results = {}
+
+        self.table = self.findChild(QTableWidget, 'table')
+        self.table.setColumnCount(len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setRowCount(len(self.names))
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        for row, name in enumerate(self.names):
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+
+        self.status = self.findChild(QLabel, 'status')
+        self.status.setText("Running {} algorithms...".format(len(self.names)))
+
+        self.button_apply = self.findChild(QPushButton, 'apply')
+        self.button_apply.clicked.connect(self.apply_selected)
+        self.button_apply.setEnabled(False)
+        self.button_close = self.findChild(QPushButton, 'close')
+        self.button_close.clicked.connect(self.hide)
+
+        self.thread = ComparisonThread(
+            self.graph, [parent.CLUSTERING_ALGORITHMS[name] for name in self.names], self.TIMEOUT
+        )
+        self.thread.compared.connect(self.show_results)
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread.isRunning()
+
+    def show_results(self, results):
+        self.results = results
+        for row, name in enumerate(self.names):
+            result = results[self.parent.CLUSTERING_ALGORITHMS[name]]
+            if result['status'] == 'ok':
+                peak = result['peak_memory']
+                cells = [
+                    "{:.2f}".format(result['seconds']),
+                    "{:.1f}".format(peak / 2 ** 20) if peak is not None else "-",
+                    str(result['clusters']),
+                    "{:.4f}".format(result['modularity'])
+                ]
+            else:
+                cells = ["-"] * 4
+            for column, text in enumerate(cells + [result['status']], start=1):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+        self.table.resizeColumnsToContents()
+        self.status.setText("Select an algorithm to apply its clustering")
+        self.button_apply.setEnabled(True)
+
+    def apply_selected(self):
+        row = self.table.currentRow()
+        if row < 0:
+            QMessageBox.about(self, "Invalid Input", "No algorithm is selected")
+            return
+
+        name = self.names[row]
+        algorithm = self.parent.CLUSTERING_ALGORITHMS[name]
+        result = self.results.get(algorithm, {})
+        if result.get('status') != 'ok':
+            QMessageBox.about(self, "Invalid Input", "{} has no result to apply".format(name))
+        elif self.graph is not self.parent.displayed_graph() or self.graph.vcount() != len(result['membership']):
+            QMessageBox.about(self, "Sorry", "The graph has changed since the comparison was run")
+        else:
+            # The membership is handed over as is, nothing runs again
+            self.parent.apply_clustering(self.graph, algorithm, result['membership'])
+            self.parent.BUTTON_CLUSTERING.setCurrentText(name)
@@ -1,3 +1,4 @@
+from PyQt5.QtGui import QPen
 from PyQt5.QtWidgets import QGraphicsLineItem
 
 
@@ -20,9 +21,24 @@ class MainEdge(QGraphicsLineItem):
         point_a.attach_line(self)
         point_b.attach_line(self)
 
+    def setPen(self, pen):
+        super().setPen(pen)
+        self.parent.line_width_changed(self, pen.widthF())
+
     def stick(self):
         self.setLine(self.point_a.x(), self.point_a.y(), self.point_b.x(), self.point_b.y())
 
+    def rebind(self, edge, point_a, point_b, pen):
+        # Reuse the item for another edge, see MainScene.cull
+        self.edge = edge
+        self.point_a = point_a
+        self.point_b = point_b
+        point_a.attach_line(self)
+        point_b.attach_line(self)
+        self._highlighted = False
+        self.set_default_pen(pen)
+        self.stick()
+
     def mousePressEvent(self, event):
         self.parent.parent.main_window.display_link(self)
 
@@ -32,13 +48,34 @@ class MainEdge(QGraphicsLineItem):
     def mouseReleaseEvent(self, event):
         pass
 
+    def paint(self, painter, option, widget=None):
+        if not self.parent.should_paint(self):
+            return
+        if not self.parent.low_detail or self._highlighted:
+            super().paint(painter, option, widget)
+            return
+
+        if option.levelOfDetailFromTransform(painter.worldTransform()) * self.line().length() < 1:
+            return  # shorter than a pixel
+        pen = QPen(self.pen())
+        pen.setWidth(0)  # cosmetic, one pixel wide whatever the zoom
+        painter.setPen(pen)
+        painter.drawLine(self.line())
+
     def highlight_self(self):
         pen = self.pen()
         pen.setColor(self.parent.COLORS[self.parent.parent.SETTINGS['highlight_color']])
         self.setPen(pen)
+        self.parent.set_live(self, True)
 
     def unhighlight_self(self):
         self.setPen(self._pen)
+        self.parent.set_live(self, False)
+
+    def set_default_pen(self, pen):
+        self._pen = pen
+        if not self._highlighted:
+            self.setPen(pen)
 
     def setHighlighted(self, boolean):
         self._highlighted = boolean
@@ -0,0 +1,278 @@
+import numpy as np
+from PyQt5.QtCore import QRectF, QLineF
+from PyQt5.QtGui import QPen, QColor
+from PyQt5.QtWidgets import QGraphicsItem
+
+from frontend import palette
+from frontend.utils import group_rows
+
+
+class EdgeLayer(QGraphicsItem):
+    """
+    Draws all edges of a scene as one graphics item. Endpoints, widths and colors live in NumPy arrays with one row per
+    edge, and edges sharing the same pen are painted with a single drawLines call. Edges temporarily drawn in another
+    style than their default one (highlighted, real time mode) are painted again on top, so hovering an edge does not
+    regroup the whole layer
+    """
+    HIT_TOLERANCE = 0.5
+
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+
+        self.coords = np.zeros((0, 4))
+        self.colors = np.zeros(0, dtype=np.uint32)
+        self.widths = np.zeros(0)
+        self.default_colors = np.zeros(0, dtype=np.uint32)
+        self.default_widths = np.zeros(0)
+        self.visible = np.zeros(0, dtype=bool)
+        self.handles = []
+
+        self._lines = []
+        self._batches = None
+        self._overrides = set()
+        self._overlay = None
+        self._bounds = QRectF()
+
+    def add_edges(self, edges, points_a, points_b, pens, coords=None):
+        """
+        Append edges to the layer
+
+        :param edges: [igraph.Edge], edges to draw
+        :param points_a: [MainVertex], source point of each edge
+        :param points_b: [MainVertex], target point of each edge
+        :param pens: [QPen], default pen of each edge
+        :param coords: numpy.ndarray or None, (E, 4) x_a, y_a, x_b, y_b of each edge if already known, read from the
+        points otherwise
+        :return: [LayerEdge], one handle per appended edge
+        """
+        first_row = len(self.handles)
+        if coords is None:
+            coords = [(a.x(), a.y(), b.x(), b.y()) for a, b in zip(points_a, points_b)]
+        coords = np.array(coords, dtype=float).reshape(-1, 4)
+        colors = np.array([pen.color().rgba() for pen in pens], dtype=np.uint32)
+        widths = np.array([pen.widthF() for pen in pens], dtype=float)
+
+        self.coords = np.concatenate([self.coords, coords])
+        self.colors = np.concatenate([self.colors, colors])
+        self.widths = np.concatenate([self.widths, widths])
+        self.default_colors = np.concatenate([self.default_colors, colors])
+        self.default_widths = np.concatenate([self.default_widths, widths])
+        self.visible = np.concatenate([self.visible, np.ones(len(coords), dtype=bool)])
+        self._lines.extend(QLineF(*row) for row in coords.tolist())
+
+        handles = [
+            LayerEdge(edge, point_a, point_b, self, first_row + i)
+            for i, (edge, point_a, point_b) in enumerate(zip(edges, points_a, points_b))
+        ]
+        self.handles.extend(handles)
+
+        self._batches = None
+        self.grow_bounds(coords, widths)
+        return handles
+
+    def grow_bounds(self, coords, widths):
+        if not len(coords):
+            return
+
+        pad = widths.max() / 2
+        rect = QRectF(
+            min(coords[:, 0].min(), coords[:, 2].min()) - pad, min(coords[:, 1].min(), coords[:, 3].min()) - pad,
+            0, 0
+        )
+        rect.setRight(max(coords[:, 0].max(), coords[:, 2].max()) + pad)
+        rect.setBottom(max(coords[:, 1].max(), coords[:, 3].max()) + pad)
+
+        if not self._bounds.contains(rect):
+            self.prepareGeometryChange()
+            self._bounds = self._bounds.united(rect) if not self._bounds.isNull() else rect
+
+    def set_line(self, row, x_a, y_a, x_b, y_b):
+        old_rect = self.row_rect(row)
+        self.coords[row] = (x_a, y_a, x_b, y_b)
+        self._lines[row].setLine(x_a, y_a, x_b, y_b)
+
+        self.grow_bounds(self.coords[row:row + 1], self.widths[row:row + 1])
+        self.update(old_rect.united(self.row_rect(row)))
+
+    def set_lines(self, rows, coords):
+        """
+        Move several edges at once, checking the bounds and scheduling a repaint only once
+
+        :param rows: [int], rows of the edges to move
+        :param coords: [(float, float, float, float)], new x_a, y_a, x_b, y_b of each edge
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        coords = np.asarray(coords, dtype=float).reshape(-1, 4)
+        if not rows.size:
+            return
+
+        old_rect = self.rows_rect(rows)
+        self.coords[rows] = coords
+        for row, (x_a, y_a, x_b, y_b) in zip(rows.tolist(), coords.tolist()):
+            self._lines[row].setLine(x_a, y_a, x_b, y_b)
+
+        self.grow_bounds(coords, self.widths[rows])
+        self.update(old_rect.united(self.rows_rect(rows)))
+
+    def rows_rect(self, rows):
+        coords = self.coords[rows]
+        pad = self.widths[rows].max() / 2
+        x_min = min(coords[:, 0].min(), coords[:, 2].min()) - pad
+        y_min = min(coords[:, 1].min(), coords[:, 3].min()) - pad
+        x_max = max(coords[:, 0].max(), coords[:, 2].max()) + pad
+        y_max = max(coords[:, 1].max(), coords[:, 3].max()) + pad
+        return QRectF(x_min, y_min, x_max - x_min, y_max - y_min)
+
+    def row_rect(self, row):
+        x_a, y_a, x_b, y_b = self.coords[row]
+        pad = self.widths[row] / 2
+        return QRectF(min(x_a, x_b) - pad, min(y_a, y_b) - pad, abs(x_b - x_a) + 2 * pad, abs(y_b - y_a) + 2 * pad)
+
+    def pen(self, row):
+        pen = QPen(QColor.fromRgba(int(self.colors[row])))
+        pen.setWidthF(self.widths[row])
+        return pen
+
+    def set_style(self, row, color, width, current=True, default=False):
+        if default:
+            self.default_colors[row] = color.rgba()
+            self.default_widths[row] = width
+            self._batches = None
+        if current:
+            self.colors[row] = color.rgba()
+            self.widths[row] = width
+            self.grow_bounds(self.coords[row:row + 1], self.widths[row:row + 1])
+            self.parent.line_width_changed(self.handles[row], width)
+        self.restyled(row)
+
+    def restore_style(self, row):
+        self.colors[row] = self.default_colors[row]
+        self.widths[row] = self.default_widths[row]
+        self.parent.line_width_changed(self.handles[row], self.widths[row])
+        self.restyled(row)
+
+    def restyled(self, row):
+        # Keep track of the rows not drawn in their default style
+        if self.colors[row] != self.default_colors[row] or self.widths[row] != self.default_widths[row]:
+            self._overrides.add(row)
+        elif row in self._overrides:
+            # Back to its default style, the row is drawn from the cached static part again
+            self._overrides.discard(row)
+            self.parent.static_changed(self.row_rect(row))
+        self._overlay = None
+        self.update(self.row_rect(row))
+
+    def set_visible(self, row, visible):
+        self.visible[row] = visible
+        self._batches = None
+        self._overlay = None
+        self.update(self.row_rect(row))
+        self.parent.static_changed(self.row_rect(row))
+
+    def edge_at(self, pos, tolerance=HIT_TOLERANCE):
+        """
+        Find the edge drawn under a point
+
+        :param pos: QPointF, point in scene coordinates
+        :param tolerance: float, how far (in scene units) outside of its stroke an edge can still be hit
+        :return: LayerEdge or None
+        """
+        scene = self.parent
+        if scene.edge_index is None:
+            return None
+        # The scene index holds the edges of the layer and the edges drawn as items
+        line_id = scene.edge_index.nearest(pos.x(), pos.y(), tolerance)
+        line = None if line_id is None else scene.indexed_lines[line_id]
+        return line if isinstance(line, LayerEdge) and line.layer is self else None
+
+    def batches(self):
+        # Group the visible edges by their default pen, so that each group can be drawn with one call
+        if self._batches is None:
+            self._batches = self.group(np.flatnonzero(self.visible), self.default_colors, self.default_widths)
+        return self._batches
+
+    def overlay(self):
+        if self._overlay is None:
+            rows = [row for row in self._overrides if self.visible[row]]
+            self._overlay = self.group(rows, self.colors, self.widths)
+        return self._overlay
+
+    def group(self, rows, colors, widths):
+        batches = []
+        for row, group in group_rows(rows, colors, widths):
+            batches.append((palette.pen(colors[row], widths[row]), [self._lines[i] for i in group]))
+        return batches
+
+    def boundingRect(self):
+        return self._bounds
+
+    def contains(self, point):
+        return self.edge_at(point) is not None
+
+    def paint(self, painter, option, widget=None):
+        draw_static, draw_live = self.parent.layer_passes()
+        for pen, lines in (self.batches() if draw_static else []) + (self.overlay() if draw_live else []):
+            if self.parent.low_detail:
+                pen = QPen(pen)
+                pen.setWidth(0)  # cosmetic, one pixel wide whatever the zoom
+            painter.setPen(pen)
+            painter.drawLines(lines)
+
+
+class LayerEdge:
+    """
+    Stands in for a MainEdge when the edge is drawn by an EdgeLayer, so the rest of the scene can treat both the same
+    way
+    """
+
+    def __init__(self, edge, point_a, point_b, layer, row):
+        self.edge = edge
+        self.point_a = point_a
+        self.point_b = point_b
+        self.layer = layer
+        self.row = row
+        self.parent = layer.parent
+
+        self._highlighted = False
+        point_a.attach_line(self)
+        point_b.attach_line(self)
+
+    def stick(self):
+        self.layer.set_line(self.row, self.point_a.x(), self.point_a.y(), self.point_b.x(), self.point_b.y())
+
+    def pen(self):
+        return self.layer.pen(self.row)
+
+    def setPen(self, pen):
+        self.layer.set_style(self.row, pen.color(), pen.widthF())
+
+    def mousePressEvent(self, event):
+        self.parent.parent.main_window.display_link(self)
+
+    def mouseMoveEvent(self, event):
+        pass
+
+    def mouseReleaseEvent(self, event):
+        pass
+
+    def highlight_self(self):
+        pen = self.pen()
+        pen.setColor(self.parent.COLORS[self.parent.parent.SETTINGS['highlight_color']])
+        self.setPen(pen)
+
+    def unhighlight_self(self):
+        self.layer.restore_style(self.row)
+
+    def set_default_pen(self, pen):
+        self.layer.set_style(self.row, pen.color(), pen.widthF(), current=not self._highlighted, default=True)
+
+    def setHighlighted(self, boolean):
+        self._highlighted = boolean
+
+    def isHighlighted(self):
+        return self._highlighted
+
+    @staticmethod
+    def isPersistent():
+        return False
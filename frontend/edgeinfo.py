@@ -77,4 +77,4 @@ class EdgeInfo(QWidget):
             self.edge[i] = new_value
 
         update_edge(self.parent.graph, self.edge)
-        self.parent.view.update_view()
+        self.parent.view.update_view(edges=[self.edge.index])
@@ -0,0 +1,105 @@
+import multiprocessing
+
+from PyQt5.QtCore import QObject, QTimer, Qt
+from PyQt5.QtWidgets import QProgressDialog, QMessageBox
+
+
+class JobRunner(QObject):
+    """
+    Runs long computations (layouts, clusterings) in worker processes, so the window stays responsive and the GIL is not
+    held by them. A progress dialog with a cancel button is shown while jobs run, and results are handed back on the GUI
+    thread. There is at most one job of each kind: submitting one drops the result of the previous one
+    """
+    WORKERS = 2
+    # How often (ms) finished jobs are looked for
+    POLL_INTERVAL = 100
+    # Jobs finishing sooner than this (ms) do not show the progress dialog
+    MIN_DURATION = 500
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.window = parent
+        self.pool = None
+        # kind -> (multiprocessing.pool.AsyncResult, callable(result), callable() -> bool)
+        self.jobs = {}
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.POLL_INTERVAL)
+        self.timer.timeout.connect(self.poll)
+
+        self.dialog = None
+
+    def submit(self, kind, function, args, on_done, is_current=None, label="Working..."):
+        """
+        Run a function in a worker process
+
+        :param kind: str, kind of the job, e.g. "layout"
+        :param function: callable, module level function, so it can be sent to the workers
+        :param args: tuple, arguments of the function, they must be picklable
+        :param on_done: callable(result), called on the GUI thread with the result
+        :param is_current: callable() -> bool or None, called when the result arrives. False means what the job was
+        computed from has changed meanwhile, and the result is dropped
+        :param label: str, text of the progress dialog
+        """
+        if self.pool is None:
+            # Forking a process running Qt is unsafe, workers are started fresh
+            self.pool = multiprocessing.get_context('spawn').Pool(self.WORKERS)
+
+        self.jobs[kind] = (self.pool.apply_async(function, args), on_done, is_current)
+        self.timer.start()
+        self.show_progress(label)
+
+    def show_progress(self, label):
+        if self.dialog is None:
+            self.dialog = QProgressDialog(label, "Cancel", 0, 0, self.window)
+            self.dialog.setWindowModality(Qt.WindowModal)
+            self.dialog.setMinimumDuration(self.MIN_DURATION)
+            self.dialog.canceled.connect(self.cancel)
+        else:
+            self.dialog.setLabelText(label)
+        self.dialog.reset()
+        self.dialog.setValue(0)
+
+    def hide_progress(self):
+        if self.dialog is not None:
+            self.dialog.canceled.disconnect(self.cancel)
+            self.dialog.close()
+            self.dialog.deleteLater()
+            self.dialog = None
+
+    def poll(self):
+        for kind, (result, on_done, is_current) in list(self.jobs.items()):
+            if not result.ready():
+                continue
+            del self.jobs[kind]
+
+            try:
+                value = result.get()
+            except Exception as e:
+                QMessageBox.warning(self.window, '', "{} failed: {}".format(kind.capitalize(), e))
+                continue
+
+            if is_current is None or is_current():
+                on_done(value)
+
+        if not self.jobs:
+            self.timer.stop()
+            self.hide_progress()
+
+    def cancel(self):
+        """
+        Stop every running job. Their results are never applied
+        """
+        self.jobs.clear()
+        self.timer.stop()
+        self.hide_progress()
+        self.shutdown()
+
+    def shutdown(self):
+        # Terminating is the only way of stopping a job already started, new workers are spawned for the next one
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def is_running(self, kind):
+        return kind in self.jobs
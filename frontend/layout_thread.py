@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+from PyQt5.QtCore import QThread, QMutex, QMutexLocker, pyqtSignal
+
+from backend.force_layout import natural_length, fruchterman_reingold_step, repulsion_for
+
+
+class LayoutThread(QThread):
+    """
+    Runs a Fruchterman-Reingold layout starting from the current vertex coordinates, and sends the intermediate
+    coordinates a few times per second so the graph can be seen settling. It can be paused, and vertices can be pinned
+    where the user dropped them while it runs
+    """
+    # (V, 2) numpy.ndarray of graph coordinates, sent while the layout runs and once it has converged
+    positions_ready = pyqtSignal(object)
+    converged = pyqtSignal(object)
+
+    STREAM_FPS = 5
+    MAX_ITERATIONS = 500
+    COOLING = 0.98
+    # The layout has converged when vertices may not move more than this fraction of the natural edge length
+    MIN_TEMPERATURE = 0.01
+
+    def __init__(self, graph, parent):
+        super().__init__(parent)
+        # QObject.parent() is the parent given to QThread, the window is kept under another name
+        self.window = parent
+        self.graph = graph
+
+        self.positions = np.column_stack([graph.vs['x'], graph.vs['y']]).astype(float)
+        self.edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+
+        self.paused = False
+        self.stopped = False
+        self.mutex = QMutex()
+        self.pins = {}
+
+    def pin(self, vertex_id, x, y):
+        """
+        Hold a vertex at a position for the rest of the layout
+
+        :param vertex_id: int, id of the vertex
+        :param x: float, x graph coordinate
+        :param y: float, y graph coordinate
+        """
+        with QMutexLocker(self.mutex):
+            self.pins[vertex_id] = (x, y)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def stop(self):
+        self.stopped = True
+        self.wait()
+
+    def run(self):
+        # Pins are written into the array, which must not be the one the window handed over
+        positions = self.positions.copy()
+        k = natural_length(positions)
+        repulse = repulsion_for(len(positions))
+        temperature = 0.1 * max(np.ptp(positions, axis=0).max() if len(positions) else 0, k)
+        last_sent = time.monotonic()
+
+        for _ in range(self.MAX_ITERATIONS):
+            while self.paused and not self.stopped:
+                self.msleep(50)
+            if self.stopped:
+                return
+            if temperature < self.MIN_TEMPERATURE * k:
+                break
+
+            with QMutexLocker(self.mutex):
+                pins = dict(self.pins)
+            for vertex_id, pos in pins.items():
+                positions[vertex_id] = pos
+
+            positions = fruchterman_reingold_step(positions, self.edges, k, temperature, list(pins), repulse)
+            temperature *= self.COOLING
+
+            now = time.monotonic()
+            if now - last_sent >= 1.0 / self.STREAM_FPS:
+                last_sent = now
+                self.positions_ready.emit(positions.copy())
+
+        self.converged.emit(positions.copy())
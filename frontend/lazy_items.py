@@ -0,0 +1,50 @@
+class LazyItems:
+    """
+    Stands in for the list of points or lines of a scene whose items are only created when needed. Indexing it creates
+    the missing item, released items go to a pool and are reused for the next ones created instead of being thrown away
+    """
+
+    def __init__(self, count, create):
+        """
+        :param count: int, number of items the sequence stands for
+        :param create: callable(int, item or None), creates the item of an id, reusing the given released item if any
+        """
+        self.items = [None] * count
+        self.created = set()
+        self.pool = []
+        self.create = create
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, item_id):
+        item = self.items[item_id]
+        if item is None:
+            item = self.create(item_id, self.pool.pop() if self.pool else None)
+            self.items[item_id] = item
+            self.created.add(item_id)
+        return item
+
+    def __iter__(self):
+        # Going over all of the items creates all of them
+        for item_id in range(len(self.items)):
+            yield self[item_id]
+
+    def get(self, item_id):
+        """
+        :return: the item of an id, or None if it has not been created
+        """
+        return self.items[item_id]
+
+    def extend(self, count):
+        self.items.extend([None] * count)
+
+    def release(self, item_id):
+        item = self.items[item_id]
+        self.items[item_id] = None
+        self.created.discard(item_id)
+        self.pool.append(item)
+        return item
+
+    def created_items(self):
+        return [self.items[item_id] for item_id in self.created]
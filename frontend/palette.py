@@ -0,0 +1,109 @@
+import numbers
+
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QPen, QBrush
+
+# Colors are stored as style codes: 0xAARRGGBB integers (QColor.rgba()) whose channels are rounded to multiples of
+# COLOR_STEP. Pen widths are rounded to 1 / WIDTH_STEPS. Every (code, width) pair is then turned into a QPen only once
+# and shared by all the items drawn with it, so a gradient over many edges only needs a few hundred pens
+COLOR_STEP = 8
+WIDTH_STEPS = 10
+
+_pens = {}
+_brushes = {}
+_codes = {}
+
+
+def quantize_channel(channel):
+    return np.minimum(np.round(np.asarray(channel, dtype=float) / COLOR_STEP) * COLOR_STEP, 255).astype(np.uint32)
+
+
+def rgba_codes(red, green, blue, alpha=255):
+    """
+    Turn channel values into style codes
+
+    :param red: int, float or numpy.ndarray, red channel(s) in [0, 255]
+    :param green: int, float or numpy.ndarray, green channel(s) in [0, 255]
+    :param blue: int, float or numpy.ndarray, blue channel(s) in [0, 255]
+    :param alpha: int, float or numpy.ndarray, alpha channel(s) in [0, 255]
+    :return: numpy.ndarray, one uint32 code per color
+    """
+    return (
+        (quantize_channel(alpha) << 24) | (quantize_channel(red) << 16) |
+        (quantize_channel(green) << 8) | quantize_channel(blue)
+    )
+
+
+def quantize(rgba):
+    # Called once per edge while a scene is built, so on the few colors a graph has over and over
+    rgba = int(rgba) & 0xFFFFFFFF
+    code = _codes.get(rgba)
+    if code is None:
+        # Like np.round in rgba_codes, round() rounds halves to even
+        code = 0
+        for shift in (24, 16, 8, 0):
+            code |= min(round(((rgba >> shift) & 0xFF) / COLOR_STEP) * COLOR_STEP, 255) << shift
+        _codes[rgba] = code
+    return code
+
+
+def color_code(value, default=None):
+    """
+    Find the style code of a color given in any of the forms found in graph attributes
+
+    :param value: int, float, QColor, QBrush, Qt.GlobalColor or color name
+    :param default: int or None, code to return when the value is not a color
+    :return: int or None
+    """
+    if isinstance(value, Qt.GlobalColor):
+        value = QColor(value)
+    if isinstance(value, QBrush):
+        value = value.color()
+    if isinstance(value, QColor):
+        return quantize(value.rgba()) if value.isValid() else default
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return quantize(value)
+    if isinstance(value, str) and QColor.isValidColor(value):
+        return quantize(QColor(value).rgba())
+    return default
+
+
+def quantize_width(width):
+    return round(float(width) * WIDTH_STEPS) / WIDTH_STEPS
+
+
+def color(code):
+    return QColor.fromRgba(int(code))
+
+
+def pen(code, width):
+    """
+    Shared pen of a style. Do not modify it, copy it first (QPen(pen)) if needed
+
+    :param code: int, style code of the color
+    :param width: float, width of the pen
+    :return: QPen
+    """
+    key = (int(code), quantize_width(width))
+    shared = _pens.get(key)
+    if shared is None:
+        shared = QPen(color(key[0]))
+        shared.setWidthF(key[1])
+        _pens[key] = shared
+    return shared
+
+
+def brush(code):
+    """
+    Shared brush of a style. Do not modify it, copy it first (QBrush(brush)) if needed
+
+    :param code: int, style code of the color
+    :return: QBrush
+    """
+    code = int(code)
+    shared = _brushes.get(code)
+    if shared is None:
+        shared = QBrush(color(code))
+        _brushes[code] = shared
+    return shared
@@ -1,16 +1,26 @@
 from __future__ import division
+from collections.abc import Hashable
 
+import numpy as np
 from PyQt5.QtCore import *
-from PyQt5.QtGui import QPen, QColor, QBrush, QTransform
+from PyQt5.QtGui import QColor, QBrush, QGuiApplication
 from PyQt5.QtWidgets import QGraphicsScene, QRubberBand, QGraphicsView
-from igraph import VertexDendrogram, Graph
+from igraph import Graph
 
+from backend import shortest_paths
+from backend.clustering import get_membership, get_membership_incrementally
 from backend.edge import create_edges
 from backend.vertex import create_vertices
+from frontend import palette
 from frontend.edge import MainEdge
+from frontend.edge_layer import EdgeLayer, LayerEdge
+from frontend.lazy_items import LazyItems
 from frontend.selection_list import SelectionList
+from frontend.spatial_index import GridIndex, SegmentIndex
+from frontend.super_nodes import SuperNodes, SuperNode
 from frontend.utils import *
 from frontend.vertex import MainVertex
+from frontend.vertex_layer import VertexLayer, LayerVertex
 
 
 class MainScene(QGraphicsScene):
@@ -23,6 +33,12 @@ class MainScene(QGraphicsScene):
         'dark_gray': QColor(Qt.darkGray), 'light_gray': QColor(Qt.lightGray)
     }
 
+    # Pace of drag updates when the screen does not report its refresh rate
+    DEFAULT_REFRESH_RATE = 60
+
+    # With lazy items, items are created this far (relative to the size of the view) around what is visible
+    CULL_MARGIN = 0.5
+
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
@@ -31,15 +47,55 @@ class MainScene(QGraphicsScene):
         self.graph_to_display = None
         self.default_graph = None
         self.clustering_algorithm = None
+        self.availability = None
         self.graph_center = None
         self.scale_factor = None
+        # Scene coordinates of the vertices, one row per vertex id. Items are placed from it
+        self.positions = None
         self.scene_graph_rect = None
 
         self.points = []
         self.lines = []
+        self.vertex_layer = None
+        self.edge_layer = None
+
+        # Spatial indexes answering hover, click and rubber band queries. Ids are positions in indexed_points and
+        # indexed_lines, which only ever grow while the scene lives
+        self.vertex_index = None
+        self.edge_index = None
+        self.indexed_points = []
+        self.indexed_lines = []
+        self.point_ids = {}
+        self.line_ids = {}
         self.vertex_to_display = []
         self.edge_to_display = []
 
+        # With lazy items, points and lines are LazyItems and only the items around the visible region exist
+        self.culling = False
+        self.culled_rect = QRectF()
+        self.edge_ends = None
+        self.cull_timer = QTimer(self)
+        self.cull_timer.setSingleShot(True)
+        self.cull_timer.timeout.connect(lambda: self.cull(self.parent.visible_scene_rect()))
+        # With cluster super-nodes, collapsed clusters are drawn as one item each (see SuperNodes)
+        self.super_nodes = None
+
+        self.low_detail = False
+
+        # With cached rendering on, the static part of the scene is drawn from tiles and only the live items (the ones
+        # highlighted or being blinked) paint themselves on top of them
+        self.rendering_tiles = False
+        self.live_items = set()
+        # Edges created while the real time mode runs are live from the start
+        self.lines_live = False
+        self.dragged_item = None
+
+        # Mouse moves of a dragged vertex are coalesced, at most one is applied per display frame
+        self.drag_timer = QTimer(self)
+        self.drag_timer.setSingleShot(True)
+        self.drag_timer.timeout.connect(self.flush_drag)
+        self._drag_target = None
+
         self._move = False
         self.highlighted_item = None
         self.selected_item = None
@@ -50,113 +106,435 @@ class MainScene(QGraphicsScene):
         self.init_variables()
 
     def add_link(self, edge):
+        self.drop_super_nodes()
+        if self.culling:
+            self.edge_ends = np.vstack([self.edge_ends, [edge.tuple]])
+            self.edge_index.extend([self.edge_coords(edge.index)], [edge['edge_width']])
+            self.lines.extend(1)
+            self.static_changed(self.line_rect(self.lines[edge.index]))
+            self.edited()
+            return
+
         point_a = self.points[edge.source]
         point_b = self.points[edge.target]
-        line_pen = QPen(self.COLORS[edge['edge_color']])
-        line_pen.setWidth(edge['edge_width'])
-        line = MainEdge(edge, point_a, point_b, line_pen, self)
-        self.addItem(line)
+        if self.edge_layer is not None:
+            line, = self.edge_layer.add_edges([edge], [point_a], [point_b], [self.edge_pen(edge)])
+        else:
+            line = MainEdge(edge, point_a, point_b, self.edge_pen(edge), self)
+            self.addItem(line)
         self.lines.append(line)
+        self.index_items(lines=[line])
+        self.static_changed(self.line_rect(line))
+        self.edited()
 
     def add_node(self, vertex):
-        point_pen = QPen(self.COLORS['black'])
-        point_pen.setWidth(self.parent.SETTINGS['point_border_width'])
+        point_pen = self.point_pen()
         d = self.parent.SETTINGS['point_diameter']
-        point = MainVertex(vertex, d, point_pen, vertex['color'], self)
-        self.addItem(point)
+        vertex['color'] = palette.color_code(vertex['color'], default=self.color_code('red'))
+        pos = dilate(vertex['x'], vertex['y'], self.graph_center, self.scale_factor)
+        self.positions = np.vstack([self.positions, [pos]])
+        self.drop_super_nodes()
+        if self.culling:
+            self.vertex_index.extend([pos])
+            self.points.extend(1)
+            point = self.points[vertex.index]
+            self.static_changed(self.point_rect(point.x(), point.y()))
+            self.edited()
+            return
+
+        if self.vertex_layer is not None:
+            point, = self.vertex_layer.add_vertices([vertex], [pos], d, point_pen, [vertex['color']])
+        else:
+            point = MainVertex(vertex, pos, d, point_pen, palette.brush(vertex['color']), self)
+            self.addItem(point)
         self.points.append(point)
+        self.index_items(points=[point])
+        self.static_changed(self.point_rect(point.x(), point.y()))
+        self.edited()
 
     def init_variables(self):
         self.graph_to_display = self.parent.main_window.graph
-        self.default_graph = self.graph_to_display.copy()
         self.clustering_algorithm = self.parent.main_window.clustering_algorithm
+        self.availability = self.parent.availability
 
-        graph_rect = QRectF(
-            QPointF(min(self.graph_to_display.vs['x']), min(self.graph_to_display.vs['y'])),
-            QPointF(max(self.graph_to_display.vs['x']), max(self.graph_to_display.vs['y']))
-        )
-        self.graph_center = QPointF(graph_rect.center())
-        self.scale_factor = scale_factor_hint(self.parent.geometry(), graph_rect, 1.05)
-
+        self.update_frame()
         self.init_edge_color_to_default()
         self.set_background_color()
 
+    def update_frame(self):
+        """
+        Recompute the graph center and scale factor from the current vertex coordinates
+
+        :return: bool, True if the mapping from graph coordinates to scene coordinates has changed
+        """
+        graph_rect = bounding_rect(self.graph_to_display.vs['x'], self.graph_to_display.vs['y'])
+        graph_center = QPointF(graph_rect.center())
+        scale_factor = scale_factor_hint(self.parent.geometry(), graph_rect, 1.05)
+
+        changed = graph_center != self.graph_center or scale_factor != self.scale_factor
+        self.graph_center = graph_center
+        self.scale_factor = scale_factor
+        return changed
+
+    def project(self):
+        # Place every vertex in scene coordinates at once
+        vs = self.graph_to_display.vs
+        self.positions = dilate_array(vs['x'], vs['y'], self.graph_center, self.scale_factor)
+
     def init_edge_color_to_default(self, ):
-        for edge in self.graph_to_display.es:
-            edge['edge_width'] = self.parent.SETTINGS['edge_width']
-            edge['edge_color'] = self.parent.SETTINGS['edge_color']
+        self.graph_to_display.es['edge_width'] = self.parent.SETTINGS['edge_width']
+        self.graph_to_display.es['edge_color'] = self.color_code(self.parent.SETTINGS['edge_color'])
+
+    def color_code(self, name):
+        # Style code of one of the named COLORS, the form in which colors are kept in graph attributes
+        return palette.color_code(self.COLORS[name])
+
+    def point_pen(self):
+        return palette.pen(self.color_code('black'), self.parent.SETTINGS['point_border_width'])
 
     def set_background_color(self):
         background_color = QBrush(QColor(self.COLORS[self.parent.SETTINGS['background_color']]))
         self.setBackgroundBrush(background_color)
 
     def display(self):
-        def availability_color_to_vertex():
-            for v in self.graph_to_display.vs:
-                if v['availability']:
-                    v['color'] = QBrush(self.COLORS['green'])
-                else:
-                    v['color'] = QBrush(self.COLORS['red'])
-
-        def assign_color_to_vertex():
-            colors = list(self.COLORS.keys())
-
-            for v in self.graph_to_display.vs:
-                color_index = v['cluster'] % len(colors)
-                if colors[color_index] == self.parent.SETTINGS['highlight_color']:  # highlighted items will stand out
-                    color_index = (color_index + 1) % len(colors)
-                q_color = self.COLORS[colors[color_index]]
-                cluster_color = QBrush(q_color)
-                v['color'] = cluster_color
-
-        def assign_vertex_to_cluster():
-            for v in self.graph_to_display.vs:
-                for cluster in clusters:
-                    # If elements of clusters are not lists, then clusters had been a VertexDendrogram object, which
-                    # gives a "list" of igraph.Graph objects when subgraphed. The VertexClustering object, on the other
-                    # hand, gives a list of lists of vertex ids when subgraphed
-                    if isinstance(cluster, Graph) and v['id'] in cluster.vs['id']:
-                        v['cluster'] = clusters.index(cluster)
-                        break
-                    elif isinstance(cluster, list) and v.index in cluster:
-                        v['cluster'] = clusters.index(cluster)
-                        break
+        self.assign_clusters()
+        self.assign_colors()  # based on the cluster it belongs to
+        self.project()
+
+        if self.parent.SETTINGS['cluster_super_nodes']:
+            # Super-nodes hide the members of collapsed clusters from the spatial indexes, which lazy items draw from
+            self.super_nodes = SuperNodes(self)
+            self.display_lazy()
+        elif self.parent.SETTINGS['lazy_items']:
+            self.display_lazy()
+        else:
+            self.display_vertices()
+            self.display_edges()
+        self.build_index()
+        self.take_snapshot()
+
+    def take_snapshot(self):
+        # What Revert goes back to: the graph as last displayed, with the attributes the scene has given it
+        self.default_graph = self.graph_to_display.copy()
+
+    def assign_clusters(self):
+        # Results are cached by graph structure, so this only clusters again after vertices or edges changed
+        graph_path = self.parent.main_window.graph_path if self.parent.SETTINGS['cluster_sidecar'] else None
+        # After local edits, incremental clustering only re-clusters around them
+        get = get_membership_incrementally if self.parent.SETTINGS['incremental_clustering'] else get_membership
+        self.graph_to_display.vs['cluster'] = get(
+            self.graph_to_display, self.clustering_algorithm, graph_path=graph_path
+        )
 
-        clusters = getattr(self.graph_to_display, self.clustering_algorithm)()
-        # Some clustering algorithms return VertexDendrogram, some return VertexClustering, and VertexDendrogram object
-        # has to be transformed into VertexClustering (as_clustering()) before it can be subgraphed
-        if isinstance(clusters, VertexDendrogram):
-            clusters = clusters.as_clustering()
-        clusters = clusters.subgraphs()
-        assign_vertex_to_cluster()
-        assign_color_to_vertex()  # based on the cluster it belongs to
-        if self.parent.availability:
-            availability_color_to_vertex()
+    def edited(self):
+        shortest_paths.clear_cache()
+        self.parent.main_window.SP_LANDMARKS = None
+        # With incremental clustering, clusters follow edits right away, only the edited neighborhood is re-clustered
+        if self.parent.SETTINGS['incremental_clustering']:
+            self.assign_clusters()
+            self.recolor()
+            self.static_changed()
+
+    def recolor(self):
+        self.assign_colors()
+        if self.vertex_layer is not None:
+            self.vertex_layer.set_default_brushes(
+                [point.row for point in self.points],
+                self.graph_to_display.vs['color'],
+                [not point.isHighlighted() and not point.isPersistent() for point in self.points]
+            )
+        else:
+            for point in self.created(self.points):
+                point.set_default_brush(palette.brush(point.vertex['color']))
+
+    def assign_colors(self):
+        vs = self.graph_to_display.vs
+        if self.availability:
+            available = np.array([bool(availability) for availability in vs['availability']], dtype=bool)
+            vs['color'] = np.where(available, self.color_code('green'), self.color_code('red')).tolist()
+            return
 
-        self.display_vertices()
-        self.display_edges()
+        colors = list(self.COLORS.keys())
+        codes = np.array([self.color_code(name) for name in colors], dtype=np.int64)
+        color_index = np.asarray(vs['cluster'], dtype=np.int64) % len(colors)
+        if self.parent.SETTINGS['highlight_color'] in colors:  # highlighted items will stand out
+            highlight_index = colors.index(self.parent.SETTINGS['highlight_color'])
+            color_index[color_index == highlight_index] = (highlight_index + 1) % len(colors)
+        vs['color'] = codes[color_index].tolist()
 
     def display_vertices(self):
-        point_pen = QPen(self.COLORS['black'])
-        point_pen.setWidth(self.parent.SETTINGS['point_border_width'])
+        if self.parent.SETTINGS['batched_vertices']:
+            self.display_vertex_layer()
+            return
+
+        point_pen = self.point_pen()
         d = self.parent.SETTINGS['point_diameter']
-        for vertex in self.graph_to_display.vs:
-            x, y = dilate(vertex['x'], vertex['y'], self.graph_center, self.scale_factor)
-            vertex['pos'] = {'x': x, 'y': y}
-            point = MainVertex(vertex, d, point_pen, vertex['color'], self)
+        for vertex, pos in zip(self.graph_to_display.vs, self.positions.tolist()):
+            point = MainVertex(vertex, pos, d, point_pen, palette.brush(vertex['color']), self)
             self.addItem(point)
             self.points.append(point)
 
+    def display_vertex_layer(self):
+        point_pen = self.point_pen()
+        d = self.parent.SETTINGS['point_diameter']
+
+        vs = self.graph_to_display.vs
+        self.vertex_layer = VertexLayer(self)
+        self.points = self.vertex_layer.add_vertices(list(vs), self.positions, d, point_pen, vs['color'])
+        self.addItem(self.vertex_layer)
+
+    def display_lazy(self):
+        """
+        Set the scene up to create its items on demand. Nothing is created here: the view asks for the items around
+        the region it shows (see cull), so the first frame costs what is on screen rather than the size of the graph
+        """
+        self.culling = True
+        self.points = LazyItems(self.graph_to_display.vcount(), self.create_point)
+        self.lines = LazyItems(self.graph_to_display.ecount(), self.create_line)
+
     def display_edges(self):
-        for edge in self.graph_to_display.es:
+        if self.parent.SETTINGS['batched_edges']:
+            self.display_edge_layer()
+            return
+
+        es = self.graph_to_display.es
+        for edge, line_pen in zip(es, self.edge_pens(es['edge_color'], es['edge_width'])):
             point_a = self.points[edge.source]
             point_b = self.points[edge.target]
-            line_pen = QPen(self.COLORS[edge['edge_color']])
-            line_pen.setWidth(edge['edge_width'])
             line = MainEdge(edge, point_a, point_b, line_pen, self)
             self.addItem(line)
             self.lines.append(line)
 
+    def display_edge_layer(self):
+        es = self.graph_to_display.es
+        edges = list(es)
+        ends = np.array(self.graph_to_display.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+        self.edge_layer = EdgeLayer(self)
+        self.lines = self.edge_layer.add_edges(
+            edges,
+            [self.points[edge.source] for edge in edges],
+            [self.points[edge.target] for edge in edges],
+            self.edge_pens(es['edge_color'], es['edge_width']),
+            # The points are where the positions say
+            np.hstack([self.positions[ends[:, 0]], self.positions[ends[:, 1]]])
+        )
+        self.addItem(self.edge_layer)
+
+    def edge_pen(self, edge):
+        return self.edge_pens([edge['edge_color']], [edge['edge_width']])[0]
+
+    def edge_pens(self, colors, widths):
+        # Shared pens of edges from their edge_color and edge_width attributes, read for all edges at once when the
+        # scene is built. Edges have a few styles, each is looked up once
+        default = self.color_code(self.parent.SETTINGS['edge_color'])
+        styles = {}
+        pens = []
+        for color, width in zip(colors, widths):
+            key = (color, width) if isinstance(color, Hashable) else None
+            pen = styles.get(key)
+            if pen is None:
+                if isinstance(color, str) and color in self.COLORS:
+                    color = self.COLORS[color]
+                # Edited through the info panel, the color may have been turned into an arbitrary string
+                pen = palette.pen(palette.color_code(color, default=default), width)
+                if key is not None:
+                    styles[key] = pen
+            pens.append(pen)
+        return pens
+
+    def needs_rebuild(self):
+        """
+        A full rebuild is only needed when the items in the scene no longer map one-to-one onto the graph, i.e. a
+        different graph has been loaded or vertices/edges have been added or removed behind the scene's back
+        """
+        graph = self.parent.main_window.graph
+        return graph is not self.graph_to_display or \
+            len(self.points) != graph.vcount() or \
+            len(self.lines) != graph.ecount()
+
+    def refresh(self, vertices=None, edges=None, refit=True):
+        """
+        Apply changes of the graph to the items already in the scene. Without arguments every item is updated, which is
+        what a layout, clustering or availability change needs
+
+        :param vertices: [int] or None, ids of the vertices whose attributes changed
+        :param edges: [int] or None, ids of the edges whose attributes changed
+        :param refit: bool, on a full update, fit the graph to the view again. False keeps the current scale, so a
+        graph being laid out does not jump around
+        """
+        full = vertices is None and edges is None
+        if full:
+            # Re-projecting the whole graph is a single array operation, items then only have to follow
+            if refit:
+                self.update_frame()
+            self.project()
+        if full and self.culling:
+            # Items that do not exist yet will be created from the graph anyway
+            vertices = sorted(self.points.created)
+            edges = sorted(self.lines.created)
+        elif full:
+            vertices = range(len(self.points))
+            edges = range(len(self.lines))
+        else:
+            vertices = vertices or []
+            edges = edges or []
+            for vertex_id in vertices:
+                vertex = self.graph_to_display.vs[vertex_id]
+                self.positions[vertex_id] = dilate(vertex['x'], vertex['y'], self.graph_center, self.scale_factor)
+
+        recolor = False
+        if self.clustering_algorithm != self.parent.main_window.clustering_algorithm:
+            self.clustering_algorithm = self.parent.main_window.clustering_algorithm
+            self.assign_clusters()
+            recolor = True
+        if self.availability != self.parent.availability:
+            self.availability = self.parent.availability
+            recolor = True
+        if recolor:
+            self.recolor()
+
+        lines_to_stick = set()
+        if full and self.vertex_layer is not None:
+            self.vertex_layer.set_positions(
+                [point.row for point in self.points], self.positions[[point.vertex.index for point in self.points]]
+            )
+            lines_to_stick.update(self.lines)
+        else:
+            for vertex_id in vertices:
+                point = self.points[vertex_id]
+                point.move_to(*self.positions[vertex_id])
+                lines_to_stick.update(point.lines)
+
+        for edge_id in edges:
+            line = self.lines[edge_id]
+            line.set_default_pen(self.edge_pen(line.edge))
+            lines_to_stick.add(line)
+
+        self.stick_lines(lines_to_stick)
+
+        if full:
+            self.build_index()
+            self.culled_rect = QRectF()  # the graph has moved under the view, cull again on the next frame
+            self.update()
+        else:
+            self.reindex(self.points[vertex_id] for vertex_id in vertices)
+            self.reindex(lines=lines_to_stick)
+        self.static_changed()
+        # A rebuild used to take the snapshot on every update, the scene now lives through them
+        self.take_snapshot()
+
+    def build_index(self):
+        d = self.parent.SETTINGS['point_diameter']
+        self.vertex_index = GridIndex(cell_size=2 * d)
+        self.edge_index = SegmentIndex(cell_size=4 * d)
+        self.indexed_points = []
+        self.indexed_lines = []
+        self.point_ids = {}
+        self.line_ids = {}
+        if self.culling:
+            self.index_lazy_items()
+        else:
+            self.index_items(self.points, self.lines)
+        if self.super_nodes is not None:
+            self.super_nodes.rebuild(self.parent.current_scale())
+
+    def index_lazy_items(self):
+        # Without items to read them from, positions come from the positions array. Ids are vertex and edge ids
+        positions = self.positions
+        self.edge_ends = np.array(self.graph_to_display.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+        self.vertex_index.extend(positions)
+        self.edge_index.extend(
+            np.hstack([positions[self.edge_ends[:, 0]], positions[self.edge_ends[:, 1]]]),
+            self.graph_to_display.es['edge_width']
+        )
+
+        self.indexed_points = self.points
+        self.indexed_lines = self.lines
+        self.point_ids = {self.points.get(vertex_id): vertex_id for vertex_id in self.points.created}
+        self.line_ids = {self.lines.get(edge_id): edge_id for edge_id in self.lines.created}
+
+        if len(positions):
+            # The scene rect would otherwise only cover the items created so far
+            pad = self.vertex_radius()
+            (x_min, y_min), (x_max, y_max) = positions.min(axis=0), positions.max(axis=0)
+            self.setSceneRect(QRectF(QPointF(x_min - pad, y_min - pad), QPointF(x_max + pad, y_max + pad)))
+
+    def index_items(self, points=(), lines=()):
+        points = list(points)
+        lines = list(lines)
+        if self.vertex_index is None:
+            return
+
+        self.point_ids.update((point, len(self.indexed_points) + i) for i, point in enumerate(points))
+        self.indexed_points.extend(points)
+        # Items of the layers are read from their arrays at once, the other ones one by one
+        if points and all(isinstance(point, LayerVertex) for point in points):
+            self.vertex_index.extend(self.vertex_layer.positions[[point.row for point in points]])
+        else:
+            self.vertex_index.extend([(point.x(), point.y()) for point in points])
+
+        self.line_ids.update((line, len(self.indexed_lines) + i) for i, line in enumerate(lines))
+        self.indexed_lines.extend(lines)
+        if lines and all(isinstance(line, LayerEdge) for line in lines):
+            rows = [line.row for line in lines]
+            self.edge_index.extend(self.edge_layer.coords[rows], self.edge_layer.widths[rows])
+        else:
+            self.edge_index.extend([self.line_coords(line) for line in lines], [line.pen().widthF() for line in lines])
+
+    def reindex(self, points=(), lines=()):
+        for point in points:
+            self.vertex_index.move(self.point_ids[point], point.x(), point.y())
+            if self.culling:
+                # Edges of the vertex that have no item yet still have to follow it in the index
+                for edge_id in self.graph_to_display.incident(point.vertex.index):
+                    if self.lines.get(edge_id) is None:
+                        self.edge_index.move(edge_id, *self.edge_coords(edge_id))
+        for line in lines:
+            self.edge_index.move(self.line_ids[line], *self.line_coords(line))
+
+    def stick_lines(self, lines):
+        # Edges drawn by the edge layer are moved with one call, the other ones one by one
+        layer_lines = [line for line in lines if isinstance(line, LayerEdge)]
+        if layer_lines:
+            rows = [line.row for line in layer_lines]
+            self.edge_layer.set_lines(rows, [self.line_coords(line) for line in layer_lines])
+        for line in lines:
+            if not isinstance(line, LayerEdge):
+                line.stick()
+
+    def line_width_changed(self, line, width):
+        # Hover tests reach as far as the widest stroke in the edge index, keep its widths in step with the pens
+        line_id = self.line_ids.get(line)
+        if line_id is not None:
+            self.edge_index.set_widths(line_id, width)
+
+    @staticmethod
+    def line_coords(line):
+        return line.point_a.x(), line.point_a.y(), line.point_b.x(), line.point_b.y()
+
+    def edge_coords(self, edge_id):
+        source, target = self.edge_ends[edge_id]
+        return tuple(self.positions[source]) + tuple(self.positions[target])
+
+    def point_rect(self, x, y):
+        r = self.vertex_radius() + self.parent.SETTINGS['point_border_width'] * 4
+        return QRectF(x - r, y - r, 2 * r, 2 * r)
+
+    def line_rect(self, line, coords=None):
+        x_a, y_a, x_b, y_b = coords if coords is not None else self.line_coords(line)
+        pad = line.pen().widthF() / 2 + 1
+        return QRectF(min(x_a, x_b) - pad, min(y_a, y_b) - pad, abs(x_b - x_a) + 2 * pad, abs(y_b - y_a) + 2 * pad)
+
+    def vertex_radius(self):
+        return self.parent.SETTINGS['point_diameter'] / 2 + self.parent.SETTINGS['point_border_width']
+
+    def bind_items(self):
+        # Keep the items pointing at the vertices/edges of the graph currently displayed
+        for point, vertex in zip(self.points, self.graph_to_display.vs):
+            point.vertex = vertex
+        for line, edge in zip(self.lines, self.graph_to_display.es):
+            line.edge = edge
+
     def scalling(self):
         bandwidth = []
         attribute = self.parent.main_window.DEFAULT_ATTRIBUTE
@@ -180,14 +558,15 @@ class MainScene(QGraphicsScene):
         n = 0
 
         # set the thickness of QPen according to the attribute value
+        bandwidth = np.array(bandwidth)
+        codes = palette.rgba_codes(255 - bandwidth * 255, 0, bandwidth * 255).tolist()
         for edge in self.graph_to_display.es:
-            line = self.lines[edge.index]
-            line.edge['edge_color'] = QColor(255 - bandwidth[n] * 255, 0, bandwidth[n] * 255)
-            line_pen = QPen(line.edge['edge_color'])
-            line_pen.setWidthF(line.edge['edge_width'])
-            line.setPen(line_pen)
-            line._pen = line_pen
+            edge['edge_color'] = codes[n]
+            line = self.existing(self.lines, edge.index)
+            if line is not None:
+                line.set_default_pen(palette.pen(codes[n], edge['edge_width']))
             n += 1
+        self.static_changed()
 
     def display_edges_by_thickness(self):
         if not self.parent.main_window.contains_attribute():
@@ -196,23 +575,30 @@ class MainScene(QGraphicsScene):
         n = 0
 
         # set the thickness of QPen according to the attribute value
+        black = self.color_code('black')
         for edge in self.graph_to_display.es:
-            line = self.lines[edge.index]
-            line.edge['edge_width'] = self.parent.SETTINGS['edge_width'] * bandwidth[n] * 2
-            line_pen = QPen(QColor('black'))
-            line_pen.setWidthF(line.edge['edge_width'])
-            line.setPen(line_pen)
-            line._pen = line_pen
+            edge['edge_width'] = self.parent.SETTINGS['edge_width'] * bandwidth[n] * 2
+            edge['edge_color'] = black
+            line = self.existing(self.lines, edge.index)
+            if line is not None:
+                line.set_default_pen(palette.pen(black, edge['edge_width']))
             n += 1
+        if self.culling:
+            # Edges without an item are in the index too
+            edges = self.graph_to_display.es
+            self.edge_index.set_widths(np.arange(len(edges)), edges['edge_width'])
+        self.static_changed()
 
     def change_color_all_links(self, the_color):
+        code = palette.color_code(the_color)
+        if code is None:
+            return  # the color dialog was cancelled
         for edge in self.graph_to_display.es:
-            line = self.lines[edge.index]
-            line.edge['edge_color'] = the_color
-            line_pen = QPen(line.edge['edge_color'])
-            line_pen.setWidthF(line.edge['edge_width'])
-            line.setPen(line_pen)
-            line._pen = line_pen
+            edge['edge_color'] = code
+            line = self.existing(self.lines, edge.index)
+            if line is not None:
+                line.set_default_pen(palette.pen(code, edge['edge_width']))
+        self.static_changed()
 
     def highlight_edges(self, edge_path):
         for edge_id in edge_path:
@@ -242,47 +628,65 @@ class MainScene(QGraphicsScene):
         dilated_x, dilated_y = point.x(), point.y()
         original_x, original_y = undilate(dilated_x, dilated_y, self.graph_center, self.scale_factor
                                           )
-        point.vertex.update_attributes(x=original_x, y=original_y, pos={'x': dilated_x, 'y': dilated_y})
+        point.vertex.update_attributes(x=original_x, y=original_y)
+        self.positions[point.vertex.index] = (dilated_x, dilated_y)
+        if self.parent.SETTINGS['cached_rendering'] and not self.is_live(point):
+            self.static_changed(self.indexed_area(point).united(self.current_area(point)))
+        self.reindex([point], point.lines)
+
+    def indexed_area(self, point):
+        # Area covered by a vertex and its edges where the indexes last saw them, i.e. before a move
+        rect = self.point_rect(*self.vertex_index.positions[self.point_ids[point]])
+        for line in point.lines:
+            rect = rect.united(self.line_rect(line, self.edge_index.coords[self.line_ids[line]]))
+        return rect
+
+    def current_area(self, point):
+        rect = self.point_rect(point.x(), point.y())
+        for line in point.lines:
+            rect = rect.united(self.line_rect(line))
+        return rect
 
     def crop(self):
         if self.rb_selected_points.is_empty():
             return
+        self.materialize_all()
 
-        lines_to_keep = []
+        lines_to_keep = set()
         for point in self.rb_selected_points:
             for line in point.lines:
-                if line not in lines_to_keep and \
-                        (self.rb_selected_points.contains(line.point_a) and self.rb_selected_points.contains(
-                            line.point_b)):
-                    lines_to_keep.append(line)
+                if self.rb_selected_points.contains(line.point_a) and self.rb_selected_points.contains(line.point_b):
+                    lines_to_keep.add(line)
 
-        for item in self.items():
-            if item not in lines_to_keep and not self.rb_selected_points.contains(item):
-                self.removeItem(item)
+        for point in self.points:
+            if not self.rb_selected_points.contains(point):
+                self.detach(point)
+        for line in self.lines:
+            if line not in lines_to_keep:
+                self.detach(line)
 
         self.save_cropped()
 
     def reverse_crop(self):
         if self.rb_selected_points.is_empty():
             return
+        self.materialize_all()
 
         for point in self.rb_selected_points:
-            if point in self.items():
+            if self.is_attached(point):
                 for line in point.lines:
-                    if line in self.items():
-                        self.removeItem(line)
-                self.removeItem(point)
+                    self.detach(line)
+                self.detach(point)
 
         self.save_cropped()
 
     def save_cropped(self):
         graph = Graph()
-        items = self.items()
 
         points = []
         point_index = 0
         for point in self.points:
-            if point in items:
+            if self.is_attached(point):
                 create_vertices(graph, 1)
 
                 created_vertex = graph.vs[point_index]
@@ -291,11 +695,12 @@ class MainScene(QGraphicsScene):
                 points.append(point)
                 point_index += 1
         self.points = points
+        self.positions = self.positions[[point.vertex.index for point in points]].reshape(-1, 2)
 
         lines = []
         line_index = 0
         for line in self.lines:
-            if line in items:
+            if self.is_attached(line):
                 st_tuple = [0, 0]
                 for vertex in graph.vs:
                     if vertex['id'] == line.point_a.vertex['id']:
@@ -318,93 +723,352 @@ class MainScene(QGraphicsScene):
         self.rb_selected_points.clear()
         self.parent.main_window.graph = graph
         self.graph_to_display = self.parent.main_window.graph
+        self.bind_items()
+        self.static_changed()
+        self.edited()
 
     def revert_to_default(self):
-        items = self.items()
-
+        self.materialize_all()
         for point in self.points:
-            if point not in items:
-                self.addItem(point)
+            self.attach(point)
 
         for line in self.lines:
-            if line not in items:
-                self.addItem(line)
+            self.attach(line)
 
+        self.positions = np.array([(point.x(), point.y()) for point in self.points], dtype=float).reshape(-1, 2)
         self.rb_selected_points.clear()
         self.graph_to_display = self.default_graph.copy()
         self.parent.main_window.graph = self.graph_to_display
+        self.bind_items()
+        self.static_changed()
 
     def remove_point(self, point):
-        self.removeItem(point)
+        self.materialize_all()
+        self.detach(point)
         for line in point.lines:
-            self.removeItem(line)
+            self.detach(line)
 
         self.save_cropped()
 
     def remove_line(self, line):
-        self.removeItem(line)
+        self.materialize_all()
+        self.detach(line)
 
         self.save_cropped()
 
+    def set_low_detail(self, low_detail):
+        """
+        Switch between full and low detail drawing. Items check the flag when they paint themselves. Hover handling is
+        turned off while in low detail, since nobody can aim at a single item of a zoomed out graph anyway
+        """
+        self.low_detail = low_detail
+        for item in self.created(self.points) + self.created(self.lines):
+            if isinstance(item, (MainVertex, MainEdge)):
+                item.setAcceptHoverEvents(not low_detail)
+        self.update()
+
+    def create_point(self, vertex_id, recycled=None):
+        vertex = self.graph_to_display.vs[vertex_id]
+        pos = self.positions[vertex_id].tolist()
+        if recycled is None:
+            point = MainVertex(vertex, pos, self.parent.SETTINGS['point_diameter'], self.point_pen(),
+                               palette.brush(vertex['color']), self)
+        else:
+            point = recycled
+            point.rebind(vertex, pos, self.point_pen(), palette.brush(vertex['color']))
+        point.setAcceptHoverEvents(not self.low_detail)
+        self.addItem(point)
+        self.point_ids[point] = vertex_id
+        return point
+
+    def create_line(self, edge_id, recycled=None):
+        edge = self.graph_to_display.es[edge_id]
+        point_a = self.points[edge.source]
+        point_b = self.points[edge.target]
+        if recycled is None:
+            line = MainEdge(edge, point_a, point_b, self.edge_pen(edge), self)
+        else:
+            line = recycled
+            line.rebind(edge, point_a, point_b, self.edge_pen(edge))
+        line.setAcceptHoverEvents(not self.low_detail)
+        if self.lines_live:
+            self.live_items.add(line)
+        self.addItem(line)
+        self.line_ids[line] = edge_id
+        return line
+
+    def release_point(self, vertex_id):
+        point = self.points.release(vertex_id)
+        self.removeItem(point)
+        del self.point_ids[point]
+
+    def release_line(self, edge_id):
+        line = self.lines.release(edge_id)
+        line.point_a.lines.remove(line)
+        line.point_b.lines.remove(line)
+        self.removeItem(line)
+        self.live_items.discard(line)
+        del self.line_ids[line]
+
+    def is_pinned(self, item):
+        # Items somebody holds on to (highlighted, selected, shown in the info panel...) are never released
+        main_window = self.parent.main_window
+        # Lines are all live in real time mode, which does not keep them from being released
+        live = item in self.live_items and not (self.lines_live and isinstance(item, MainEdge))
+        return item.isHighlighted() or item.isPersistent() or live or \
+            item is self.selected_item or item is self.highlighted_item or \
+            item is main_window.VERTEX_DISPLAYING or item is main_window.EDGE_DISPLAYING or \
+            self.rb_selected_points.contains(item)
+
+    def follow_viewport(self, rect):
+        """
+        Called by the view after it painted. Items are created and released outside of painting, once the visible
+        region has left the culled one or has become much smaller than it
+
+        :param rect: QRectF, visible region in scene coordinates
+        """
+        if not self.culling or self.cull_timer.isActive():
+            return
+        if not self.culled_rect.contains(rect) or rect.width() * 4 < self.culled_rect.width():
+            self.cull_timer.start(0)
+
+    def cull(self, rect):
+        """
+        Create the items around a visible region and release the ones far from it
+
+        :param rect: QRectF, visible region in scene coordinates
+        """
+        if not self.culling:
+            return
+
+        margin = max(rect.width(), rect.height()) * self.CULL_MARGIN
+        region = rect.adjusted(-margin, -margin, margin, margin)
+        r = self.vertex_radius()
+        box = (region.left() - r, region.top() - r, region.right() + r, region.bottom() + r)
+
+        edge_ids = set(self.edge_index.in_rect(*box).tolist())
+        edge_ids.update(edge_id for edge_id in self.lines.created if self.is_pinned(self.lines.get(edge_id)))
+        vertex_ids = set(self.vertex_index.in_rect(*box).tolist())
+        vertex_ids.update(
+            vertex_id for vertex_id in self.points.created if self.is_pinned(self.points.get(vertex_id))
+        )
+        if edge_ids:
+            # An edge needs the items of both of its ends
+            vertex_ids.update(self.edge_ends[sorted(edge_ids)].ravel().tolist())
+
+        for edge_id in self.lines.created - edge_ids:
+            self.release_line(edge_id)
+        for vertex_id in self.points.created - vertex_ids:
+            self.release_point(vertex_id)
+        for vertex_id in vertex_ids - self.points.created:
+            self.points[vertex_id]
+        for edge_id in edge_ids - self.lines.created:
+            self.lines[edge_id]
+
+        self.culled_rect = region
+        self.static_changed()
+
+    def materialize_all(self):
+        # Editing the graph (cropping, removing...) goes over every item, so from then on they all exist
+        self.drop_super_nodes()
+        if not self.culling:
+            return
+        for _ in self.points:
+            pass
+        for _ in self.lines:
+            pass
+        self.culling = False
+        self.static_changed()
+
+    def update_super_nodes(self, scale):
+        # Expand the clusters shown large enough at a new zoom level, collapse the others
+        if self.super_nodes is not None:
+            self.super_nodes.update(scale)
+
+    def drop_super_nodes(self):
+        # Back to plain vertices and edges, edits change the clusters under the super-nodes
+        if self.super_nodes is not None:
+            self.super_nodes.clear()
+            self.super_nodes = None
+
+    @staticmethod
+    def created(items):
+        return items.created_items() if isinstance(items, LazyItems) else list(items)
+
+    @staticmethod
+    def existing(items, item_id):
+        # The item of an id, without creating it when items are lazy
+        return items.get(item_id) if isinstance(items, LazyItems) else items[item_id]
+
+    def static_changed(self, rect=None):
+        """
+        Tell the view that the static part of the scene has changed, so its cached rendering gets redrawn
+
+        :param rect: QRectF or None, changed area in scene coordinates. None means the whole scene
+        """
+        if self.parent.SETTINGS['cached_rendering']:
+            self.parent.invalidate_cache(rect)
+
+    def set_live(self, item, live):
+        # Live items are left out of the cached tiles and painted over them on every frame instead
+        if live:
+            self.live_items.add(item)
+        elif item in self.live_items:
+            self.live_items.discard(item)
+            if isinstance(item, MainVertex):
+                self.static_changed(self.point_rect(item.x(), item.y()))
+            elif isinstance(item, MainEdge):
+                self.static_changed(self.line_rect(item))
+
+    def set_lines_live(self, live):
+        # The real time mode restyles every edge on each frame, caching them would only mean redrawing every tile
+        # Only the items created so far, going over lazy lines would create all of them
+        self.lines_live = live
+        if live:
+            self.live_items.update(self.created(self.lines))
+        else:
+            self.live_items.difference_update(self.created(self.lines))
+        self.static_changed()
+
+    def is_live(self, point):
+        return point in self.live_items and all(line in self.live_items for line in point.lines)
+
+    def start_drag(self, item):
+        # The edges of a dragged vertex are painted live until it is dropped, so moving it does not redraw tiles
+        self.dragged_item = item
+        # Every move takes the edges of the vertex out of the BSP tree of the scene and puts them back, which scans the
+        # leaves they cross. When they span more than the scene together, the tree is left off until the drop
+        if isinstance(item, MainVertex):
+            rects = [line.sceneBoundingRect() for line in item.lines if isinstance(line, MainEdge)]
+            scene_rect = self.sceneRect()
+            if sum(rect.width() * rect.height() for rect in rects) > scene_rect.width() * scene_rect.height():
+                self.setItemIndexMethod(QGraphicsScene.NoIndex)
+        if self.parent.SETTINGS['cached_rendering'] and isinstance(item, MainVertex):
+            self.live_items.update(line for line in item.lines if isinstance(line, MainEdge))
+            self.static_changed(self.current_area(item))
+
+    def drag_to(self, point, pos):
+        """
+        Move a dragged vertex to the cursor. The first move is applied at once, the ones arriving before the next
+        display frame only replace the pending position, so a burst of mouse events costs one update per frame
+
+        :param point: MainVertex or LayerVertex, vertex being dragged
+        :param pos: QPointF, cursor position in scene coordinates
+        """
+        self._drag_target = (point, pos.x(), pos.y())
+        if not self.drag_timer.isActive():
+            self.flush_drag()
+            self.drag_timer.start(self.frame_interval())
+
+    def flush_drag(self):
+        if self._drag_target is None:
+            return
+        point, x, y = self._drag_target
+        self._drag_target = None
+
+        point.move_to(x, y)
+        self.update_vertex(point)
+        self.stick_lines(point.lines)
+        self.parent.main_window.refresh_node_position(point)
+        self.parent.main_window.pin_vertex(point.vertex)
+
+    def frame_interval(self):
+        screen = QGuiApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen is not None else 0
+        return int(1000 / (refresh_rate if refresh_rate > 0 else self.DEFAULT_REFRESH_RATE))
+
+    def end_drag(self):
+        self.flush_drag()
+        if self.dragged_item is not None and isinstance(self.dragged_item, MainVertex):
+            for line in self.dragged_item.lines:
+                if not line.isHighlighted():
+                    self.set_live(line, False)
+        if self.itemIndexMethod() == QGraphicsScene.NoIndex:
+            self.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+        self.dragged_item = None
+
+    def should_paint(self, item):
+        if not self.parent.SETTINGS['cached_rendering']:
+            return True
+        return self.rendering_tiles != (item in self.live_items)
+
+    def layer_passes(self):
+        """
+        Tell a layer which of its parts to paint: its default styled batches (static) and its overlay of restyled rows
+        (live)
+
+        :return: (bool, bool), whether to paint the static part and the live part
+        """
+        if not self.parent.SETTINGS['cached_rendering']:
+            return True, True
+        return (True, False) if self.rendering_tiles else (False, True)
+
+    def attach(self, item):
+        if isinstance(item, (LayerVertex, LayerEdge)):
+            item.layer.set_visible(item.row, True)
+        elif item.scene() is not self:
+            self.addItem(item)
+
+        if item in self.point_ids:
+            self.vertex_index.insert(self.point_ids[item])
+        elif item in self.line_ids:
+            self.edge_index.insert(self.line_ids[item])
+
+    def detach(self, item):
+        if isinstance(item, (LayerVertex, LayerEdge)):
+            item.layer.set_visible(item.row, False)
+        elif item.scene() is self:
+            self.removeItem(item)
+
+        if item in self.point_ids:
+            self.vertex_index.remove(self.point_ids[item])
+        elif item in self.line_ids:
+            self.edge_index.remove(self.line_ids[item])
+
+    def is_attached(self, item):
+        if isinstance(item, (LayerVertex, LayerEdge)):
+            return item.layer.visible[item.row]
+        return item.scene() is self
+
+    def item_at(self, pos):
+        if self.vertex_index is None:
+            return None
+
+        # Vertices take precedence over the edges ending in them
+        point_id = self.vertex_index.nearest(pos.x(), pos.y(), self.vertex_radius())
+        if point_id is not None:
+            return self.indexed_points[point_id]
+
+        line_id = self.edge_index.nearest(pos.x(), pos.y(), EdgeLayer.HIT_TOLERANCE)
+        if line_id is not None:
+            return self.indexed_lines[line_id]
+        return None
+
     # For add vertex
     def mouseDoubleClickEvent(self, event):
+        if self.super_nodes is not None and not self.parent.main_window.MODE_ADD_NODE:
+            # Double clicking a super-node expands its cluster, double clicking a vertex collapses its cluster
+            super_node = next((item for item in self.items(event.scenePos()) if isinstance(item, SuperNode)), None)
+            if super_node is not None:
+                self.super_nodes.toggle(super_node=super_node)
+            else:
+                item = self.item_at(event.scenePos())
+                if item in self.point_ids:
+                    self.super_nodes.toggle(vertex_id=self.point_ids[item])
+            return
+
         if self.parent.main_window.MODE_ADD_NODE:
             cursor_pos = event.scenePos().toPoint()
-            item_under_cursor = self.itemAt(cursor_pos, QTransform())
+            item_under_cursor = self.item_at(cursor_pos)
 
             if item_under_cursor is None:
                 self.parent.main_window.add_node(event, self.graph_center, self.scale_factor)
 
-    # For add edge
-    def real_add_edge(self, vertex):
-        if len(self.parent.main_window.SOURCE_TARGET) == 0:
-            self.parent.main_window.SOURCE_TARGET.append(vertex)
-
-        elif len(self.parent.main_window.SOURCE_TARGET) == 1:
-            self.parent.main_window.SOURCE_TARGET.append(vertex)
-
-            self.parent.main_window.graph = create_edges(
-                self.parent.main_window.graph, [(int(self.parent.main_window.SOURCE_TARGET[0].index),
-                                                 int(self.parent.main_window.SOURCE_TARGET[1].index))])
-
-            # Set default value for new edge
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['edge_color'] = ""
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['weight'] = 1000.0
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['LinkType'] = ""
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['LinkNote'] = ""
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['LinkSpeedUnits'] = "G"
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['label'] = "1000.0 MBit/s"
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['LinkLabel'] = ""
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['edge_width'] = 1
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['LinkSpeedRaw'] = 1000000000.0
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['key'] = 0.0
-            self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['zorder'] = 1.0
-
-            # Check for attribute delay, if it exists set default value for new edge
-            dictionary = self.parent.main_window.graph.es[0].attributes()
-            for key, value in dictionary.items():
-                if str(key) == "delay":
-                    self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1]['delay'] = 50.0
-
-            self.edge_to_display.append(self.parent.main_window.graph.es[self.parent.main_window.graph.ecount() - 1])
-
-            point_a = self.points[self.edge_to_display[-1].source]
-            point_b = self.points[self.edge_to_display[-1].target]
-            line_pen = QPen(self.COLORS['black'])
-            line_pen.setWidth(1)
-            line = MainEdge(self.edge_to_display[-1], point_a, point_b, line_pen, self)
-            self.addItem(line)
-            self.lines.append(line)
-
-            self.parent.main_window.SOURCE_TARGET = []
-            self.parent.main_window.ADD_EDGE_STATE = False
-            # self.parent.main_window.button_add_edge.setToolTip("Add Edge")
-
     def mousePressEvent(self, event):
         self.rb_selected_points.clear()
 
         cursor_pos = event.scenePos().toPoint()
-        item_under_cursor = self.itemAt(cursor_pos, QTransform())
+        item_under_cursor = self.item_at(cursor_pos)
 
         if item_under_cursor is not None:
             if self.highlighted_item is not None and \
@@ -445,13 +1109,16 @@ class MainScene(QGraphicsScene):
 
         if self.selected_item is not None and self._move:
             self.selected_item.highlight_self()
+            if self.dragged_item is None:
+                self.start_drag(self.selected_item)
             self.selected_item.mouseMoveEvent(event)
         elif self.parent.main_window.MODE_RUBBER_BAND and self.rb_origin is not None:
             if self.rb_origin is not None:
                 adjusted_cursor_pos = self.parent.mapFromScene(cursor_pos)
                 self.rubber_band.setGeometry(QRect(self.rb_origin, adjusted_cursor_pos).normalized())
-        elif not self.parent.main_window.MODE_RUBBER_BAND and not self.parent.main_window.MODE_RECOLOR_NODE:
-            item_under_cursor = self.itemAt(cursor_pos, QTransform())
+        elif not self.parent.main_window.MODE_RUBBER_BAND and not self.parent.main_window.MODE_RECOLOR_NODE and \
+                not self.low_detail:
+            item_under_cursor = self.item_at(cursor_pos)
 
             if item_under_cursor is None and self.highlighted_item is not None:
                 # When mouse moves out of an item into background
@@ -477,14 +1144,17 @@ class MainScene(QGraphicsScene):
     def mouseReleaseEvent(self, event):
         if self.selected_item is not None:
             self._move = False
+            self.end_drag()
         elif self.parent.main_window.MODE_RUBBER_BAND and self.rb_origin is not None:
             self.rubber_band.hide()
             rect = self.rubber_band.geometry()
             rect_scene = self.parent.mapToScene(rect).boundingRect()
-            selected = self.items(rect_scene)
-            for item in selected:
-                if isinstance(item, MainVertex):
-                    self.rb_selected_points.append(item)
+            r = self.vertex_radius()
+            selected = self.vertex_index.in_rect(
+                rect_scene.left() - r, rect_scene.top() - r, rect_scene.right() + r, rect_scene.bottom() + r
+            )
+            for point_id in selected:
+                self.rb_selected_points.append(self.indexed_points[point_id])
 
             self.rb_origin = None
             self.rubber_band = None
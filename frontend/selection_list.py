@@ -1,4 +1,5 @@
 from frontend.vertex import MainVertex
+from frontend.vertex_layer import LayerVertex
 
 
 class SelectionList:
@@ -27,14 +28,14 @@ class SelectionList:
     def append(self, item):
         self.SELECTED.append(item)
 
-        if isinstance(item, MainVertex):
+        if isinstance(item, (MainVertex, LayerVertex)):
             item.highlight_self()
             item.setPersistent(True)
 
     def remove(self, item):
         self.SELECTED.remove(item)
 
-        if isinstance(item, MainVertex):
+        if isinstance(item, (MainVertex, LayerVertex)):
             item.unhighlight_self()
             item.setPersistent(False)
 
@@ -43,7 +44,7 @@ class SelectionList:
 
     def clear(self):
         for item in self.SELECTED:
-            if isinstance(item, MainVertex) and not item.isHighlighted():
+            if isinstance(item, (MainVertex, LayerVertex)) and not item.isHighlighted():
                 item.unhighlight_self()
                 item.setPersistent(False)
 
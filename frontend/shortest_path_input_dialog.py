@@ -1,6 +1,6 @@
 from PyQt5 import uic
 from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QPushButton, QLineEdit, QMessageBox
+from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QPushButton, QLineEdit, QMessageBox, QSpinBox
 
 
 # noinspection PyCallByClass
@@ -29,6 +29,9 @@ class ShortestPathInputDialog(QDialog):
         self.textbox_destination = self.findChild(QLineEdit, 'destinationText')
         self.textbox_destination.setReadOnly(True)
 
+        # More than one path shows the k shortest loopless paths at once
+        self.spinbox_path_count = self.findChild(QSpinBox, 'pathCount')
+
     def choose_source(self):
         self.parent.SP_SOURCE_AND_TARGET_INDEX = 0
         self.hide()
@@ -0,0 +1,378 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+
+
+def group_by_cell(cells, ids):
+    """
+    Group ids by the grid cell they are in
+
+    :param cells: numpy.ndarray, (n, 2) integer cell coordinates
+    :param ids: numpy.ndarray, id of each row of cells
+    :return: iterator of ((int, int), [int]), every cell with the ids in it
+    """
+    # One integer per cell, which sorts much faster than rows of two (np.unique(axis=0))
+    low = cells.min(axis=0)
+    height = int(cells[:, 1].max() - low[1]) + 1
+    keys = (cells[:, 0] - low[0]) * height + (cells[:, 1] - low[1])
+    order = np.argsort(keys)
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    groups = (group.tolist() for group in np.split(ids[order], starts[1:]))
+    return zip(map(tuple, cells[order[starts]].tolist()), groups)
+
+
+class GridIndex:
+    """
+    Uniform grid over a set of points. Every cell of the grid keeps the ids of the points that fall into it, so looking
+    up what is under the cursor only has to look at a handful of cells instead of every point
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.cells = defaultdict(set)
+        self.positions = np.zeros((0, 2))
+        self.active = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def cell(self, x, y):
+        return int(np.floor(x / self.cell_size)), int(np.floor(y / self.cell_size))
+
+    def extend(self, positions):
+        """
+        Add points to the index. Their ids follow the ones already in the index
+
+        :param positions: numpy.ndarray, (n, 2) array of x, y coordinates
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        first_id = len(self.positions)
+        self.positions = np.concatenate([self.positions, positions])
+        self.active = np.concatenate([self.active, np.ones(len(positions), dtype=bool)])
+        if not len(positions):
+            return
+
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        for cell, ids in group_by_cell(cells, np.arange(first_id, len(self.positions))):
+            self.cells[cell].update(ids)
+
+    def remove(self, point_id):
+        if self.active[point_id]:
+            self.discard(self.cell(*self.positions[point_id]), point_id)
+            self.active[point_id] = False
+
+    def insert(self, point_id):
+        if not self.active[point_id]:
+            self.cells[self.cell(*self.positions[point_id])].add(point_id)
+            self.active[point_id] = True
+
+    def discard(self, cell, point_id):
+        ids = self.cells.get(cell)
+        if ids is not None:
+            ids.discard(point_id)
+            if not ids:
+                del self.cells[cell]
+
+    def move(self, point_id, x, y):
+        if self.active[point_id]:
+            old_cell = self.cell(*self.positions[point_id])
+            new_cell = self.cell(x, y)
+            if old_cell != new_cell:
+                self.discard(old_cell, point_id)
+                self.cells[new_cell].add(point_id)
+        self.positions[point_id] = (x, y)
+
+    def candidates(self, x_min, y_min, x_max, y_max):
+        cx_min, cy_min = self.cell(x_min, y_min)
+        cx_max, cy_max = self.cell(x_max, y_max)
+
+        if (cx_max - cx_min + 1) * (cy_max - cy_min + 1) > len(self.cells):
+            # Large query, walking the occupied cells is cheaper than walking the covered ones
+            ids = [
+                point_id
+                for (cx, cy), cell in self.cells.items()
+                if cx_min <= cx <= cx_max and cy_min <= cy <= cy_max
+                for point_id in cell
+            ]
+        else:
+            ids = [
+                point_id
+                for cx in range(cx_min, cx_max + 1)
+                for cy in range(cy_min, cy_max + 1)
+                for point_id in self.cells.get((cx, cy), ())
+            ]
+        return np.array(ids, dtype=np.int64)
+
+    def nearest(self, x, y, radius, mask=None):
+        """
+        Find the point closest to (x, y) within a given radius
+
+        :param x: float, x coordinate of the query point
+        :param y: float, y coordinate of the query point
+        :param radius: float or numpy.ndarray, search radius, either one for all points or one per point id
+        :param mask: numpy.ndarray or None, boolean array telling which point ids may be returned
+        :return: int or None, id of the closest point
+        """
+        max_radius = np.max(radius) if np.ndim(radius) else radius
+        ids = self.candidates(x - max_radius, y - max_radius, x + max_radius, y + max_radius)
+        if mask is not None:
+            ids = ids[mask[ids]]
+        if not ids.size:
+            return None
+
+        distance = np.hypot(self.positions[ids, 0] - x, self.positions[ids, 1] - y)
+        if np.ndim(radius):
+            distance -= radius[ids]
+        else:
+            distance -= radius
+        closest = np.argmin(distance)
+        if distance[closest] > 0:
+            return None
+        return int(ids[closest])
+
+    def in_rect(self, x_min, y_min, x_max, y_max, mask=None):
+        """
+        Find the points inside an axis aligned rectangle
+
+        :return: numpy.ndarray, ids of the points inside the rectangle
+        """
+        ids = self.candidates(x_min, y_min, x_max, y_max)
+        if mask is not None:
+            ids = ids[mask[ids]]
+
+        x, y = self.positions[ids, 0], self.positions[ids, 1]
+        return ids[(x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)]
+
+
+class SegmentIndex:
+    """
+    Uniform grid over a set of line segments. A segment is registered in every cell its bounding box covers. Segments
+    covering more than MAX_CELLS cells are kept aside and checked on every query instead
+    """
+    MAX_CELLS = 64
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.cells = defaultdict(set)
+        self.long_segments = set()
+        self.coords = np.zeros((0, 4))
+        self.widths = np.zeros(0)
+        # Upper bound of the widths, so that nearest does not look for it on every query
+        self.max_width = 0.0
+        self.active = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def cell_range(self, x_min, y_min, x_max, y_max):
+        return (
+            int(np.floor(x_min / self.cell_size)), int(np.floor(y_min / self.cell_size)),
+            int(np.floor(x_max / self.cell_size)), int(np.floor(y_max / self.cell_size))
+        )
+
+    def segment_cells(self, segment_id):
+        x_a, y_a, x_b, y_b = self.coords[segment_id]
+        cx_min, cy_min, cx_max, cy_max = self.cell_range(min(x_a, x_b), min(y_a, y_b), max(x_a, x_b), max(y_a, y_b))
+        if (cx_max - cx_min + 1) * (cy_max - cy_min + 1) > self.MAX_CELLS:
+            return None
+        return [(cx, cy) for cx in range(cx_min, cx_max + 1) for cy in range(cy_min, cy_max + 1)]
+
+    def register(self, segment_id):
+        cells = self.segment_cells(segment_id)
+        if cells is None:
+            self.long_segments.add(segment_id)
+        else:
+            for cell in cells:
+                self.cells[cell].add(segment_id)
+
+    def unregister(self, segment_id):
+        cells = self.segment_cells(segment_id)
+        if cells is None:
+            self.long_segments.discard(segment_id)
+        else:
+            for cell in cells:
+                ids = self.cells.get(cell)
+                if ids is not None:
+                    ids.discard(segment_id)
+                    if not ids:
+                        del self.cells[cell]
+
+    def extend(self, coords, widths):
+        """
+        Add segments to the index. Their ids follow the ones already in the index
+
+        :param coords: numpy.ndarray, (n, 4) array of x_a, y_a, x_b, y_b coordinates
+        :param widths: numpy.ndarray, stroke width of each segment
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 4)
+        first_id = len(self.coords)
+        self.coords = np.concatenate([self.coords, coords])
+        widths = np.asarray(widths, dtype=float).reshape(-1)
+        self.widths = np.concatenate([self.widths, widths])
+        self.active = np.concatenate([self.active, np.ones(len(coords), dtype=bool)])
+        if not len(coords):
+            return
+        self.max_width = max(self.max_width, float(widths.max()))
+
+        # Same cells as segment_cells, computed for all segments at once: every segment is expanded into one
+        # (id, cell) pair per cell of its bounding box, and the pairs are then grouped by cell
+        ids = np.arange(first_id, len(self.coords))
+        cell_range = np.floor(np.column_stack([
+            np.minimum(coords[:, 0], coords[:, 2]), np.minimum(coords[:, 1], coords[:, 3]),
+            np.maximum(coords[:, 0], coords[:, 2]), np.maximum(coords[:, 1], coords[:, 3])
+        ]) / self.cell_size).astype(np.int64)
+        nx = cell_range[:, 2] - cell_range[:, 0] + 1
+        count = nx * (cell_range[:, 3] - cell_range[:, 1] + 1)
+
+        long = count > self.MAX_CELLS
+        self.long_segments.update(ids[long].tolist())
+        ids, cell_range, nx, count = ids[~long], cell_range[~long], nx[~long], count[~long]
+        if not ids.size:
+            return
+
+        segment = np.repeat(np.arange(len(ids)), count)
+        offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        cells = np.column_stack([
+            cell_range[segment, 0] + offset % nx[segment], cell_range[segment, 1] + offset // nx[segment]
+        ])
+        for cell, group in group_by_cell(cells, ids[segment]):
+            self.cells[cell].update(group)
+
+    def remove(self, segment_id):
+        if self.active[segment_id]:
+            self.unregister(segment_id)
+            self.active[segment_id] = False
+
+    def insert(self, segment_id):
+        if not self.active[segment_id]:
+            self.register(segment_id)
+            self.active[segment_id] = True
+
+    def move(self, segment_id, x_a, y_a, x_b, y_b):
+        if self.active[segment_id]:
+            self.unregister(segment_id)
+            self.coords[segment_id] = (x_a, y_a, x_b, y_b)
+            self.register(segment_id)
+        else:
+            self.coords[segment_id] = (x_a, y_a, x_b, y_b)
+
+    def set_widths(self, segment_ids, widths):
+        """
+        Change the stroke width of segments. The cells do not depend on it, only the reach of nearest does
+
+        :param segment_ids: int or numpy.ndarray, ids of the segments
+        :param widths: float or numpy.ndarray, their new widths
+        """
+        self.widths[segment_ids] = widths
+        if np.size(widths):
+            self.max_width = max(self.max_width, float(np.max(widths)))
+
+    def candidates(self, x_min, y_min, x_max, y_max):
+        cx_min, cy_min, cx_max, cy_max = self.cell_range(x_min, y_min, x_max, y_max)
+
+        ids = set(self.long_segments)
+        if (cx_max - cx_min + 1) * (cy_max - cy_min + 1) > len(self.cells):
+            for (cx, cy), cell in self.cells.items():
+                if cx_min <= cx <= cx_max and cy_min <= cy <= cy_max:
+                    ids.update(cell)
+        else:
+            for cx in range(cx_min, cx_max + 1):
+                for cy in range(cy_min, cy_max + 1):
+                    ids.update(self.cells.get((cx, cy), ()))
+        return np.fromiter(ids, dtype=np.int64, count=len(ids))
+
+    def nearest(self, x, y, tolerance=0.0):
+        """
+        Find the segment closest to (x, y) whose stroke passes within a given tolerance
+
+        :param x: float, x coordinate of the query point
+        :param y: float, y coordinate of the query point
+        :param tolerance: float, how far outside of its stroke a segment can still be found
+        :return: int or None, id of the closest segment
+        """
+        reach = tolerance + self.max_width / 2
+        ids = self.candidates(x - reach, y - reach, x + reach, y + reach)
+        if not ids.size:
+            return None
+
+        a = self.coords[ids, :2]
+        ab = self.coords[ids, 2:] - a
+        p = np.array([x, y])
+        length = (ab ** 2).sum(axis=1)
+        t = np.clip(((p - a) * ab).sum(axis=1) / np.where(length > 0, length, 1), 0, 1)
+        distance = np.hypot(*(a + t[:, None] * ab - p).T) - self.widths[ids] / 2
+
+        closest = np.argmin(distance)
+        if distance[closest] > tolerance:
+            return None
+        return int(ids[closest])
+
+    def in_rect(self, x_min, y_min, x_max, y_max):
+        """
+        Find the segments whose bounding box intersects an axis aligned rectangle
+
+        :return: numpy.ndarray, ids of the segments
+        """
+        ids = self.candidates(x_min, y_min, x_max, y_max)
+        coords = self.coords[ids]
+        return ids[
+            (np.minimum(coords[:, 0], coords[:, 2]) <= x_max) & (np.maximum(coords[:, 0], coords[:, 2]) >= x_min) &
+            (np.minimum(coords[:, 1], coords[:, 3]) <= y_max) & (np.maximum(coords[:, 1], coords[:, 3]) >= y_min)
+        ]
+
+
+def benchmark(sizes=(1000, 10000, 100000, 1000000), queries=1000, cell_size=16.0, seed=0):
+    """
+    Measure hover (nearest) and rubber band (rectangle) query latency of the indexes against the number of items, for
+    items spread with a constant density. Compare with the linear scans done without an index
+
+    :return: [dict], one row of timings (in microseconds per query) per size
+    """
+    rng = np.random.RandomState(seed)
+    rows = []
+    for n in sizes:
+        side = np.sqrt(n) * cell_size
+        positions = rng.uniform(0, side, size=(n, 2))
+        segments = np.hstack([positions, positions + rng.normal(0, cell_size, size=(n, 2))])
+        points = GridIndex(cell_size)
+        points.extend(positions)
+        lines = SegmentIndex(cell_size)
+        lines.extend(segments, np.ones(n))
+        probes = rng.uniform(0, side, size=(queries, 2))
+        starts, directions = segments[:, :2], segments[:, 2:] - segments[:, :2]
+        lengths = np.maximum((directions ** 2).sum(axis=1), 1e-12)
+
+        def scan_segments(x, y):
+            along = np.clip(((np.array([x, y]) - starts) * directions).sum(axis=1) / lengths, 0, 1)
+            return np.argmin(np.hypot(*(starts + along[:, None] * directions - (x, y)).T))
+
+        def scan_rect(x, y):
+            inside = (positions[:, 0] >= x) & (positions[:, 0] <= x + 10 * cell_size) & \
+                (positions[:, 1] >= y) & (positions[:, 1] <= y + 10 * cell_size)
+            return np.nonzero(inside)[0]
+
+        def per_query(f):
+            start = time.perf_counter()
+            for x, y in probes:
+                f(x, y)
+            return (time.perf_counter() - start) / queries * 1e6
+
+        rows.append({
+            'size': n,
+            'vertex_hover': per_query(lambda x, y: points.nearest(x, y, 5.0)),
+            'vertex_hover_scan': per_query(lambda x, y: np.argmin(np.hypot(*(positions - (x, y)).T))),
+            'edge_hover': per_query(lambda x, y: lines.nearest(x, y, 1.0)),
+            'edge_hover_scan': per_query(scan_segments),
+            'rubber_band': per_query(lambda x, y: points.in_rect(x, y, x + 10 * cell_size, y + 10 * cell_size)),
+            'rubber_band_scan': per_query(scan_rect),
+        })
+    return rows
+
+
+if __name__ == '__main__':
+    columns = ['vertex_hover', 'vertex_hover_scan', 'edge_hover', 'edge_hover_scan', 'rubber_band', 'rubber_band_scan']
+    print('{:>10} '.format('size') + ' '.join('{:>17}'.format(column) for column in columns))
+    for row in benchmark():
+        print('{:>10} '.format(row['size']) + ' '.join('{:>17.1f}'.format(row[column]) for column in columns))
@@ -0,0 +1,198 @@
+import numpy as np
+from PyQt5.QtCore import QRectF
+from PyQt5.QtWidgets import QGraphicsEllipseItem, QGraphicsLineItem
+
+from frontend import palette
+
+
+class SuperNode(QGraphicsEllipseItem):
+    """
+    Stands for all the vertices of a collapsed cluster, its area growing with their number
+    """
+
+    def __init__(self, cluster, members, center, diameter, pen, brush):
+        super().__init__(center[0] - diameter / 2, center[1] - diameter / 2, diameter, diameter)
+        self.cluster = cluster
+        self.members = members
+        self.setPen(pen)
+        self.setBrush(brush)
+        self.setToolTip("Cluster {}: {} vertices, double click to expand".format(cluster, members))
+
+    def paint(self, painter, option, widget=None):
+        # Drawn into the cached tiles like the other static items, see MainScene.should_paint
+        if self.scene().should_paint(self):
+            super().paint(painter, option, widget)
+
+
+class SuperEdge(QGraphicsLineItem):
+    """
+    Stands for all the edges between two collapsed clusters, or between a vertex and a collapsed cluster
+    """
+
+    def __init__(self, a, b, count, pen):
+        super().__init__(a[0], a[1], b[0], b[1])
+        self.count = count
+        self.setPen(pen)
+        self.setZValue(-1)  # under the super-nodes
+        self.setToolTip("{} edges".format(count))
+
+    def paint(self, painter, option, widget=None):
+        if self.scene().should_paint(self):
+            super().paint(painter, option, widget)
+
+
+class SuperNodes:
+    """
+    Collapses every cluster of a lazy scene (see MainScene.display_lazy) into a super-node. The vertices of collapsed
+    clusters and their edges are taken out of the spatial indexes, so the scene never creates items for them, and the
+    edges leaving a collapsed cluster are merged into one super-edge per pair of ends. A cluster expands back into its
+    members once it is shown larger than EXPAND_SIZE pixels, or when its super-node is double clicked
+    """
+    EXPAND_SIZE = 200
+    # Super-edges get thicker with the number of edges they stand for, by this much per doubling
+    WIDTH_PER_DOUBLING = 1.0
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.cluster_ids = np.zeros(0, dtype=np.int64)
+        # Cluster of every vertex, as an index into cluster_ids
+        self.clusters = np.zeros(0, dtype=np.int64)
+        self.centers = np.zeros((0, 2))
+        self.extents = np.zeros(0)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.colors = np.zeros(0, dtype=np.int64)
+        self.expanded = np.zeros(0, dtype=bool)
+        # Clusters expanded (True) or collapsed (False) by double clicks, whatever the zoom level
+        self.overrides = {}
+        self.nodes = {}
+        self.edges = []
+
+    def rebuild(self, scale):
+        """
+        Recompute the clusters from the graph and the positions of the scene, to be called after its indexes have been
+        built, when every vertex and edge is in them
+
+        :param scale: float, current scale of the view
+        """
+        scene = self.scene
+        self.remove_items()
+
+        membership = np.asarray(scene.graph_to_display.vs['cluster'], dtype=np.int64)
+        self.cluster_ids, self.clusters = np.unique(membership, return_inverse=True)
+        self.clusters = self.clusters.ravel()
+        counts = np.bincount(self.clusters, minlength=len(self.cluster_ids))
+        positions = scene.positions.reshape(-1, 2)
+
+        self.centers = np.column_stack([
+            np.bincount(self.clusters, weights=positions[:, 0], minlength=len(counts)),
+            np.bincount(self.clusters, weights=positions[:, 1], minlength=len(counts))
+        ]) / np.maximum(counts, 1)[:, None]
+
+        self.extents = np.zeros(len(counts))
+        self.colors = np.zeros(len(counts), dtype=np.int64)
+        if len(positions):
+            order = np.argsort(self.clusters, kind='stable')
+            starts = np.searchsorted(self.clusters[order], np.arange(len(counts)))
+            sorted_positions = positions[order]
+            extent = np.maximum.reduceat(sorted_positions, starts) - np.minimum.reduceat(sorted_positions, starts)
+            self.extents = extent.max(axis=1)
+            self.colors = np.asarray(scene.graph_to_display.vs['color'], dtype=np.int64)[order[starts]]
+        self.counts = counts
+
+        # The indexes hold everything at this point
+        self.expanded = np.ones(len(counts), dtype=bool)
+        self.apply(self.target(scale))
+
+    def target(self, scale):
+        expanded = self.extents * scale > self.EXPAND_SIZE
+        for cluster, value in self.overrides.items():
+            index = np.searchsorted(self.cluster_ids, cluster)
+            if index < len(self.cluster_ids) and self.cluster_ids[index] == cluster:
+                expanded[index] = value
+        return expanded
+
+    def update(self, scale):
+        """
+        Expand and collapse clusters for a new zoom level
+        """
+        expanded = self.target(scale)
+        if not np.array_equal(expanded, self.expanded):
+            self.apply(expanded)
+
+    def toggle(self, vertex_id=None, super_node=None):
+        """
+        Collapse the cluster of a vertex, or expand the cluster of a super-node, whatever the zoom level
+        """
+        if super_node is not None:
+            self.overrides[super_node.cluster] = True
+        else:
+            self.overrides[int(self.cluster_ids[self.clusters[vertex_id]])] = False
+        self.apply(self.target(self.scene.parent.current_scale()))
+
+    def apply(self, expanded):
+        scene = self.scene
+        visible = expanded[self.clusters]
+        was_visible = self.expanded[self.clusters]
+        for vertex_id in np.nonzero(was_visible & ~visible)[0].tolist():
+            scene.vertex_index.remove(vertex_id)
+        for vertex_id in np.nonzero(visible & ~was_visible)[0].tolist():
+            scene.vertex_index.insert(vertex_id)
+
+        # Edges are only drawn as they are between two expanded clusters
+        ends = scene.edge_ends
+        edge_visible = visible[ends[:, 0]] & visible[ends[:, 1]]
+        edge_was_visible = was_visible[ends[:, 0]] & was_visible[ends[:, 1]]
+        for edge_id in np.nonzero(edge_was_visible & ~edge_visible)[0].tolist():
+            scene.edge_index.remove(edge_id)
+        for edge_id in np.nonzero(edge_visible & ~edge_was_visible)[0].tolist():
+            scene.edge_index.insert(edge_id)
+
+        self.expanded = expanded
+        self.remove_items()
+        self.add_items(visible, edge_visible)
+        scene.static_changed()
+
+        # Release the items of the clusters just collapsed, create the ones of the clusters just expanded
+        scene.culled_rect = QRectF()
+        scene.cull(scene.parent.visible_scene_rect())
+
+    def add_items(self, visible, edge_visible):
+        scene = self.scene
+        d = scene.parent.SETTINGS['point_diameter']
+        point_pen = scene.point_pen()
+        for index in np.nonzero(~self.expanded)[0].tolist():
+            node = SuperNode(
+                int(self.cluster_ids[index]), int(self.counts[index]), self.centers[index].tolist(),
+                d * np.sqrt(self.counts[index]), point_pen, palette.brush(self.colors[index])
+            )
+            scene.addItem(node)
+            self.nodes[index] = node
+
+        # Ends of merged edges are units: a vertex of an expanded cluster, or a collapsed cluster (after the vertices)
+        vertex_count = len(self.clusters)
+        units = np.where(visible, np.arange(vertex_count), vertex_count + self.clusters)
+        merged = units[scene.edge_ends[~edge_visible]]
+        merged = np.sort(merged[merged[:, 0] != merged[:, 1]], axis=1)
+        if not len(merged):
+            return
+        pairs, counts = np.unique(merged, axis=0, return_counts=True)
+
+        unit_positions = np.vstack([scene.positions.reshape(-1, 2), self.centers])
+        color = scene.color_code(scene.parent.SETTINGS['edge_color'])
+        width = scene.parent.SETTINGS['edge_width']
+        for (a, b), count in zip(pairs.tolist(), counts.tolist()):
+            pen = palette.pen(color, width * (1 + self.WIDTH_PER_DOUBLING * np.log2(count)))
+            edge = SuperEdge(unit_positions[a].tolist(), unit_positions[b].tolist(), count, pen)
+            scene.addItem(edge)
+            self.edges.append(edge)
+
+    def remove_items(self):
+        for item in list(self.nodes.values()) + self.edges:
+            self.scene.removeItem(item)
+        self.nodes = {}
+        self.edges = []
+
+    def clear(self):
+        # Back to every vertex and edge, e.g. before editing the graph
+        self.apply(np.ones(len(self.expanded), dtype=bool))
+        self.remove_items()
@@ -0,0 +1,78 @@
+import math
+from collections import OrderedDict
+
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QPixmap, QPainter
+
+
+class TileCache:
+    """
+    Offscreen pixmaps of the static part of a scene. The scene is cut into square tiles of TILE_SIZE pixels at the
+    current zoom level, and every tile is rendered once and then only blitted, until something inside it changes. Tiles
+    are kept per zoom level, so zooming back and forth or rotating the view does not render them again
+    """
+    TILE_SIZE = 256
+    MAX_TILES = 512
+
+    def __init__(self):
+        self.tiles = OrderedDict()
+
+    def clear(self):
+        self.tiles.clear()
+
+    @staticmethod
+    def scale_key(scale):
+        return round(scale, 4)
+
+    def tile_rect(self, scale, i, j):
+        size = self.TILE_SIZE / scale
+        return QRectF(i * size, j * size, size, size)
+
+    def invalidate(self, rect=None):
+        """
+        Drop the tiles intersecting a rectangle
+
+        :param rect: QRectF or None, rectangle in scene coordinates. None drops every tile
+        """
+        if rect is None:
+            self.clear()
+            return
+
+        for key in [key for key in self.tiles if self.tile_rect(*key).intersects(rect)]:
+            del self.tiles[key]
+
+    def draw(self, painter, exposed_rect, scale, render):
+        """
+        Paint the tiles covering an exposed area, rendering the missing ones
+
+        :param painter: QPainter, painter of the view, set up with the view transform
+        :param exposed_rect: QRectF, area to paint in scene coordinates
+        :param scale: float, current scale of the view
+        :param render: callable(QPainter, QRectF, QRectF), renders a scene rectangle into a target rectangle
+        """
+        scale = self.scale_key(scale)
+        size = self.TILE_SIZE / scale
+
+        for i in range(math.floor(exposed_rect.left() / size), math.floor(exposed_rect.right() / size) + 1):
+            for j in range(math.floor(exposed_rect.top() / size), math.floor(exposed_rect.bottom() / size) + 1):
+                key = (scale, i, j)
+                pixmap = self.tiles.get(key)
+                if pixmap is None:
+                    pixmap = self.render_tile(render, self.tile_rect(*key), painter.renderHints())
+                    self.tiles[key] = pixmap
+                    if len(self.tiles) > self.MAX_TILES:
+                        self.tiles.popitem(last=False)
+                else:
+                    self.tiles.move_to_end(key)
+
+                painter.drawPixmap(self.tile_rect(*key), pixmap, QRectF(pixmap.rect()))
+
+    def render_tile(self, render, source, render_hints):
+        pixmap = QPixmap(self.TILE_SIZE, self.TILE_SIZE)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHints(render_hints)
+        render(painter, QRectF(0, 0, self.TILE_SIZE, self.TILE_SIZE), source)
+        painter.end()
+        return pixmap
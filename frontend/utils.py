@@ -1,15 +1,42 @@
+import numpy as np
+from PyQt5.QtCore import QRectF, QPointF
+
+
 def dilate(original_x, original_y, origin_point, dilate_factor):
+    # Works on single coordinates as well as on whole NumPy columns
     dilated_x = origin_point.x() + dilate_factor * (original_x - origin_point.x())
     dilated_y = origin_point.y() + dilate_factor * (original_y - origin_point.y())
     return dilated_x, dilated_y
 
 
 def undilate(dilated_x, dilated_y, origin_point, dilate_factor):
+    # Works on single coordinates as well as on whole NumPy columns
     original_x = origin_point.x() + (dilated_x - origin_point.x()) / dilate_factor
     original_y = origin_point.y() + (dilated_y - origin_point.y()) / dilate_factor
     return original_x, original_y
 
 
+def dilate_array(original_x, original_y, origin_point, dilate_factor):
+    """
+    Dilate coordinate columns
+
+    :param original_x: [float] or numpy.ndarray, x coordinates
+    :param original_y: [float] or numpy.ndarray, y coordinates
+    :param origin_point: QPointF, center of the dilation
+    :param dilate_factor: float, factor of the dilation
+    :return: numpy.ndarray, (n, 2) array of dilated coordinates
+    """
+    original_x = np.asarray(original_x, dtype=float)
+    original_y = np.asarray(original_y, dtype=float)
+    return np.column_stack(dilate(original_x, original_y, origin_point, dilate_factor)).reshape(-1, 2)
+
+
+def bounding_rect(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return QRectF(QPointF(x.min(), y.min()), QPointF(x.max(), y.max()))
+
+
 def scale_factor_hint(outer_rect, inner_rect, ratio):
     width_ratio = (outer_rect.width() / ratio) / inner_rect.width()
     height_ratio = (outer_rect.height() / ratio) / inner_rect.height()
@@ -18,3 +45,23 @@ def scale_factor_hint(outer_rect, inner_rect, ratio):
         return height_ratio
     else:
         return width_ratio
+
+
+def group_rows(rows, *columns):
+    """
+    Split rows into groups of rows sharing the same values in every column
+
+    :param rows: [int] or numpy.ndarray, the rows to group
+    :param columns: numpy.ndarray, one value per row (indexed by row)
+    :return: [(int, numpy.ndarray)], for every group one representative row and all rows of the group
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if not rows.size:
+        return []
+
+    keys = np.column_stack([np.asarray(column)[rows] for column in columns])
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind='stable')
+    groups = np.split(rows[order], np.cumsum(np.bincount(inverse))[:-1])
+    return list(zip(rows[first].tolist(), groups))
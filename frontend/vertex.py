@@ -1,13 +1,14 @@
-from PyQt5.QtCore import QRectF, QPointF, QSizeF
+from PyQt5.QtCore import QRectF, QPointF, QSizeF, Qt
+from PyQt5.QtGui import QBrush
 from PyQt5.QtWidgets import QGraphicsEllipseItem
 
 
 class MainVertex(QGraphicsEllipseItem):
-    def __init__(self, vertex, diameter, pen, brush, parent):
+    def __init__(self, vertex, pos, diameter, pen, brush, parent):
         self.vertex = vertex
         self.diameter = diameter
-        self.rect = QRectF(QPointF(self.vertex['pos']['x'] - self.diameter / 2,
-                                   self.vertex['pos']['y'] - self.diameter / 2), QSizeF(self.diameter, self.diameter))
+        self.rect = QRectF(QPointF(pos[0] - self.diameter / 2,
+                                   pos[1] - self.diameter / 2), QSizeF(self.diameter, self.diameter))
         super().__init__(self.rect.x(), self.rect.y(), self.diameter, self.diameter)
 
         self.parent = parent
@@ -32,6 +33,21 @@ class MainVertex(QGraphicsEllipseItem):
     def y(self):
         return self.rect.y() + self.diameter / 2
 
+    def move_to(self, x, y):
+        self.rect.moveTo(x - self.diameter / 2, y - self.diameter / 2)
+        self.setRect(self.rect)
+
+    def rebind(self, vertex, pos, pen, brush):
+        # Reuse the item for another vertex, see MainScene.cull
+        self.vertex = vertex
+        self.lines = []
+        self._highlighted = False
+        self._persistent = False
+        self.setPen(pen)
+        self.update_default_pen()
+        self.set_default_brush(brush)
+        self.move_to(*pos)
+
     def mousePressEvent(self, event):
         self.parent.parent.main_window.display_node(self)
         self.parent.parent.main_window.get_shortest_path_nodes(self)
@@ -39,31 +55,36 @@ class MainVertex(QGraphicsEllipseItem):
         self.parent.parent.main_window.get_add_link_nodes(self)
 
     def mouseMoveEvent(self, event):
-        cursor_pos = event.scenePos()
-        adjusted_cursor_pos = QPointF(cursor_pos.x() - self.diameter / 2, cursor_pos.y() - self.diameter / 2)
-
-        self.rect.moveTopLeft(adjusted_cursor_pos)
-        self.rect.setTopLeft(adjusted_cursor_pos)
-
-        self.setRect(self.rect)
-        self.parent.update_vertex(self)
-        [line.stick() for line in self.lines]
-
-        self.parent.parent.main_window.display_node(self)
+        self.parent.drag_to(self, event.scenePos())
 
     def mouseReleaseEvent(self, event):
         pass
 
+    def paint(self, painter, option, widget=None):
+        if not self.parent.should_paint(self):
+            return
+        if not self.parent.low_detail or self._highlighted or self._persistent:
+            super().paint(painter, option, widget)
+            return
+
+        if option.levelOfDetailFromTransform(painter.worldTransform()) * self.diameter < 1:
+            return  # smaller than a pixel
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.brush())
+        painter.drawEllipse(self.rect)
+
     def highlight_self(self):
         pen = self.pen()
         pen.setColor(self.parent.COLORS['red'])
-        pen.setWidth(self.parent.parent.SETTINGS['point_border_width'] * 4)
+        pen.setWidthF(self.parent.parent.SETTINGS['point_border_width'] * 4)
         self.setPen(pen)
         self.setBrush(self.parent.COLORS[self.parent.parent.SETTINGS['highlight_color']])
+        self.parent.set_live(self, True)
 
     def unhighlight_self(self):
         self.setPen(self._pen)
         self.setBrush(self._brush)
+        self.parent.set_live(self, False)
 
     def update_default_pen(self):
         self._pen = self.pen()
@@ -71,6 +92,11 @@ class MainVertex(QGraphicsEllipseItem):
     def update_default_brush(self):
         self._brush = self.brush()
 
+    def set_default_brush(self, brush):
+        self._brush = QBrush(brush)
+        if not self._highlighted and not self._persistent:
+            self.setBrush(self._brush)
+
     def setPersistent(self, boolean):
         self._persistent = boolean
 
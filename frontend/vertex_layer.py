@@ -0,0 +1,407 @@
+import numpy as np
+from PyQt5.QtCore import QRectF, QPointF, Qt
+from PyQt5.QtGui import QPen, QColor, QBrush, QPolygonF
+from PyQt5.QtWidgets import QGraphicsItem
+
+from frontend.utils import group_rows
+
+
+class VertexLayer(QGraphicsItem):
+    """
+    Draws all vertices of a scene as one graphics item. Positions, diameters and colors live in NumPy arrays with one
+    row per vertex. Vertices sharing the same style are painted as round points with one drawPoints call, and the
+    GridIndex of the scene is used to find the vertex under the cursor. Like in the EdgeLayer, vertices drawn in another
+    style than their default one are painted again on top instead of regrouping the whole layer
+    """
+
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+
+        self.positions = np.zeros((0, 2))
+        self.diameters = np.zeros(0)
+        self.brush_colors = np.zeros(0, dtype=np.uint32)
+        self.pen_colors = np.zeros(0, dtype=np.uint32)
+        self.pen_widths = np.zeros(0)
+        self.default_brush_colors = np.zeros(0, dtype=np.uint32)
+        self.default_pen_colors = np.zeros(0, dtype=np.uint32)
+        self.default_pen_widths = np.zeros(0)
+        self.visible = np.zeros(0, dtype=bool)
+        self.handles = []
+
+        self._batches = None
+        self._batch_slots = None
+        self._overrides = set()
+        self._overlay = None
+        self._bounds = QRectF()
+
+    def add_vertices(self, vertices, positions, diameter, pen, colors):
+        """
+        Append vertices to the layer
+
+        :param vertices: [igraph.Vertex], vertices to draw
+        :param positions: numpy.ndarray, (n, 2) array of scene coordinates
+        :param diameter: float, diameter of the vertices
+        :param pen: QPen, border of the vertices
+        :param colors: [int], style code (see frontend.palette) of the fill of each vertex
+        :return: [LayerVertex], one handle per appended vertex
+        """
+        first_row = len(self.handles)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        n = len(positions)
+        brush_colors = np.array(colors, dtype=np.uint32).reshape(n)
+        pen_colors = np.full(n, pen.color().rgba(), dtype=np.uint32)
+        pen_widths = np.full(n, pen.widthF())
+
+        self.positions = np.concatenate([self.positions, positions])
+        self.diameters = np.concatenate([self.diameters, np.full(n, float(diameter))])
+        self.brush_colors = np.concatenate([self.brush_colors, brush_colors])
+        self.pen_colors = np.concatenate([self.pen_colors, pen_colors])
+        self.pen_widths = np.concatenate([self.pen_widths, pen_widths])
+        self.default_brush_colors = np.concatenate([self.default_brush_colors, brush_colors])
+        self.default_pen_colors = np.concatenate([self.default_pen_colors, pen_colors])
+        self.default_pen_widths = np.concatenate([self.default_pen_widths, pen_widths])
+        self.visible = np.concatenate([self.visible, np.ones(n, dtype=bool)])
+
+        handles = [LayerVertex(vertex, self, first_row + i) for i, vertex in enumerate(vertices)]
+        self.handles.extend(handles)
+
+        self._batches = None
+        self.grow_bounds(positions, self.extent(slice(first_row, None)))
+        return handles
+
+    def extent(self, rows):
+        # Half of the size a vertex takes on screen, border included
+        return (self.diameters[rows] + self.pen_widths[rows]) / 2
+
+    def grow_bounds(self, positions, extent):
+        if not len(positions):
+            return
+
+        rect = QRectF(QPointF(*(positions - extent[:, None]).min(axis=0)),
+                      QPointF(*(positions + extent[:, None]).max(axis=0)))
+        if not self._bounds.contains(rect):
+            self.prepareGeometryChange()
+            self._bounds = self._bounds.united(rect) if not self._bounds.isNull() else rect
+
+    def row_rect(self, row):
+        x, y = self.positions[row]
+        r = self.extent(row)
+        return QRectF(x - r, y - r, 2 * r, 2 * r)
+
+    def set_position(self, row, x, y):
+        old_rect = self.row_rect(row)
+        self.positions[row] = (x, y)
+
+        if self._batch_slots is not None and row in self._batch_slots:
+            batch, slot = self._batch_slots[row]
+            self._batches[batch][2].replace(slot, QPointF(x, y))
+        if row in self._overrides:
+            self._overlay = None
+
+        self.grow_bounds(self.positions[row:row + 1], self.extent(slice(row, row + 1)))
+        self.update(old_rect.united(self.row_rect(row)))
+
+    def set_positions(self, rows, positions):
+        """
+        Move many vertices at once. The batches are rebuilt from the positions array on the next paint and the bounds
+        are recomputed from scratch, so they can shrink too
+
+        :param rows: [int], rows of the vertices to move
+        :param positions: numpy.ndarray, (n, 2) array of new scene coordinates
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.positions[rows] = positions
+
+        self.invalidate_batches()
+        self._overlay = None
+        self.prepareGeometryChange()
+        self._bounds = QRectF()
+        self.grow_bounds(self.positions, self.extent(slice(None)))
+        self.update()
+
+    def brush(self, row):
+        return QBrush(QColor.fromRgba(int(self.brush_colors[row])))
+
+    def pen(self, row):
+        pen = QPen(QColor.fromRgba(int(self.pen_colors[row])))
+        pen.setWidthF(self.pen_widths[row])
+        return pen
+
+    def set_brush(self, row, color, current=True, default=False):
+        if default:
+            self.default_brush_colors[row] = color.rgba()
+            self.invalidate_batches()
+        if current:
+            self.brush_colors[row] = color.rgba()
+        self.restyled(row)
+
+    def set_pen(self, row, pen, current=True, default=False):
+        if default:
+            self.default_pen_colors[row] = pen.color().rgba()
+            self.default_pen_widths[row] = pen.widthF()
+            self.invalidate_batches()
+        if current:
+            self.pen_colors[row] = pen.color().rgba()
+            self.pen_widths[row] = pen.widthF()
+            self.grow_bounds(self.positions[row:row + 1], self.extent(slice(row, row + 1)))
+        self.restyled(row)
+
+    def restore_style(self, row):
+        self.brush_colors[row] = self.default_brush_colors[row]
+        self.pen_colors[row] = self.default_pen_colors[row]
+        self.pen_widths[row] = self.default_pen_widths[row]
+        self.restyled(row)
+
+    def update_default_brush(self, row):
+        self.default_brush_colors[row] = self.brush_colors[row]
+        self.invalidate_batches()
+        self.restyled(row)
+
+    def update_default_pen(self, row):
+        self.default_pen_colors[row] = self.pen_colors[row]
+        self.default_pen_widths[row] = self.pen_widths[row]
+        self.invalidate_batches()
+        self.restyled(row)
+
+    def set_default_brushes(self, rows, colors, current):
+        """
+        Recolor many vertices at once, e.g. after clustering
+
+        :param rows: [int], rows of the vertices
+        :param colors: [int], new default style code of the fill of each vertex
+        :param current: [bool], whether each vertex is also drawn with the new fill right away
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        colors = np.asarray(colors, dtype=np.uint32)
+        current = np.asarray(current, dtype=bool)
+        self.default_brush_colors[rows] = colors
+        self.brush_colors[rows[current]] = colors[current]
+
+        restyled = (self.brush_colors[rows] != self.default_brush_colors[rows]) | \
+            (self.pen_colors[rows] != self.default_pen_colors[rows]) | \
+            (self.pen_widths[rows] != self.default_pen_widths[rows])
+        self._overrides.difference_update(rows.tolist())
+        self._overrides.update(rows[restyled].tolist())
+
+        self.invalidate_batches()
+        self._overlay = None
+        self.update()
+
+    def restyled(self, row):
+        # Keep track of the rows not drawn in their default style
+        if self.brush_colors[row] != self.default_brush_colors[row] or \
+                self.pen_colors[row] != self.default_pen_colors[row] or \
+                self.pen_widths[row] != self.default_pen_widths[row]:
+            self._overrides.add(row)
+        elif row in self._overrides:
+            # Back to its default style, the row is drawn from the cached static part again
+            self._overrides.discard(row)
+            self.parent.static_changed(self.row_rect(row))
+        self._overlay = None
+        self.update(self.row_rect(row))
+
+    def invalidate_batches(self):
+        self._batches = None
+        self._batch_slots = None
+
+    def set_visible(self, row, visible):
+        self.visible[row] = visible
+        self.invalidate_batches()
+        self._overlay = None
+        self.update(self.row_rect(row))
+        self.parent.static_changed(self.row_rect(row))
+
+    def vertex_at(self, pos):
+        """
+        Find the vertex drawn under a point
+
+        :param pos: QPointF, point in scene coordinates
+        :return: LayerVertex or None
+        """
+        scene = self.parent
+        if scene.vertex_index is None:
+            return None
+        point_id = scene.vertex_index.nearest(pos.x(), pos.y(), scene.vertex_radius())
+        return None if point_id is None else self.own(scene.indexed_points[point_id])
+
+    def vertices_in(self, rect):
+        """
+        Find the vertices whose center lies inside a rectangle
+
+        :param rect: QRectF, rectangle in scene coordinates
+        :return: [LayerVertex]
+        """
+        scene = self.parent
+        if scene.vertex_index is None:
+            return []
+        point_ids = scene.vertex_index.in_rect(rect.left(), rect.top(), rect.right(), rect.bottom())
+        return [point for point in map(self.own, (scene.indexed_points[i] for i in point_ids)) if point is not None]
+
+    def own(self, item):
+        # The scene index holds the vertices of every layer and the vertices drawn as items
+        return item if isinstance(item, LayerVertex) and item.layer is self else None
+
+    def batches(self):
+        # Group the visible vertices by their default style, so that each group can be drawn with two drawPoints calls:
+        # one for the border and one for the fill
+        if self._batches is None:
+            self._batches = self.group(
+                np.flatnonzero(self.visible),
+                self.default_brush_colors, self.default_pen_colors, self.default_pen_widths
+            )
+            self._batch_slots = {
+                row: (batch, slot)
+                for batch, (_, _, _, rows) in enumerate(self._batches)
+                for slot, row in enumerate(rows)
+            }
+        return self._batches
+
+    def overlay(self):
+        if self._overlay is None:
+            rows = [row for row in self._overrides if self.visible[row]]
+            self._overlay = self.group(rows, self.brush_colors, self.pen_colors, self.pen_widths)
+        return self._overlay
+
+    def group(self, rows, brush_colors, pen_colors, pen_widths):
+        batches = []
+        for row, group in group_rows(rows, brush_colors, pen_colors, pen_widths, self.diameters):
+            border_pen = QPen(QColor.fromRgba(int(pen_colors[row])))
+            border_pen.setWidthF(self.diameters[row] + pen_widths[row])
+            border_pen.setCapStyle(Qt.RoundCap)
+
+            fill_pen = QPen(QColor.fromRgba(int(brush_colors[row])))
+            fill_pen.setWidthF(max(self.diameters[row] - pen_widths[row], 0))
+            fill_pen.setCapStyle(Qt.RoundCap)
+
+            polygon = to_polygon(self.positions[group])
+            batches.append((border_pen, fill_pen, polygon, group.tolist()))
+        return batches
+
+    def boundingRect(self):
+        return self._bounds
+
+    def contains(self, point):
+        return self.vertex_at(point) is not None
+
+    def paint(self, painter, option, widget=None):
+        level_of_detail = option.levelOfDetailFromTransform(painter.worldTransform())
+        draw_static, draw_live = self.parent.layer_passes()
+
+        for border_pen, fill_pen, polygon, _ in (self.batches() if draw_static else []):
+            if not self.parent.low_detail:
+                painter.setPen(border_pen)
+                painter.drawPoints(polygon)
+            elif level_of_detail * fill_pen.widthF() < 1:
+                continue  # smaller than a pixel
+            painter.setPen(fill_pen)
+            painter.drawPoints(polygon)
+
+        # Highlighted and selected vertices keep their border whatever the level of detail
+        for border_pen, fill_pen, polygon, _ in (self.overlay() if draw_live else []):
+            painter.setPen(border_pen)
+            painter.drawPoints(polygon)
+            painter.setPen(fill_pen)
+            painter.drawPoints(polygon)
+
+
+def to_polygon(positions):
+    # Fill the QPolygonF through its memory instead of building one QPointF per point
+    polygon = QPolygonF(len(positions))
+    if len(positions):
+        pointer = polygon.data()
+        pointer.setsize(len(positions) * 2 * np.dtype(np.float64).itemsize)
+        np.ndarray(shape=(len(positions), 2), dtype=np.float64, buffer=pointer)[:] = positions
+    return polygon
+
+
+class LayerVertex:
+    """
+    Stands in for a MainVertex when the vertex is drawn by a VertexLayer, so the rest of the scene can treat both the
+    same way
+    """
+    __slots__ = ('vertex', 'layer', 'row', 'parent', 'lines', '_highlighted', '_persistent')
+
+    def __init__(self, vertex, layer, row):
+        self.vertex = vertex
+        self.layer = layer
+        self.row = row
+        self.parent = layer.parent
+        self.lines = []
+
+        self._highlighted = False
+        self._persistent = False
+
+    @property
+    def diameter(self):
+        return self.layer.diameters[self.row]
+
+    def attach_line(self, line):
+        self.lines.append(line)
+
+    def x(self):
+        return self.layer.positions[self.row, 0]
+
+    def y(self):
+        return self.layer.positions[self.row, 1]
+
+    def move_to(self, x, y):
+        self.layer.set_position(self.row, x, y)
+
+    def mousePressEvent(self, event):
+        self.parent.parent.main_window.display_node(self)
+        self.parent.parent.main_window.get_shortest_path_nodes(self)
+        self.parent.parent.main_window.get_recolor_nodes(self)
+        self.parent.parent.main_window.get_add_link_nodes(self)
+
+    def mouseMoveEvent(self, event):
+        self.parent.drag_to(self, event.scenePos())
+
+    def mouseReleaseEvent(self, event):
+        pass
+
+    def pen(self):
+        return self.layer.pen(self.row)
+
+    def setPen(self, pen):
+        self.layer.set_pen(self.row, pen)
+
+    def brush(self):
+        return self.layer.brush(self.row)
+
+    def setBrush(self, brush):
+        self.layer.set_brush(self.row, QBrush(brush).color())
+
+    def highlight_self(self):
+        pen = self.pen()
+        pen.setColor(self.parent.COLORS['red'])
+        pen.setWidthF(self.parent.parent.SETTINGS['point_border_width'] * 4)
+        self.setPen(pen)
+        self.setBrush(self.parent.COLORS[self.parent.parent.SETTINGS['highlight_color']])
+
+    def unhighlight_self(self):
+        self.layer.restore_style(self.row)
+
+    def update_default_pen(self):
+        self.layer.update_default_pen(self.row)
+
+    def update_default_brush(self):
+        self.layer.update_default_brush(self.row)
+
+    def set_default_brush(self, brush):
+        self.layer.set_brush(
+            self.row, QBrush(brush).color(), current=not self._highlighted and not self._persistent, default=True
+        )
+
+    def setPersistent(self, boolean):
+        self._persistent = boolean
+
+    def isPersistent(self):
+        return self._persistent
+
+    def setHighlighted(self, boolean):
+        self._highlighted = boolean
+
+    def isHighlighted(self):
+        return self._highlighted
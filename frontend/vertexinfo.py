@@ -7,6 +7,7 @@ from backend.vertex import update_vertex
 class VertexInfo(QWidget):
     def __init__(self, point, parent):
         super().__init__()
+        self.point = point
         self.vertex = point.vertex
         self.parent = parent
 
@@ -24,6 +25,7 @@ class VertexInfo(QWidget):
 
         self.value_items = []
         self.edit_items = []
+        self.fields = {}
 
         count = 2
         for key, value in self.dictionary.items():
@@ -38,6 +40,7 @@ class VertexInfo(QWidget):
                 value_label = EditLabel(value_label_edit)
                 self.value_items.append(value_label)
                 self.edit_items.append(value_label_edit)
+                self.fields[key] = (value_label, value_label_edit)
 
                 value_label.setText(str(value))
                 value_label_edit.setText(str(value))
@@ -55,6 +58,15 @@ class VertexInfo(QWidget):
             self.edit_items[i].editingFinished.connect(f)
             self.edit_items[i].editingFinished.connect(self.save_info)
 
+    def update_position(self):
+        # Only the coordinates change while the vertex is dragged, the rest of the widget is left as it is
+        for key in ('x', 'y'):
+            if key in self.fields:
+                value_label, value_label_edit = self.fields[key]
+                if not value_label_edit.hasFocus():
+                    value_label.setText(str(self.point.vertex[key]))
+                    value_label_edit.setText(str(self.point.vertex[key]))
+
     @staticmethod
     def text_edited(value, edit):
         def f():
@@ -77,7 +89,7 @@ class VertexInfo(QWidget):
             self.vertex[i] = new_value
 
         update_vertex(self.parent.graph, self.vertex)
-        self.parent.view.update_view()
+        self.parent.view.update_view(vertices=[self.vertex.index])
 
 class EditLabel(QLineEdit):
     def __init__(self, edit):
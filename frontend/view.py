@@ -1,8 +1,11 @@
+import math
+
 from PyQt5.QtCore import QRect, Qt
 from PyQt5.QtGui import QTransform, QColor
 from PyQt5.QtWidgets import QGraphicsView
 
 from frontend.scene import MainScene
+from frontend.tile_cache import TileCache
 
 
 class MainView(QGraphicsView):
@@ -11,13 +14,28 @@ class MainView(QGraphicsView):
     ZOOM_OUT_FACTOR = 0.9
     ZOOM_OUT_LIMIT = -4
 
+    # Below this scale the scene is drawn in low detail: no vertex borders, hairline edges, no hovering
+    LOW_DETAIL_SCALE = 0.75
+    # Colors of the shortest paths shown at once, the first one for the shortest. Green is the blinking color
+    PATH_COLORS = [QColor(color) for color in (Qt.red, Qt.blue, Qt.magenta, Qt.darkYellow, Qt.cyan, Qt.darkRed,
+                                               Qt.darkBlue, Qt.darkMagenta, Qt.darkCyan, Qt.gray)]
+
     SETTINGS = {
         'background_color': 'light_gray',
         'point_diameter': 8,
         'point_border_width': 0.5,
         'edge_color': 'black',
         'edge_width': 1,
-        'highlight_color': 'green'
+        'highlight_color': 'green',
+        'batched_vertices': False,
+        'batched_edges': False,
+        'cached_rendering': False,
+        'lazy_items': False,
+        'cluster_sidecar': False,
+        'layout_sidecar': False,
+        'incremental_clustering': False,
+        'cluster_super_nodes': False,
+        'landmark_routing': False
     }
 
     def __init__(self, parent, main_window):
@@ -32,9 +50,10 @@ class MainView(QGraphicsView):
         self.availability = False
         self._sp_colors = [QColor(Qt.red), QColor(Qt.green)]
         self._sp_color_index = 0
-        self._edge_path = None
-        self._vertex_path = None
+        self._edge_paths = []
+        self._vertex_paths = []
         self._zoom = 0
+        self.tile_cache = TileCache()
 
     # AUXILIARY FUNCTIONS
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -44,15 +63,47 @@ class MainView(QGraphicsView):
     def add_link(self, edge):
         self.scene.add_link(edge)
 
-    def update_view(self):
-        self.scene = MainScene(self)
-        self.setScene(self.scene)
-        self.scene.display()
+    def update_view(self, vertices=None, edges=None, rebuild=False, refit=True):
+        """
+        Bring the scene up to date with the graph. The existing scene is patched in place unless the graph has changed
+        structurally (or a rebuild is forced), in which case a new scene is built from scratch
+
+        :param vertices: [int] or None, ids of the vertices that changed. See MainScene.refresh
+        :param edges: [int] or None, ids of the edges that changed. See MainScene.refresh
+        :param rebuild: bool, always build a new scene
+        :param refit: bool, see MainScene.refresh
+        """
+        if rebuild or self.scene is None or self.scene.needs_rebuild():
+            self.scene = MainScene(self)
+            self.setScene(self.scene)
+            self.tile_cache.clear()
+            self.scene.display()
+            self.update_level_of_detail()
+            if self.scene.culling:
+                self.scene.cull(self.visible_scene_rect())
+        else:
+            self.scene.refresh(vertices, edges, refit)
 
     def settings(self, kwargs):
         for key in kwargs.keys():
             self.SETTINGS[key] = kwargs[key]
-        self.update_view()
+        self.update_view(rebuild=True)
+
+    def invalidate_cache(self, rect=None):
+        """
+        Forget the cached rendering of part of the scene, to be called whenever something static changes
+
+        :param rect: QRectF or None, changed area in scene coordinates. None forgets everything
+        """
+        self.tile_cache.invalidate(rect)
+        self.viewport().update()
+
+    def render_static(self, painter, target, source):
+        self.scene.rendering_tiles = True
+        try:
+            self.scene.render(painter, target, source, Qt.IgnoreAspectRatio)
+        finally:
+            self.scene.rendering_tiles = False
 
     # ------------------------------------------------------------------------------------------------------------------
 
@@ -68,6 +119,17 @@ class MainView(QGraphicsView):
 
     # EVENT HANDLING
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.scene is not None and self.scene.culling:
+            self.scene.follow_viewport(self.visible_scene_rect())
+
+    def drawBackground(self, painter, rect):
+        super().drawBackground(painter, rect)
+        if self.scene is not None and self.SETTINGS['cached_rendering'] and not self.scene.rendering_tiles:
+            # The static part of the scene comes from the tile cache, the items then only paint what is live
+            self.tile_cache.draw(painter, rect, self.current_scale(), self.render_static)
+
     def wheelEvent(self, event):
         old_cursor_pos = self.mapToScene(event.pos())
 
@@ -122,18 +184,24 @@ class MainView(QGraphicsView):
 
     # SHORTEST PATH
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-    def set_edge_path(self, edge_path):
-        self._edge_path = edge_path
-        self._vertex_path = []
-
-        for i in range(0, len(edge_path)):
-            source_vertex_id = self.main_window.graph.es[edge_path[i]].source
-            if source_vertex_id not in self._vertex_path:
-                self._vertex_path.append(source_vertex_id)
-
-            target_vertex_id = self.main_window.graph.es[edge_path[i]].target
-            if target_vertex_id not in self._vertex_path:
-                self._vertex_path.append(target_vertex_id)
+    def set_edge_paths(self, edge_paths):
+        """
+        Paths to blink, each one in its own color. Edges and vertices shared by several paths take the color of the
+        first of them, i.e. the shortest one
+
+        :param edge_paths: [[int]], edge ids of every path
+        """
+        self._edge_paths = edge_paths
+        self._vertex_paths = []
+
+        for edge_path in edge_paths:
+            vertex_path = []
+            for edge_id in edge_path:
+                edge = self.main_window.graph.es[edge_id]
+                for vertex_id in (edge.source, edge.target):
+                    if vertex_id not in vertex_path:
+                        vertex_path.append(vertex_id)
+            self._vertex_paths.append(vertex_path)
 
     def real_time_highlight(self):
         if self._sp_color_index == 0:
@@ -141,19 +209,25 @@ class MainView(QGraphicsView):
         else:
             self._sp_color_index = 0
 
-        for edge_id in self._edge_path:
-            line = self.scene.lines[edge_id]
-            pen = line.pen()
-            pen.setColor(self._sp_colors[self._sp_color_index])
-            line.setPen(pen)
-
-        for vertex_id in self._vertex_path:
-            point = self.scene.points[vertex_id]
-            point.setBrush(self._sp_colors[self._sp_color_index])
+        # Painted from the last path to the first, so the shortest one ends up on top
+        for i in reversed(range(len(self._edge_paths))):
+            color = self._sp_colors[1] if self._sp_color_index else self.PATH_COLORS[i % len(self.PATH_COLORS)]
+            for edge_id in self._edge_paths[i]:
+                line = self.scene.lines[edge_id]
+                self.scene.set_live(line, True)
+                pen = line.pen()
+                pen.setColor(color)
+                line.setPen(pen)
+
+            for vertex_id in self._vertex_paths[i]:
+                point = self.scene.points[vertex_id]
+                self.scene.set_live(point, True)
+                point.setBrush(color)
 
     def unhighlight_path(self):
-        self.scene.unhighlight_edges(self._edge_path)
-        self.scene.unhighlight_vertices(self._vertex_path)
+        for edge_path, vertex_path in zip(self._edge_paths, self._vertex_paths):
+            self.scene.unhighlight_edges(edge_path)
+            self.scene.unhighlight_vertices(vertex_path)
 
     # ------------------------------------------------------------------------------------------------------------------
 
@@ -164,12 +238,14 @@ class MainView(QGraphicsView):
             self.scale(self.ZOOM_IN_FACTOR, self.ZOOM_IN_FACTOR)
             self.setDragMode(self.drag_mode_hint())
             self._zoom += 1
+            self.update_level_of_detail()
 
     def zoom_out(self):
         if self._zoom >= self.ZOOM_OUT_LIMIT:
             self.scale(self.ZOOM_OUT_FACTOR, self.ZOOM_OUT_FACTOR)
             self.setDragMode(self.drag_mode_hint())
             self._zoom -= 1
+            self.update_level_of_detail()
 
     def rotate_clockwise(self):
         self.rotate(1)
@@ -182,6 +258,21 @@ class MainView(QGraphicsView):
     def reset_view(self):
         self.setTransform(QTransform())
         self._zoom = 0
+        self.update_level_of_detail()
+
+    def current_scale(self):
+        transform = self.transform()
+        return math.hypot(transform.m11(), transform.m12())
+
+    def visible_scene_rect(self):
+        return self.mapToScene(self.viewport().rect()).boundingRect()
+
+    def update_level_of_detail(self):
+        low_detail = self.current_scale() < self.LOW_DETAIL_SCALE
+        if self.scene is not None and low_detail != self.scene.low_detail:
+            self.scene.set_low_detail(low_detail)
+        if self.scene is not None:
+            self.scene.update_super_nodes(self.current_scale())
 
     def drag_mode_hint(self):
         if (
@@ -3,20 +3,29 @@ import time
 import numpy as np
 from PyQt5 import uic
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon, QKeySequence, QPen, QColor
+from PyQt5.QtGui import QIcon, QKeySequence
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QGridLayout, QFileDialog, QMessageBox, QAction, \
     QShortcut, QColorDialog, QGraphicsView, QPushButton, QComboBox
 
 from igraph import Graph, write
 
-from backend.algorithm import get_shortest_paths
+from backend.algorithm import get_shortest_paths, k_shortest_paths
+from backend.clustering import cached_membership, compute_membership, store_membership
+from backend.landmarks import build_landmarks
+from backend.layout import compute_layout, save_layout_sidecar, load_layout_sidecar
+from backend.shortest_paths import MATRIX_MAX_VERTICES
+from backend.utils import structural_hash
 from backend.edge import create_edges
 from backend.vertex import create_vertices
+from frontend import palette
+from frontend.clustering_comparison_dialog import ClusteringComparisonDialog
 from frontend.create_attribute_dialog import CreateAttributeDialog
 from frontend.assign_attribute_value_dialog import AssignAttributeValueDialog
 from frontend.databar import DataBar
 from frontend.edgeinfo import EdgeInfo
 from frontend.gradient_and_thickness_dialog import GradientAndThicknessDialog
+from frontend.job_runner import JobRunner
+from frontend.layout_thread import LayoutThread
 from frontend.selection_list import SelectionList
 from frontend.utils import undilate
 from frontend.vertexinfo import VertexInfo
@@ -40,14 +49,20 @@ class MainWindow(QMainWindow):
     }
 
     LAYOUTS = {
-        'Circle': 'circle', 'Distributed Recursive Layout': 'drl',
+        'Barnes Hut': 'barnes_hut', 'Circle': 'circle', 'Distributed Recursive Layout': 'drl',
         'Fruchterman Reingold': 'fr', 'Fruchterman Reingold 3D': 'fr3d',
         'Kamada Kawai': 'kk', 'Kamada Kawai 3D': 'kk3d',
-        'Large Graph Layout': 'large', 'Random': 'random',
+        'Large Graph Layout': 'large', 'Multilevel': 'multilevel', 'Random': 'random',
         'Random 3D': 'random3d', 'Reingold Tilford': 'rt',
         'Reingold Tilford Circular': 'rt_circular', 'Sphere': 'sphere'
     }
 
+    # Layouts and clusterings of graphs with fewer vertices are computed right away, larger ones in a worker process
+    BACKGROUND_MIN_VERTICES = 500
+
+    # Layout computed from the current coordinates and shown while it settles, see LayoutThread
+    PROGRESSIVE_LAYOUT = 'Fruchterman Reingold'
+
     # FILE = 'frontend/resource/NREN.graphml'
 
     # Operation modes
@@ -71,12 +86,14 @@ class MainWindow(QMainWindow):
 
         # Set up data to work with
         self.graph = None
+        self.graph_path = None
         self.layout = self.DEFAULT_LAYOUT
         self.clustering_algorithm = self.DEFAULT_CLUSTERING_ALGORITHM
 
         # Set up GUI
         self.central_widget = self.findChild(QWidget, 'centralWidget')
         self.view = MainView(self.central_widget, self)
+        self.jobs = JobRunner(self)
         self.info_layout = self.findChild(QGridLayout, 'infoLayout')
 
         # Pull it up
@@ -319,6 +336,46 @@ class MainWindow(QMainWindow):
         revert_shortcut = QShortcut(QKeySequence(self.tr("Ctrl+Z", "View|Revert")), self)
         revert_shortcut.activated.connect(self.revert_view)
 
+        # View -> Compare Clustering Algorithms
+        comparison_button = self.findChild(QAction, 'actionCompare_Clustering')
+        comparison_button.triggered.connect(self.open_clustering_comparison)
+
+        # View -> Pause Layout
+        self.BUTTON_PAUSE_LAYOUT = self.findChild(QAction, 'actionPause_Layout')
+        self.BUTTON_PAUSE_LAYOUT.toggled.connect(self.pause_progressive_layout)
+        pause_layout_shortcut = QShortcut(QKeySequence(self.tr("Ctrl+P", "View|Pause Layout")), self)
+        pause_layout_shortcut.activated.connect(self.BUTTON_PAUSE_LAYOUT.toggle)
+
+        # View -> Performance, opt-in MainView.SETTINGS flags
+        self.connect_setting('actionBatched_Edges', 'batched_edges')
+        self.connect_setting('actionBatched_Vertices', 'batched_vertices')
+        self.connect_setting('actionCached_Rendering', 'cached_rendering')
+        self.connect_setting('actionLazy_Items', 'lazy_items')
+        self.connect_setting('actionCluster_Sidecar', 'cluster_sidecar', rebuild=False)
+        self.connect_setting('actionLayout_Sidecar', 'layout_sidecar', rebuild=False)
+        self.connect_setting('actionIncremental_Clustering', 'incremental_clustering', rebuild=False)
+        self.connect_setting('actionCluster_Super_Nodes', 'cluster_super_nodes')
+        self.connect_setting('actionLandmark_Routing', 'landmark_routing', rebuild=False)
+
+    def connect_setting(self, action_name, setting, rebuild=True):
+        """
+        Check and uncheck a setting of the view from a checkable action
+
+        :param action_name: str, name of the QAction
+        :param setting: str, key of MainView.SETTINGS
+        :param rebuild: bool, build the scene again when the setting changes, for the settings that decide how it is
+        built
+        """
+        action = self.findChild(QAction, action_name)
+        action.setChecked(self.view.SETTINGS[setting])
+        action.toggled.connect(lambda checked: self.set_setting(setting, checked, rebuild))
+
+    def set_setting(self, setting, value, rebuild=True):
+        if rebuild and self.graph is not None:
+            self.view.settings({setting: value})
+        else:
+            self.view.SETTINGS[setting] = value
+
     # ------------------------------------------------------------------------------------------------------------------
 
     # CROPPING
@@ -364,7 +421,7 @@ class MainWindow(QMainWindow):
                 if attr == 'edge_width':
                     value = self.view.SETTINGS['edge_width']
                 elif attr == 'edge_color':
-                    value = self.view.SETTINGS['edge_color']
+                    value = self.view.scene.color_code(self.view.SETTINGS['edge_color'])
                 elif attr == 'LinkSpeedRaw':
                     value = 1000000000.0
                 elif attr == 'delay':
@@ -444,6 +501,8 @@ class MainWindow(QMainWindow):
         reply = QMessageBox.question(self, '', 'Are you sure want to exit the program?',
                                      QMessageBox.Yes, QMessageBox.No)
         if reply == QMessageBox.Yes:
+            self.stop_progressive_layout()
+            self.jobs.shutdown()
             event.accept()
         else:
             event.ignore()
@@ -463,9 +522,8 @@ class MainWindow(QMainWindow):
         self.graph = create_vertices(self.graph, 1)
         new_vertex = self.graph.vs[self.graph.vcount() - 1]
 
-        new_vertex['pos'] = {'x': event.scenePos().x(), 'y': event.scenePos().y()}
         new_vertex['x'], new_vertex['y'] = undilate(
-            new_vertex['pos']['x'], new_vertex['pos']['y'], graph_center, scale_factor
+            event.scenePos().x(), event.scenePos().y(), graph_center, scale_factor
         )
 
         attributes = self.graph.vs[0].attributes()
@@ -474,14 +532,12 @@ class MainWindow(QMainWindow):
                 value = new_vertex['x']
             elif attr == 'Latitude' or attr == 'y':
                 value = new_vertex['y']
-            elif attr == 'pos':
-                value = new_vertex['pos']
             elif attr == 'availability':
                 value = np.random.randint(2)
             elif attr == 'id':
                 value = 'n' + str(new_vertex.index)
             elif attr == 'color':
-                value = QColor(Qt.red)
+                value = self.view.scene.color_code('red')
             else:
                 value = ''
 
@@ -506,6 +562,15 @@ class MainWindow(QMainWindow):
         self.BUTTON_DELETE_NODE.show()
         self.BUTTON_DELETE_LINK.hide()
 
+    def refresh_node_position(self, point):
+        # Called for every frame of a drag, so the widget already showing the vertex is updated rather than rebuilt
+        count = self.info_layout.count()
+        vertex_info = self.info_layout.itemAt(count - 1).widget() if count else None
+        if isinstance(vertex_info, VertexInfo) and vertex_info.point is point:
+            vertex_info.update_position()
+        else:
+            self.display_node(point)
+
     def stop_add_node_mode(self):
         self.MODE_ADD_NODE = False
 
@@ -523,6 +588,7 @@ class MainWindow(QMainWindow):
     def start_real_time_mode(self):
         self.MODE_REAL_TIME = True
         self.INITIAL_VALUE = np.random.standard_normal(self.graph.ecount())
+        self.view.scene.set_lines_live(True)
 
         self.THREAD = MainThread(fps=20, parent=self)
         self.THREAD.update.connect(self.morph)
@@ -533,23 +599,20 @@ class MainWindow(QMainWindow):
         self.BUTTON_REAL_TIME_MODE.setIcon(QIcon('frontend/resource/icons/iconStopMode.png'))
 
     def morph(self):
-        lines = self.view.scene.lines
+        # Lazy lines not created yet are left alone, they are restyled on the first frame after their creation
+        scene = self.view.scene
         scaled_value = (np.sin(self.INITIAL_VALUE + time.time() * 2) + 1) / 2
 
-        for line in lines:
-            line_index = lines.index(line)
-            line_pen = QPen(
-                QColor(255 - scaled_value[line_index] * 255,
-                       255 - scaled_value[line_index] * 255,
-                       scaled_value[line_index] * 255)
-            )
-            line_pen.setWidthF(line.edge['edge_width'])
-            line.setPen(line_pen)
+        codes = palette.rgba_codes(255 - scaled_value * 255, 255 - scaled_value * 255, scaled_value * 255).tolist()
+        for line in scene.created(scene.lines):
+            if line.edge.index < len(codes):
+                line.setPen(palette.pen(codes[line.edge.index], line.edge['edge_width']))
 
     def stop_real_time_mode(self):
         self.MODE_REAL_TIME = False
         self.THREAD.terminate()
         self.THREAD = None
+        self.view.scene.set_lines_live(False)
         # self.INITIAL_VALUE = None
 
         self.BUTTON_REAL_TIME_MODE.clicked.disconnect()
@@ -631,9 +694,18 @@ class MainWindow(QMainWindow):
 
     def set_graph(self, graph_path):
         self.graph = Graph.Read_GraphML(graph_path)
-
-        if 'x' not in self.graph.vs.attributes() or 'nan' in str(self.graph.vs['x']):
-            self.set_layout('Random')
+        self.graph_path = graph_path
+        self.SP_LANDMARKS = None
+
+        missing = 'x' not in self.graph.vs.attributes() or 'nan' in str(self.graph.vs['x'])
+        # A layout computed since the file was last saved is picked up again rather than recomputed
+        saved = load_layout_sidecar(self.graph, graph_path, newer_only=not missing)
+        if saved is not None:
+            _, coords = saved
+            self.graph.vs['x'] = coords[:, 0].tolist()
+            self.graph.vs['y'] = coords[:, 1].tolist()
+        elif missing:
+            self.set_layout('Random', background=False)
 
         self.setup_availability()
 
@@ -643,20 +715,152 @@ class MainWindow(QMainWindow):
         np.random.seed(0)
         self.graph.vs["availability"] = np.random.randint(2, size=len(self.graph.vs))
 
-    def set_layout(self, layout):
-        graph_layout = self.graph.layout(layout=self.LAYOUTS[layout])
-        for c, v in zip(graph_layout.coords, self.graph.vs):
-            v['x'] = c[0]
-            v['y'] = c[1]
+    def run_job(self, kind, function, graph, args, on_done, current_graph, background=True):
+        """
+        Run a computation on a graph, in a worker process if the graph is large
+
+        :param kind: str, kind of the job, a new job replaces the running one of the same kind
+        :param function: callable(igraph.Graph, *args), the computation
+        :param graph: igraph.Graph, graph to work on
+        :param args: tuple, other arguments of the function
+        :param on_done: callable(result), applies the result
+        :param current_graph: callable() -> igraph.Graph, graph the result is meant for by the time it arrives. The
+        result is dropped if it is not the same graph anymore or its structure has changed
+        :param background: bool, False always runs the computation right away
+        """
+        if not background or graph.vcount() < self.BACKGROUND_MIN_VERTICES:
+            on_done(function(graph, *args))
+            return
+
+        graph_hash = structural_hash(graph)
+        self.jobs.submit(
+            kind, function, (graph,) + args, on_done,
+            is_current=lambda: current_graph() is graph and structural_hash(graph) == graph_hash,
+            label="Computing {}...".format(kind)
+        )
+
+    def set_layout(self, layout, background=True):
+        self.stop_progressive_layout()
+        if layout == self.PROGRESSIVE_LAYOUT and background:
+            self.start_progressive_layout()
+            return
+
+        self.run_job(
+            'layout', compute_layout, self.graph, (self.LAYOUTS[layout],),
+            lambda coords: self.apply_layout(coords, layout if background else None), lambda: self.graph, background
+        )
+
+    def apply_layout(self, coords, layout=None):
+        self.graph.vs['x'] = [c[0] for c in coords]
+        self.graph.vs['y'] = [c[1] for c in coords]
+        if layout is not None:
+            self.remember_layout(layout, coords)
         self.view.update_view()
 
+    def remember_layout(self, layout, coords):
+        # Saved next to the file, so reopening it does not compute the layout again
+        if self.graph_path is not None and self.view.SETTINGS['layout_sidecar']:
+            save_layout_sidecar(self.graph, self.graph_path, self.LAYOUTS[layout], coords)
+
+    LAYOUT_THREAD = None
+
+    def start_progressive_layout(self):
+        self.LAYOUT_THREAD = LayoutThread(self.displayed_graph(), parent=self)
+        self.LAYOUT_THREAD.positions_ready.connect(self.apply_progressive_layout)
+        self.LAYOUT_THREAD.converged.connect(self.finish_progressive_layout)
+        self.LAYOUT_THREAD.finished.connect(self.LAYOUT_THREAD.deleteLater)
+        if self.BUTTON_PAUSE_LAYOUT.isChecked():
+            self.LAYOUT_THREAD.pause()
+        self.LAYOUT_THREAD.start()
+
+    def apply_progressive_layout(self, positions, refit=False):
+        # Positions still queued from a layout that has been stopped are dropped
+        thread = self.LAYOUT_THREAD
+        if thread is None or self.sender() is not thread:
+            return
+        # So is the layout itself if the graph has been replaced or changed meanwhile
+        if thread.graph is not self.displayed_graph() or thread.graph.vcount() != len(positions):
+            self.stop_progressive_layout()
+            return
+
+        thread.graph.vs['x'] = positions[:, 0].tolist()
+        thread.graph.vs['y'] = positions[:, 1].tolist()
+        # The scale is kept while the graph settles and only fitted to the view again at the end
+        self.view.update_view(refit=refit)
+
+    def finish_progressive_layout(self, positions):
+        thread = self.LAYOUT_THREAD
+        self.apply_progressive_layout(positions, refit=True)
+        if thread is not None and self.LAYOUT_THREAD is thread and thread.graph is self.graph:
+            self.remember_layout(self.PROGRESSIVE_LAYOUT, positions)
+        if thread is not None and self.sender() is thread:
+            # run returns right after converging, the thread is deleted once it has finished
+            thread.wait()
+            self.LAYOUT_THREAD = None
+
+    def pause_progressive_layout(self, paused):
+        if self.LAYOUT_THREAD is None:
+            return
+        if paused:
+            self.LAYOUT_THREAD.pause()
+        else:
+            self.LAYOUT_THREAD.resume()
+
+    def stop_progressive_layout(self):
+        if self.LAYOUT_THREAD is not None:
+            self.LAYOUT_THREAD.stop()
+            self.LAYOUT_THREAD = None
+
+    def pin_vertex(self, vertex):
+        # A vertex dragged while the layout runs stays where it is dropped
+        if self.LAYOUT_THREAD is not None and vertex.graph is self.LAYOUT_THREAD.graph:
+            self.LAYOUT_THREAD.pin(vertex.index, vertex['x'], vertex['y'])
+
     def layout_button_clicked(self):
         self.set_up(layout=self.BUTTON_LAYOUT.currentText())
 
     def set_clustering_algorithm(self, clustering_algorithm):
-        self.clustering_algorithm = self.CLUSTERING_ALGORITHMS[clustering_algorithm]
+        algorithm = self.CLUSTERING_ALGORITHMS[clustering_algorithm]
+        # The scene clusters the graph it displays, which is not the whole graph after cropping
+        graph = self.displayed_graph()
+        graph_path = self.graph_path if self.view.SETTINGS['cluster_sidecar'] else None
+
+        if cached_membership(graph, algorithm, graph_path=graph_path) is not None:
+            self.clustering_algorithm = algorithm
+            self.view.update_view()
+        else:
+            self.run_job(
+                'clustering', compute_membership, graph, (algorithm,),
+                lambda membership: self.apply_clustering(graph, algorithm, membership), self.displayed_graph
+            )
+
+    def apply_clustering(self, graph, algorithm, membership):
+        """
+        Show a clustering computed elsewhere. It goes through the clustering cache, so the scene does not compute it
+        again
+
+        :param graph: igraph.Graph, graph the clustering was computed for
+        :param algorithm: str, name of the community_* method of igraph.Graph it was computed with
+        :param membership: [int], cluster of every vertex
+        """
+        graph_path = self.graph_path if self.view.SETTINGS['cluster_sidecar'] else None
+        store_membership(graph, algorithm, membership, graph_path=graph_path)
+        self.clustering_algorithm = algorithm
         self.view.update_view()
 
+    CLUSTERING_COMPARISON_DIALOG = None
+
+    def open_clustering_comparison(self):
+        # A comparison still running is shown rather than started again
+        dialog = self.CLUSTERING_COMPARISON_DIALOG
+        if dialog is None or not dialog.is_running():
+            dialog = ClusteringComparisonDialog(self)
+            self.CLUSTERING_COMPARISON_DIALOG = dialog
+        dialog.show()
+
+    def displayed_graph(self):
+        return self.view.scene.graph_to_display if self.view.scene is not None else self.graph
+
     def cluster_button_clicked(self):
         self.set_up(cluster=self.BUTTON_CLUSTERING.currentText())
 
@@ -668,6 +872,8 @@ class MainWindow(QMainWindow):
     SP_SOURCE_AND_TARGET = None
     SP_SOURCE_AND_TARGET_INDEX = 0
     SP_THREAD = None
+    # Landmarks of the current graph, built in the background when it is too large for a distance matrix
+    SP_LANDMARKS = None
 
     def start_shortest_path_mode(self):
         # Only show one path at a time
@@ -684,6 +890,16 @@ class MainWindow(QMainWindow):
 
         # Store source and destination vertex ids in a list. -1 means no choice has been made
         self.SP_SOURCE_AND_TARGET = [-1, -1]
+        self.build_landmarks()
+
+    def build_landmarks(self):
+        if not self.view.SETTINGS['landmark_routing'] or self.SP_LANDMARKS is not None or \
+                self.graph.vcount() <= MATRIX_MAX_VERTICES:
+            return
+        self.run_job('landmarks', build_landmarks, self.graph, (), self.set_landmarks, lambda: self.graph)
+
+    def set_landmarks(self, landmarks):
+        self.SP_LANDMARKS = landmarks
 
     def get_shortest_path_nodes(self, point):
         if self.MODE_SHORTEST_PATH:
@@ -703,11 +919,16 @@ class MainWindow(QMainWindow):
             self.unhighlight_path()
 
     def show_path(self):
-        edge_path = get_shortest_paths(self.graph, self.SP_SOURCE_AND_TARGET[0], self.SP_SOURCE_AND_TARGET[1])[0]
-        self.highlight_path(edge_path)
+        source, target = self.SP_SOURCE_AND_TARGET
+        path_count = self.SP_INPUT_DIALOG.spinbox_path_count.value()
+        if path_count > 1:
+            edge_paths = k_shortest_paths(self.graph, source, target, path_count)
+        else:
+            edge_paths = get_shortest_paths(self.graph, source, target, landmarks=self.SP_LANDMARKS)
+        self.highlight_paths(edge_paths)
 
-    def highlight_path(self, edge_path):
-        self.view.set_edge_path(edge_path)
+    def highlight_paths(self, edge_paths):
+        self.view.set_edge_paths(edge_paths)
 
         self.SP_THREAD = MainThread(fps=1, parent=self)
         self.SP_THREAD.update.connect(self.view.real_time_highlight)
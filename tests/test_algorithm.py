@@ -0,0 +1,119 @@
+import random
+
+import igraph
+import pytest
+
+from backend.algorithm import (
+    batch_shortest_paths, bottleneck, bottlenecks, cut_edges, k_shortest_paths, walk, yen_k_shortest_paths
+)
+
+
+def pairwise_cut_edges(graph, source_side, target_side):
+    # What bottleneck used to do: look for an edge between every pair of vertices on either side of the cut
+    edge_ids = []
+    for a in source_side:
+        for b in target_side:
+            edge_id = graph.get_eid(a, b, error=False)
+            if edge_id >= 0:
+                edge_ids.append(edge_id)
+    return sorted(edge_ids)
+
+
+@pytest.fixture(params=[False, True], ids=['undirected', 'directed'])
+def graph(request):
+    random.seed(0)  # igraph draws its random graphs from the random module
+    graph = igraph.Graph.Erdos_Renyi(n=40, m=120, directed=request.param)
+    graph.es['capacity'] = [1 + edge.index % 5 for edge in graph.es]
+    return graph
+
+
+def test_cut_edges_matches_pairwise_lookup(graph):
+    for source, target in [(0, 1), (2, 39), (5, 17)]:
+        source_side, target_side = graph.maxflow(source, target, 'capacity')
+        assert cut_edges(graph, source_side) == pairwise_cut_edges(graph, source_side, target_side)
+
+
+def test_bottleneck_is_the_minimum_cut(graph):
+    cut = graph.maxflow(0, 1, 'capacity')
+    edge_ids = bottleneck(graph, 0, 1, 'capacity')
+    assert sum(graph.es[edge_ids]['capacity']) == pytest.approx(cut.value)
+    assert bottleneck(graph, 0, 1, 'capacity', output="v") == [cut[0], cut[1]]
+
+
+def test_bottlenecks_match_bottleneck(graph):
+    pairs = [(0, 1), (2, 39), (5, 17), (39, 2)]
+    results = bottlenecks(graph, pairs, 'capacity')
+    for (source, target), (value, edge_ids) in zip(pairs, results):
+        assert value == pytest.approx(graph.maxflow_value(source, target, 'capacity'))
+        assert edge_ids == bottleneck(graph, source, target, 'capacity')
+
+
+def test_gomory_hu_cuts_match_maxflow():
+    random.seed(0)
+    graph = igraph.Graph.Erdos_Renyi(n=30, m=90)
+    capacity = [1 + edge.index % 7 for edge in graph.es]
+    pairs = [(source, target) for source in range(0, 30, 3) for target in range(1, 30, 4) if source != target]
+
+    for (source, target), (value, edge_ids) in zip(pairs, bottlenecks(graph, pairs, capacity, gomory_hu=True)):
+        assert value == pytest.approx(graph.maxflow_value(source, target, capacity))
+        # The cut may differ from the one maxflow finds, but not its capacity
+        assert sum(capacity[edge_id] for edge_id in edge_ids) == pytest.approx(value)
+        assert sum(capacity[edge_id] for edge_id in bottleneck(graph, source, target, capacity, gomory_hu=True)) == \
+            pytest.approx(value)
+
+
+def test_gomory_hu_refuses_same_source_and_target():
+    graph = igraph.Graph.Ring(6)
+    with pytest.raises(igraph.InternalError):
+        bottleneck(graph, 2, 2)
+    with pytest.raises(ValueError):
+        bottleneck(graph, 2, 2, gomory_hu=True)
+    with pytest.raises(ValueError):
+        bottlenecks(graph, [(0, 3), (4, 4)], gomory_hu=True)
+
+
+@pytest.fixture
+def weighted_graph():
+    random.seed(3)
+    graph = igraph.Graph.Erdos_Renyi(n=40, m=120)
+    graph.es['weight'] = [1 + random.randint(0, 9) for _ in graph.es]
+    return graph
+
+
+def lengths(paths, weights):
+    return [sum(weights[edge_id] for edge_id in path) for path in paths]
+
+
+@pytest.mark.skipif(not hasattr(igraph.Graph, 'get_k_shortest_paths'), reason="igraph older than 0.10")
+@pytest.mark.filterwarnings("ignore:Couldn't reach some vertices")
+@pytest.mark.parametrize('directed', [False, True])
+def test_yen_matches_igraph(weighted_graph, directed):
+    graph = weighted_graph
+    if directed:
+        graph = graph.copy()
+        graph.to_directed(mode="random")
+    weights = graph.es['weight']
+    for source, target in [(0, 1), (4, 33), (17, 2)]:
+        paths = yen_k_shortest_paths(graph, source, target, 5, 'weight')
+        expected = graph.get_k_shortest_paths(source, target, 5, weights='weight', output="epath")
+        # Paths of the same length may come in another order, their lengths may not
+        assert lengths(paths, weights) == lengths(expected, weights)
+        assert len(set(map(tuple, paths))) == len(paths)
+        for path in paths:
+            vertex_path = walk(graph.get_edgelist(), source, path)
+            assert vertex_path[-1] == target and len(set(vertex_path)) == len(vertex_path)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_batch_shortest_paths(weighted_graph, processes):
+    graph = weighted_graph
+    weights = graph.es['weight']
+    pairs = [(source, target) for source in range(0, 40, 5) for target in range(1, 40, 8)]
+
+    single = batch_shortest_paths(graph, pairs, weights='weight', processes=processes)
+    for (source, target), paths in zip(pairs, single):
+        assert lengths(paths, weights) == [graph.distances(source, target, weights='weight')[0][0]]
+
+    several = batch_shortest_paths(graph, pairs, k=3, weights='weight', processes=processes)
+    for (source, target), paths in zip(pairs, several):
+        assert lengths(paths, weights) == lengths(k_shortest_paths(graph, source, target, 3, 'weight'), weights)
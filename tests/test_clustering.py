@@ -0,0 +1,192 @@
+import json
+
+import igraph
+import pytest
+
+from backend import clustering
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clustering.clear_cache()
+    yield
+    clustering.clear_cache()
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """
+    Algorithms actually run by compute_membership, in call order
+    """
+    calls = []
+    compute_membership = clustering.compute_membership
+
+    def counted(graph, algorithm, weights=None):
+        calls.append(algorithm)
+        return compute_membership(graph, algorithm, weights)
+
+    monkeypatch.setattr(clustering, 'compute_membership', counted)
+    return calls
+
+
+def cliques(count=10, size=8):
+    """
+    Cliques joined in a ring by one edge each, the clusters every algorithm finds
+    """
+    graph = igraph.Graph()
+    graph.add_vertices(count * size)
+    edges = []
+    for clique in range(count):
+        first = clique * size
+        edges += [(first + a, first + b) for a in range(size) for b in range(a + 1, size)]
+        edges.append((first, (first + size + 1) % (count * size)))
+    graph.add_edges(edges)
+    return graph
+
+
+def test_cache_hit(calls):
+    graph = cliques()
+    membership = clustering.get_membership(graph, 'community_multilevel')
+    # Attributes other than the weights are not part of the key
+    copy = graph.copy()
+    copy.vs['x'] = list(range(copy.vcount()))
+    assert clustering.get_membership(copy, 'community_multilevel') == membership
+    assert calls == ['community_multilevel']
+
+
+def test_cache_keys(calls):
+    graph = cliques()
+    clustering.get_membership(graph, 'community_multilevel')
+    clustering.get_membership(graph, 'community_label_propagation')
+    graph.es['weight'] = [2] * graph.ecount()
+    clustering.get_membership(graph, 'community_multilevel', weights='weight')
+    assert calls == ['community_multilevel', 'community_label_propagation', 'community_multilevel']
+
+
+def test_least_recently_used_is_evicted(calls, monkeypatch):
+    monkeypatch.setattr(clustering, 'MAX_ENTRIES', 2)
+    graphs = [cliques(count) for count in (4, 5, 6)]
+    clustering.get_membership(graphs[0], 'community_multilevel')
+    clustering.get_membership(graphs[1], 'community_multilevel')
+    # Used again, so the second graph is the least recently used one when the third comes
+    clustering.get_membership(graphs[0], 'community_multilevel')
+    clustering.get_membership(graphs[2], 'community_multilevel')
+    assert len(calls) == 3
+
+    clustering.get_membership(graphs[0], 'community_multilevel')
+    assert len(calls) == 3
+    clustering.get_membership(graphs[1], 'community_multilevel')
+    assert len(calls) == 4
+
+
+def test_sidecar_outlives_the_cache(calls, tmp_path):
+    graph = cliques()
+    path = str(tmp_path / 'cliques.graphml')
+    graph.write_graphml(path)
+    membership = clustering.get_membership(graph, 'community_multilevel', graph_path=path)
+    with open(clustering.sidecar_path(path)) as f:
+        assert [entry['membership'] for entry in json.load(f)] == [membership]
+
+    clustering.clear_cache()
+    assert clustering.get_membership(graph, 'community_multilevel', graph_path=path) == membership
+    assert calls == ['community_multilevel']
+
+
+def test_sidecar_of_another_graph_or_algorithm_is_not_used(calls, tmp_path):
+    graph = cliques()
+    path = str(tmp_path / 'cliques.graphml')
+    graph.write_graphml(path)
+    clustering.get_membership(graph, 'community_multilevel', graph_path=path)
+    clustering.clear_cache()
+
+    # Same counts, another structure
+    rewired = graph.copy()
+    source, target = rewired.es[0].tuple
+    rewired.delete_edges(0)
+    rewired.add_edge(source, rewired.vcount() - 1)
+    clustering.get_membership(rewired, 'community_multilevel', graph_path=path)
+    clustering.get_membership(graph, 'community_label_propagation', graph_path=path)
+    assert calls == ['community_multilevel'] * 2 + ['community_label_propagation']
+
+
+def test_unreadable_sidecar(calls, tmp_path):
+    graph = cliques()
+    path = str(tmp_path / 'cliques.graphml')
+    graph.write_graphml(path)
+    with open(clustering.sidecar_path(path), 'w') as f:
+        f.write('not json')
+    assert len(clustering.get_membership(graph, 'community_multilevel', graph_path=path)) == graph.vcount()
+    assert calls == ['community_multilevel']
+
+
+def test_small_edit_only_relabels_around_it(calls):
+    graph = cliques()
+    before = clustering.get_membership_incrementally(graph, 'community_multilevel')
+
+    # A new vertex tied to the first clique, and an edge added inside the last one
+    edited = graph.copy()
+    edited.add_vertices(1)
+    new = edited.vcount() - 1
+    edited.add_edges([(new, 1), (new, 2), (new, 3), (72, 79)])
+    edited.delete_edges(edited.get_eid(72, 73))
+    # The new vertex, its three neighbors and the ends of the two edges in the last clique
+    assert 7 <= clustering.INCREMENTAL_MAX_CHANGE * edited.vcount()
+
+    after = clustering.get_membership_incrementally(edited, 'community_multilevel')
+    assert calls == ['community_multilevel']
+    assert len(after) == edited.vcount()
+    assert after[:graph.vcount()] == before
+    assert after[new] == before[1]
+
+
+def test_large_edit_clusters_again(calls):
+    graph = cliques()
+    clustering.get_membership_incrementally(graph, 'community_multilevel')
+
+    # Every clique joined to the next one by a second edge touches more than a tenth of the vertices
+    edited = graph.copy()
+    edited.add_edges([(clique * 8 + 4, (clique * 8 + 12) % 80) for clique in range(10)])
+    previous = clustering._last_clusterings[('community_multilevel', clustering.weights_key(graph))]
+    assert clustering.update_membership(edited, previous) is None
+
+    after = clustering.get_membership_incrementally(edited, 'community_multilevel')
+    assert calls == ['community_multilevel'] * 2
+    assert len(after) == edited.vcount()
+
+
+def test_vertices_are_followed_through_renumbering(calls):
+    # Large enough for the nine vertices the deletion touches to be a small edit
+    graph = cliques(count=20)
+    graph.vs['id'] = ['n{}'.format(vertex.index) for vertex in graph.vs]
+    before = dict(zip(graph.vs['id'], clustering.get_membership_incrementally(graph, 'community_multilevel')))
+
+    # Deleting the first vertex renumbers all the others
+    edited = graph.copy()
+    edited.delete_vertices(0)
+    after = clustering.get_membership_incrementally(edited, 'community_multilevel')
+    assert calls == ['community_multilevel']
+    assert dict(zip(edited.vs['id'], after)) == {key: before[key] for key in edited.vs['id']}
+
+
+def test_compare_clusterings():
+    graph = cliques()
+    results = clustering.compare_clusterings(graph, ['community_multilevel', 'community_label_propagation',
+                                                     'community_nothing'])
+    for algorithm in ('community_multilevel', 'community_label_propagation'):
+        result = results[algorithm]
+        assert result['status'] == 'ok'
+        assert len(result['membership']) == graph.vcount()
+        assert result['clusters'] == len(set(result['membership']))
+        assert result['seconds'] >= 0 and result['peak_memory'] > 0
+    assert results['community_multilevel']['clusters'] == 10
+    assert results['community_nothing']['status'] != 'ok'
+
+
+def test_compare_clusterings_stops_slow_algorithms():
+    # Exact modularity optimization takes minutes on a graph of this size
+    graph = igraph.Graph.Erdos_Renyi(n=40, m=120)
+    results = clustering.compare_clusterings(graph, ['community_optimal_modularity', 'community_multilevel'],
+                                             timeout=10)
+    assert results['community_optimal_modularity'] == {'status': 'timeout'}
+    assert results['community_multilevel']['status'] == 'ok'
+    assert len(results['community_multilevel']['membership']) == graph.vcount()
@@ -0,0 +1,45 @@
+import igraph
+import numpy as np
+import pytest
+
+from backend.force_layout import natural_length, repulsion, barnes_hut_repulsion, barnes_hut_layout
+
+COUNT = 3000
+
+
+def uniform(random_state):
+    return random_state.uniform(0, np.sqrt(COUNT), (COUNT, 2))
+
+
+def clustered(random_state):
+    # Dense blobs far apart, the cells of the quadtree are then mostly empty or crowded
+    centers = random_state.uniform(0, np.sqrt(COUNT), (8, 2))
+    return centers[random_state.randint(0, len(centers), COUNT)] + random_state.normal(0, 1, (COUNT, 2))
+
+
+@pytest.mark.parametrize('points', [uniform, clustered])
+def test_barnes_hut_is_close_to_exact_repulsion(points):
+    positions = points(np.random.RandomState(0))
+    k = natural_length(positions)
+    exact = repulsion(positions, k)
+    approximate = barnes_hut_repulsion(positions, k)
+    assert approximate.shape == exact.shape
+    assert np.linalg.norm(approximate - exact) / np.linalg.norm(exact) < 0.002
+
+
+def test_barnes_hut_on_tiny_inputs():
+    assert np.array_equal(barnes_hut_repulsion(np.zeros((1, 2)), 1.0), np.zeros((1, 2)))
+    # Two vertices on top of each other do not divide by zero
+    assert np.isfinite(barnes_hut_repulsion(np.zeros((2, 2)), 1.0)).all()
+
+
+def test_barnes_hut_layout():
+    graph = igraph.Graph.Lattice([30, 30], circular=False)
+    positions = barnes_hut_layout(graph, iterations=50)
+    assert positions.shape == (graph.vcount(), 2)
+    assert np.isfinite(positions).all()
+    # Neighbors end up closer than vertices picked at random
+    edges = np.array(graph.get_edgelist())
+    edge_length = np.linalg.norm(positions[edges[:, 0]] - positions[edges[:, 1]], axis=1).mean()
+    pairs = np.random.RandomState(0).randint(0, graph.vcount(), (1000, 2))
+    assert edge_length < np.linalg.norm(positions[pairs[:, 0]] - positions[pairs[:, 1]], axis=1).mean() / 3
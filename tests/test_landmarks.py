@@ -0,0 +1,70 @@
+import random
+
+import igraph
+import pytest
+
+from backend.algorithm import get_shortest_paths
+from backend.landmarks import Landmarks
+
+
+def path_length(edge_path, weights):
+    return sum(weights[edge_id] for edge_id in edge_path)
+
+
+@pytest.fixture(params=[False, True], ids=['undirected', 'directed'])
+def graph(request):
+    random.seed(2)
+    graph = igraph.Graph.Erdos_Renyi(n=80, m=240, directed=request.param)
+    graph.es['weight'] = [1 + random.randint(0, 9) for _ in graph.es]
+    return graph
+
+
+@pytest.mark.parametrize('mode', ["OUT", "IN", "ALL"])
+def test_routes_are_shortest(graph, mode):
+    landmarks = Landmarks(graph, count=4, weights='weight', mode=mode)
+    distances = graph.distances(weights='weight', mode=mode)
+    weights = graph.es['weight']
+    for source, target in [(0, 1), (5, 60), (79, 3), (12, 12)]:
+        for guided in (True, False):
+            vertex_path, edge_path, _ = landmarks.route(source, target, guided)
+            if distances[source][target] == float('inf'):
+                assert edge_path == [] and vertex_path == []
+            else:
+                assert path_length(edge_path, weights) == distances[source][target]
+                assert vertex_path[0] == source and vertex_path[-1] == target
+
+
+def test_guided_search_expands_fewer_vertices():
+    graph = igraph.Graph.Lattice([40, 40], circular=False)
+    landmarks = Landmarks(graph, count=8)
+    # Across the middle of the grid, Dijkstra expands a ball around the source, A* mostly the row between the two
+    source, target = 20 * 40 + 5, 20 * 40 + 35
+    assert landmarks.route(source, target)[2] < landmarks.route(source, target, guided=False)[2] / 2
+
+
+def test_landmarks_only_answer_what_they_were_built_for(graph):
+    landmarks = Landmarks(graph, count=4, weights='weight')
+    assert landmarks.fits(graph, 'weight')
+    assert not landmarks.fits(graph)
+    assert landmarks.fits(graph, 'weight', "IN") == (not graph.is_directed())
+
+    # Built for the weights, asked for hops: the answer has to come from the hop counts
+    paths = get_shortest_paths(graph, 0, 40, landmarks=landmarks)
+    assert len(paths[0]) == graph.distances(0, 40)[0][0]
+    paths = get_shortest_paths(graph, 0, 40, weights='weight', landmarks=landmarks)
+    assert path_length(paths[0], graph.es['weight']) == graph.distances(0, 40, weights='weight')[0][0]
+
+
+def test_landmarks_do_not_fit_a_rewired_graph(graph):
+    landmarks = Landmarks(graph, count=4)
+    source, target = graph.es[0].tuple
+    free = next(vertex for vertex in range(graph.vcount())
+                if vertex not in (source, target) and graph.get_eid(source, vertex, error=False) < 0)
+
+    # Same number of vertices and edges, but another structure
+    rewired = graph.copy()
+    rewired.delete_edges([0])
+    rewired.add_edge(source, free)
+    assert (rewired.vcount(), rewired.ecount()) == (graph.vcount(), graph.ecount())
+    assert landmarks.fits(graph)
+    assert not landmarks.fits(rewired)
@@ -0,0 +1,65 @@
+import os
+
+import igraph
+import numpy as np
+import pytest
+
+from backend.layout import layout_sidecar_path, save_layout_sidecar, load_layout_sidecar
+
+
+@pytest.fixture
+def graph():
+    return igraph.Graph.Lattice([6, 5], circular=False)
+
+
+@pytest.fixture
+def graph_path(graph, tmp_path):
+    path = str(tmp_path / 'grid.graphml')
+    graph.write_graphml(path)
+    return path
+
+
+@pytest.fixture
+def coords(graph):
+    return np.random.RandomState(0).uniform(-100, 100, (graph.vcount(), 2))
+
+
+def test_sidecar_round_trip(graph, graph_path, coords):
+    save_layout_sidecar(graph, graph_path, 'multilevel', coords)
+    assert os.path.exists(layout_sidecar_path(graph_path))
+
+    layout, loaded = load_layout_sidecar(graph, graph_path)
+    assert layout == 'multilevel'
+    assert loaded.shape == (graph.vcount(), 2)
+    # Saved as float32
+    assert np.allclose(loaded, coords, rtol=1e-6)
+
+
+def test_sidecar_of_a_graph_with_another_vertex_count_is_ignored(graph, graph_path, coords):
+    save_layout_sidecar(graph, graph_path, 'multilevel', coords)
+    graph.add_vertices(1)
+    assert load_layout_sidecar(graph, graph_path) is None
+
+
+def test_sidecar_of_a_rewired_graph_is_ignored(graph, graph_path, coords):
+    save_layout_sidecar(graph, graph_path, 'multilevel', coords)
+    # Same vertex and edge counts, other structure
+    source, target = graph.es[0].tuple
+    graph.delete_edges(0)
+    graph.add_edge(source, graph.vcount() - 1)
+    assert load_layout_sidecar(graph, graph_path) is None
+
+
+def test_sidecar_older_than_the_graph_file(graph, graph_path, coords):
+    save_layout_sidecar(graph, graph_path, 'multilevel', coords)
+    sidecar = os.path.getmtime(layout_sidecar_path(graph_path))
+    os.utime(graph_path, (sidecar + 10, sidecar + 10))
+    assert load_layout_sidecar(graph, graph_path, newer_only=True) is None
+    assert load_layout_sidecar(graph, graph_path) is not None
+
+
+def test_missing_or_broken_sidecar(graph, graph_path):
+    assert load_layout_sidecar(graph, graph_path) is None
+    with open(layout_sidecar_path(graph_path), 'wb') as f:
+        f.write(b'not an npz file')
+    assert load_layout_sidecar(graph, graph_path) is None
@@ -0,0 +1,61 @@
+import igraph
+import numpy as np
+import pytest
+
+from backend.multilevel_layout import edge_array, match, coarsen, multilevel_layout
+
+GRAPHS = {
+    'mesh': lambda: igraph.Graph.Lattice([30, 30], circular=False),
+    'scale free': lambda: igraph.Graph.Barabasi(1000, 2),
+    'star': lambda: igraph.Graph.Star(200),
+    # Isolated vertices, a self loop and a multiple edge
+    'odd': lambda: igraph.Graph(n=10, edges=[(0, 1), (1, 2), (2, 2), (3, 4), (3, 4)]),
+}
+
+
+@pytest.fixture(params=list(GRAPHS))
+def graph(request):
+    return GRAPHS[request.param]()
+
+
+def test_matching_pairs_adjacent_vertices(graph):
+    edges = edge_array(graph)
+    mate = match(edges, graph.vcount(), np.random.RandomState(0))
+    matched = np.nonzero(mate >= 0)[0]
+    assert (mate[mate[matched]] == matched).all()
+    assert (mate[matched] != matched).all()
+    adjacent = {tuple(edge) for edge in edges} | {tuple(edge[::-1]) for edge in edges}
+    assert all((vertex, mate[vertex]) in adjacent for vertex in matched)
+
+
+def test_coarsening_is_valid(graph):
+    count, edges = graph.vcount(), edge_array(graph)
+    mapping, coarse_count, coarse_edges = coarsen(edges, count, np.random.RandomState(0))
+
+    # Every fine vertex maps to exactly one coarse vertex, and every coarse vertex to at least one fine vertex
+    assert mapping.shape == (count,)
+    assert mapping.min() == 0 and mapping.max() == coarse_count - 1
+    assert len(np.unique(mapping)) == coarse_count
+    assert coarse_count <= count
+
+    # The fine vertices merged into a coarse vertex are connected
+    for coarse_vertex in range(coarse_count):
+        members = np.nonzero(mapping == coarse_vertex)[0].tolist()
+        assert graph.induced_subgraph(members).is_connected()
+
+    # Coarse edges are the fine edges between different coarse vertices, once each
+    expected = {tuple(sorted(pair)) for pair in mapping[edges].tolist() if pair[0] != pair[1]}
+    assert sorted(map(tuple, coarse_edges.tolist())) == sorted(expected)
+
+
+@pytest.mark.parametrize('name', ['mesh', 'scale free', 'star'])
+def test_coarsening_shrinks_graphs(name):
+    graph = GRAPHS[name]()
+    _, coarse_count, _ = coarsen(edge_array(graph), graph.vcount(), np.random.RandomState(0))
+    assert coarse_count <= 0.6 * graph.vcount()
+
+
+def test_multilevel_layout(graph):
+    positions = multilevel_layout(graph)
+    assert positions.shape == (graph.vcount(), 2)
+    assert np.isfinite(positions).all()
@@ -0,0 +1,59 @@
+import os
+
+import igraph
+import pytest
+
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    monkeypatch.setenv('QT_QPA_PLATFORM', os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    # The window loads its .ui files and icons from paths relative to the root of the repository
+    monkeypatch.chdir(ROOT)
+    application = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    from main import MainWindow
+
+    graph = igraph.Graph.Lattice([20, 15], circular=False)
+    graph.vs['x'] = [float(vertex.index % 20) for vertex in graph.vs]
+    graph.vs['y'] = [float(vertex.index // 20) for vertex in graph.vs]
+    graph.vs['id'] = [str(vertex.index) for vertex in graph.vs]
+    path = str(tmp_path / 'grid.graphml')
+    graph.write_graphml(path)
+    monkeypatch.setattr(MainWindow, 'DEFAULT_GRAPH', path)
+
+    window = MainWindow()
+    yield window
+    # close() would ask for confirmation first
+    window.stop_progressive_layout()
+    window.jobs.shutdown()
+    window.deleteLater()
+    application.processEvents()
+
+
+def test_update_after_revert(window):
+    scene = window.view.scene
+    scene.revert_to_default()
+    assert {'edge_color', 'edge_width'} <= set(window.graph.es.attributes())
+    assert {'color', 'cluster'} <= set(window.graph.vs.attributes())
+
+    window.graph.vs['x'] = [-x for x in window.graph.vs['x']]
+    window.view.update_view()
+    assert window.view.scene is scene  # patched in place, not built again
+    assert [point.x() for point in scene.points] == scene.positions[:, 0].tolist()
+
+
+def test_revert_restores_the_graph_before_a_removal(window):
+    scene = window.view.scene
+    count = window.graph.vcount()
+    window.graph.vs['x'] = [-x for x in window.graph.vs['x']]
+    window.view.update_view()
+    x = window.graph.vs['x']
+
+    scene.remove_point(scene.points[0])
+    assert window.graph.vcount() == count - 1
+    scene.revert_to_default()
+    assert window.graph.vcount() == count
+    assert window.graph.vs['x'] == x  # with the layout it had when the vertex was removed
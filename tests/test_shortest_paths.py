@@ -0,0 +1,62 @@
+import random
+
+import igraph
+import pytest
+
+from backend import shortest_paths
+from backend.algorithm import get_shortest_paths
+
+
+def path_length(graph, edge_path, weights):
+    return sum(weights[edge_id] for edge_id in edge_path)
+
+
+@pytest.fixture(params=[False, True], ids=['undirected', 'directed'])
+def graph(request):
+    random.seed(1)
+    graph = igraph.Graph.Erdos_Renyi(n=60, m=180, directed=request.param)
+    graph.vs['name'] = ['v{}'.format(vertex.index) for vertex in graph.vs]
+    graph.es['weight'] = [1 + random.randint(0, 9) for _ in graph.es]
+    shortest_paths.clear_cache()
+    return graph
+
+
+@pytest.mark.filterwarnings("ignore:Couldn't reach some vertices")
+@pytest.mark.parametrize('mode', ["OUT", "IN", "ALL"])
+def test_cached_paths_are_shortest(graph, mode):
+    weights = graph.es['weight']
+    for source in (0, 7, 31):
+        expected = graph.get_shortest_paths(source, weights='weight', mode=mode, output="epath")
+        # The second time round, the paths come from the cached tree of the source
+        for _ in range(2):
+            paths = get_shortest_paths(graph, source, weights='weight', mode=mode)
+            assert [path_length(graph, path, weights) for path in paths] == \
+                [path_length(graph, path, weights) for path in expected]
+            assert [bool(path) for path in paths] == [bool(path) for path in expected]
+
+
+def test_cached_vertex_paths_follow_the_edge_paths(graph):
+    edge_paths = get_shortest_paths(graph, 3, weights='weight')
+    vertex_paths = get_shortest_paths(graph, 3, weights='weight', output="vpath")
+    for edge_path, vertex_path in zip(edge_paths, vertex_paths):
+        if edge_path:
+            assert len(vertex_path) == len(edge_path) + 1
+        for edge_id, (a, b) in zip(edge_path, zip(vertex_path, vertex_path[1:])):
+            assert {a, b} == set(graph.es[edge_id].tuple)
+
+
+def test_targets_as_igraph_takes_them(graph):
+    expected = get_shortest_paths(graph, 0, [5, 9], weights='weight')
+    assert get_shortest_paths(graph, 'v0', ['v5', 'v9'], weights='weight') == expected
+    assert get_shortest_paths(graph, graph.vs[0], graph.vs[[5, 9]], weights='weight') == expected
+    assert get_shortest_paths(graph, 0, [graph.vs[5], 'v9'], weights='weight') == expected
+    assert get_shortest_paths(graph, 0, 'v5', weights='weight') == expected[:1]
+    with pytest.raises(ValueError):
+        get_shortest_paths(graph, 0, 'missing', weights='weight')
+
+
+def test_cache_follows_edits(graph):
+    get_shortest_paths(graph, 0, weights='weight')
+    graph.add_edge(0, 59, weight=0)
+    shortest_paths.clear_cache()
+    assert get_shortest_paths(graph, 0, 59, weights='weight') == [[graph.ecount() - 1]]
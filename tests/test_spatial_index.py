@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from frontend.spatial_index import GridIndex, SegmentIndex
+
+CELL_SIZE = 16.0
+
+
+@pytest.fixture
+def positions():
+    # Negative coordinates too, cells are then numbered from below zero
+    return np.random.RandomState(0).uniform(-500, 500, (2000, 2))
+
+
+@pytest.fixture
+def segments(positions):
+    # Short and long segments, the long ones are kept out of the cells
+    lengths = np.where(np.arange(len(positions)) % 10, 30, 600)
+    return np.hstack([positions, positions + np.random.RandomState(1).normal(0, 1, positions.shape) * lengths[:, None]])
+
+
+def probes():
+    return np.random.RandomState(2).uniform(-550, 550, (200, 2))
+
+
+def distance_to_segments(segments, x, y):
+    starts, directions = segments[:, :2], segments[:, 2:] - segments[:, :2]
+    along = np.clip(((np.array([x, y]) - starts) * directions).sum(axis=1) / (directions ** 2).sum(axis=1), 0, 1)
+    return np.hypot(*(starts + along[:, None] * directions - (x, y)).T)
+
+
+def test_points_in_rect_and_nearest(positions):
+    index = GridIndex(CELL_SIZE)
+    # In two parts, ids follow on from the first
+    index.extend(positions[:500])
+    index.extend(positions[500:])
+    for x, y in probes():
+        inside = (positions[:, 0] >= x) & (positions[:, 0] <= x + 100) & \
+            (positions[:, 1] >= y) & (positions[:, 1] <= y + 60)
+        assert sorted(index.in_rect(x, y, x + 100, y + 60).tolist()) == np.nonzero(inside)[0].tolist()
+
+        distances = np.hypot(*(positions - (x, y)).T)
+        closest = index.nearest(x, y, 20.0)
+        if distances.min() > 20.0:
+            assert closest is None
+        else:
+            assert distances[closest] == distances.min()
+
+
+def test_segments_nearest(segments):
+    index = SegmentIndex(CELL_SIZE)
+    index.extend(segments[:500], np.ones(500))
+    index.extend(segments[500:], np.ones(len(segments) - 500))
+    assert index.long_segments
+    for x, y in probes():
+        distances = distance_to_segments(segments, x, y)
+        closest = index.nearest(x, y, 3.0)
+        # Within the tolerance of the stroke, half of its width
+        if distances.min() > 3.5:
+            assert closest is None
+        else:
+            assert np.isclose(distances[closest], distances.min())